@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from .models import Post
+
+
+@admin.register(Post)
+class PostAdmin(admin.ModelAdmin):
+    list_display = ('title', 'category', 'published_at', 'is_published', 'reading_time')
+    list_filter = ('is_published', 'category')
+    search_fields = ('title', 'slug', 'summary')
+    prepopulated_fields = {'slug': ('title',)}
+    filter_horizontal = ('services', 'sub_services')
+    readonly_fields = ('excerpt', 'reading_time', 'updated_at')
+    date_hierarchy = 'published_at'
+    list_per_page = 20
+    fieldsets = (
+        (None, {'fields': ('title', 'slug', 'category', 'summary', 'body', 'cover_image')}),
+        ("Author", {'fields': ('author_name', 'author_title')}),
+        ("Links", {'fields': ('services', 'sub_services')}),
+        ("Publishing", {'fields': ('is_published', 'published_at')}),
+        ("Computed", {'fields': ('excerpt', 'reading_time', 'updated_at')}),
+    )
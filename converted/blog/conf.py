@@ -0,0 +1,15 @@
+from django.conf import settings
+
+
+DEFAULTS = {
+    'PAGE_SIZE': 12,  # posts per listing page
+    'RELATED_POSTS': 3,  # entries kept in each post's related-posts index
+    'EXCERPT_WORDS': 40,
+    'WORDS_PER_MINUTE': 220,
+    'CACHE': 'default',  # for rendered article HTML
+    'RENDER_TIMEOUT': 7 * 24 * 60 * 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG', {})}
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog import related
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every published post's related-posts list (see blog/related.py). "
+        "Saves keep the lists current; run this after bulk imports that bypass signals."
+    )
+
+    def handle(self, *args, **options):
+        count = related.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt related posts for {count} published posts."))
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('services', '0017_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Post',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('slug', models.SlugField(blank=True, max_length=220, unique=True)),
+                ('category', models.CharField(blank=True, help_text="Badge shown on cards, e.g. 'Automation'.", max_length=100)),
+                ('summary', models.TextField(blank=True, help_text='Optional intro under the title. Left empty, the start of the body is used.')),
+                ('body', models.TextField(help_text='Article HTML. <h2>/<h3> headings make up the table of contents.')),
+                ('cover_image', models.ImageField(blank=True, null=True, upload_to='blog/')),
+                ('cover_image_width', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('cover_image_height', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('cover_image_placeholder', models.TextField(blank=True, editable=False)),
+                ('author_name', models.CharField(blank=True, max_length=100)),
+                ('author_title', models.CharField(blank=True, max_length=150)),
+                ('is_published', models.BooleanField(default=False)),
+                ('published_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Posts are listed newest first and stay hidden until this time.')),
+                ('excerpt', models.TextField(blank=True, editable=False)),
+                ('reading_time', models.PositiveSmallIntegerField(default=1, editable=False, help_text='Minutes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('services', models.ManyToManyField(blank=True, help_text='Services this post is about; used for related posts.', related_name='posts', to='services.service')),
+                ('sub_services', models.ManyToManyField(blank=True, help_text='Sub-services this post is about; weigh more than services for related posts.', related_name='posts', to='services.subservice')),
+            ],
+            options={
+                'verbose_name': 'Blog Post',
+                'verbose_name_plural': 'Blog Posts',
+                'ordering': ['-published_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='blog.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.post')),
+            ],
+            options={
+                'verbose_name': 'Related Post',
+                'verbose_name_plural': 'Related Posts',
+                'ordering': ['post', 'rank'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-published_at', '-id'], name='blog_post_published_keyset'),
+        ),
+        migrations.AddConstraint(
+            model_name='relatedpost',
+            constraint=models.UniqueConstraint(fields=('post', 'related'), name='blog_related_post_unique'),
+        ),
+    ]
@@ -0,0 +1,134 @@
+from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from services import images
+from services.catalog import ImageRef
+from services.models import Service, SubService
+
+from . import rendering
+
+
+class PostQuerySet(models.QuerySet):
+    def published(self, until=None):
+        """Posts that are live now, or that were by `until` if that is earlier."""
+        now = timezone.now()
+        return self.filter(is_published=True, published_at__lte=min(until, now) if until else now)
+
+
+class Post(models.Model):
+    title = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=220, unique=True, blank=True)
+    category = models.CharField(max_length=100, blank=True, help_text="Badge shown on cards, e.g. 'Automation'.")
+    summary = models.TextField(
+        blank=True,
+        help_text="Optional intro under the title. Left empty, the start of the body is used."
+    )
+    body = models.TextField(help_text="Article HTML. <h2>/<h3> headings make up the table of contents.")
+
+    cover_image = models.ImageField(upload_to='blog/', null=True, blank=True)
+    # Filled from the upload in save(), like ServiceDetails.short_section_image.
+    cover_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cover_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cover_image_placeholder = models.TextField(blank=True, editable=False)
+
+    author_name = models.CharField(max_length=100, blank=True)
+    author_title = models.CharField(max_length=150, blank=True)
+
+    services = models.ManyToManyField(
+        Service, blank=True, related_name='posts',
+        help_text="Services this post is about; used for related posts."
+    )
+    sub_services = models.ManyToManyField(
+        SubService, blank=True, related_name='posts',
+        help_text="Sub-services this post is about; weigh more than services for related posts."
+    )
+
+    is_published = models.BooleanField(default=False)
+    published_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Posts are listed newest first and stay hidden until this time."
+    )
+
+    # Computed in save()
+    excerpt = models.TextField(blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False, help_text="Minutes")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Blog Post"
+        verbose_name_plural = "Blog Posts"
+        ordering = ['-published_at', '-id']
+        indexes = [
+            # The listing walks (published_at, id) backwards from a cursor. Partial,
+            # because is_published=True compiles to a bare boolean term that
+            # SQLite can't match against a leading index column.
+            models.Index(
+                fields=['-published_at', '-id'], condition=models.Q(is_published=True),
+                name='blog_post_published_keyset',
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def get_absolute_url(self):
+        return reverse('blog_post', args=[self.slug])
+
+    @property
+    def cover(self):
+        if not self.cover_image:
+            return None
+        return ImageRef(
+            self.cover_image.name, self.cover_image.url,
+            self.cover_image_width, self.cover_image_height, self.cover_image_placeholder,
+        )
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            base_slug = slugify(self.title)
+            slug = base_slug
+            counter = 1
+            while Post.objects.filter(slug=slug).exists():
+                slug = f"{base_slug}-{counter}"
+                counter += 1
+            self.slug = slug
+
+        self.excerpt = rendering.excerpt(self.summary or self.body)
+        self.reading_time = rendering.reading_time(self.body)
+
+        image = self.cover_image
+        if not image:
+            self.cover_image_width = self.cover_image_height = None
+            self.cover_image_placeholder = ''
+        elif not image._committed:
+            (self.cover_image_width, self.cover_image_height,
+             self.cover_image_placeholder) = images.inspect(image)
+        super().save(*args, **kwargs)
+
+
+class RelatedPost(models.Model):
+    """
+    One entry of a post's precomputed related-posts list (blog/related.py),
+    so a post page reads its "related" box with one indexed lookup.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = "Related Post"
+        verbose_name_plural = "Related Posts"
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='blog_related_post_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} (#{self.rank})"
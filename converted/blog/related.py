@@ -0,0 +1,137 @@
+"""
+Precomputed related posts.
+
+Two published posts are related when they share services or sub-services:
+
+    score = 3 x shared sub-services + 2 x shared services
+
+and each post keeps its best BLOG['RELATED_POSTS'] as RelatedPost rows
+(ties go to the newer post). The lists are maintained on write, so a post
+page reads its related box with one indexed query however big the archive:
+
+  * the written post's own list is rebuilt;
+  * posts whose list contained it are rebuilt too, as it may have dropped
+    out (unpublished, unlinked, deleted);
+  * every other post sharing a link gets it merged in if it now beats the
+    weakest entry of that post's list.
+
+Writes are collected per thread and applied once the transaction commits
+(see blog/signals.py); `manage.py rebuild_related_posts` recomputes all of
+them, e.g. after a bulk import.
+"""
+import heapq
+import threading
+
+from django.db import transaction
+from django.db.models import Count
+
+from .conf import get_config
+from .models import Post, RelatedPost
+
+
+# (through model, column, weight)
+LINKS = (
+    (Post.sub_services.through, 'subservice_id', 3),
+    (Post.services.through, 'service_id', 2),
+)
+CHUNK_SIZE = 500
+
+_state = threading.local()
+
+
+def scores(post_id):
+    """({post id: score}, {post id: published_at}) of the published posts sharing a link with post_id."""
+    totals, dates = {}, {}
+    for through, column, weight in LINKS:
+        linked = through.objects.filter(post_id=post_id).values(column)
+        rows = (
+            through.objects.filter(**{f'{column}__in': linked}, post__is_published=True)
+            .exclude(post_id=post_id)
+            .values('post_id', 'post__published_at')
+            .annotate(shared=Count('pk'))
+        )
+        for row in rows:
+            totals[row['post_id']] = totals.get(row['post_id'], 0) + weight * row['shared']
+            dates[row['post_id']] = row['post__published_at']
+    return totals, dates
+
+
+def _write(post_id, entries):
+    """Replace a post's list with `entries`, [(score, published_at, related id)] best first."""
+    RelatedPost.objects.filter(post_id=post_id).delete()
+    RelatedPost.objects.bulk_create([
+        RelatedPost(post_id=post_id, related_id=related_id, rank=rank, score=score)
+        for rank, (score, _, related_id) in enumerate(entries, 1)
+    ])
+
+
+def rebuild(post_id, limit=None):
+    """Recompute one post's list from scratch. Returns its scores() result."""
+    limit = limit or get_config()['RELATED_POSTS']
+    totals, dates = scores(post_id)
+    best = heapq.nlargest(limit, ((score, dates[pk], pk) for pk, score in totals.items()))
+    _write(post_id, best)
+    return totals, dates
+
+
+def _lists(post_ids):
+    """{post id: [(score, published_at, related id)]} for the given posts' current lists."""
+    lists = {}
+    post_ids = list(post_ids)
+    for start in range(0, len(post_ids), CHUNK_SIZE):
+        rows = RelatedPost.objects.filter(post_id__in=post_ids[start:start + CHUNK_SIZE]).values_list(
+            'post_id', 'score', 'related__published_at', 'related_id',
+        )
+        for post_id, score, published_at, related_id in rows:
+            lists.setdefault(post_id, []).append((score, published_at, related_id))
+    return lists
+
+
+@transaction.atomic
+def update(post_id):
+    """Bring every list that post_id's current state affects up to date."""
+    limit = get_config()['RELATED_POSTS']
+    post = Post.objects.filter(pk=post_id).values('is_published', 'published_at').first()
+    referrers = set(RelatedPost.objects.filter(related_id=post_id).values_list('post_id', flat=True))
+    for referrer in referrers:
+        rebuild(referrer, limit)
+    if post is None:
+        return
+    if not post['is_published']:
+        RelatedPost.objects.filter(post_id=post_id).delete()
+        return
+
+    totals, _ = rebuild(post_id, limit)
+    others = [pk for pk in totals if pk not in referrers]
+    lists = _lists(others)
+    for other in others:
+        current = lists.get(other, [])
+        entry = (totals[other], post['published_at'], post_id)  # scores are symmetric
+        if len(current) < limit or entry > min(current):
+            _write(other, heapq.nlargest(limit, current + [entry]))
+
+
+def rebuild_all():
+    count = 0
+    for post_id in Post.objects.filter(is_published=True).values_list('pk', flat=True).iterator():
+        rebuild(post_id)
+        count += 1
+    RelatedPost.objects.filter(post__is_published=False).delete()
+    return count
+
+
+def schedule(post_id):
+    """update(post_id) once the current transaction commits, at most once per commit."""
+    pending = getattr(_state, 'pending', None)
+    if pending is None:
+        pending = _state.pending = set()
+    pending.add(post_id)
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    # Ids left behind by a rolled-back transaction are harmless: update() is idempotent.
+    pending = getattr(_state, 'pending', None) or set()
+    _state.pending = set()
+    for post_id in sorted(pending):
+        update(post_id)
@@ -0,0 +1,85 @@
+"""
+Text derived from a post's HTML body.
+
+Excerpts and reading times are computed once, in Post.save(). The article
+HTML is post-processed (heading anchors for the table of contents, lazy
+images) on first view and cached under the post's id and updated_at, so an
+edit starts a new entry and nothing ever has to be invalidated; stale
+entries just expire.
+"""
+import html as html_lib
+import math
+import re
+
+from django.core.cache import caches
+from django.utils.html import strip_tags
+from django.utils.text import Truncator, slugify
+
+from .conf import get_config
+
+
+HEADING_RE = re.compile(r'<(h[23])(\s[^>]*)?>(.*?)</\1\s*>', re.IGNORECASE | re.DOTALL)
+ID_RE = re.compile(r'\bid\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+IMG_RE = re.compile(r'<img\b(?![^>]*\bloading=)', re.IGNORECASE)
+BLOCK_TAG_RE = re.compile(
+    r'</?(?:p|div|br|h[1-6]|li|ul|ol|blockquote|pre|table|tr|td|th|figure|figcaption|section)\b[^>]*>',
+    re.IGNORECASE,
+)
+
+
+def plain_text(html):
+    # Block tags separate words: "<p>One.</p><p>Two</p>" is "One. Two".
+    text = strip_tags(BLOCK_TAG_RE.sub(' ', html))
+    return ' '.join(html_lib.unescape(text).split())
+
+
+def excerpt(html, words=None):
+    return Truncator(plain_text(html)).words(words or get_config()['EXCERPT_WORDS'])
+
+
+def reading_time(html):
+    """Minutes to read, at least one."""
+    return max(1, math.ceil(len(plain_text(html).split()) / get_config()['WORDS_PER_MINUTE']))
+
+
+def render_html(html):
+    """(html, table of contents) with an id on every h2/h3 and lazy-loading images."""
+    toc = []
+    used = set()
+
+    def anchor(match):
+        tag, attrs, inner = match.group(1).lower(), match.group(2) or '', match.group(3)
+        text = plain_text(inner)
+        existing = ID_RE.search(attrs)
+        if existing:
+            slug = existing.group(1)
+        else:
+            base = slugify(text) or 'section'
+            slug, number = base, 2
+            while slug in used:
+                slug, number = f'{base}-{number}', number + 1
+            attrs = f' id="{slug}"{attrs}'
+        used.add(slug)
+        toc.append({'level': int(tag[1]), 'id': slug, 'title': text})
+        return f'<{tag}{attrs}>{inner}</{tag}>'
+
+    html = HEADING_RE.sub(anchor, html)
+    html = IMG_RE.sub('<img loading="lazy" decoding="async"', html)
+    return html, toc
+
+
+def cache_key(post):
+    return f'blog:post:{post.pk}:{post.updated_at.timestamp():.6f}'
+
+
+def rendered(post):
+    """{'html': ..., 'toc': [...]} for a post, from the cache when this version was rendered before."""
+    config = get_config()
+    cache = caches[config['CACHE']]
+    key = cache_key(post)
+    entry = cache.get(key)
+    if entry is None:
+        html, toc = render_html(post.body)
+        entry = {'html': html, 'toc': toc}
+        cache.set(key, entry, config['RENDER_TIMEOUT'])
+    return entry
@@ -0,0 +1,44 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from services.models import Service, SubService
+
+from . import related
+from .models import Post, RelatedPost
+
+
+@receiver(post_save, sender=Post)
+def refresh_related_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        related.schedule(instance.pk)
+
+
+# The admin saves a post's services and sub-services after the post itself,
+# so the related lists are refreshed again once the links are in place.
+@receiver(m2m_changed, sender=Post.services.through)
+@receiver(m2m_changed, sender=Post.sub_services.through)
+def refresh_related_on_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        related.schedule(instance.pk)
+    else:  # changed from the Service / SubService side: pk_set holds post ids
+        for pk in pk_set or ():
+            related.schedule(pk)
+
+
+# The post's RelatedPost rows go with it (CASCADE), so the posts that listed
+# it are found now and refilled after the delete commits.
+@receiver(pre_delete, sender=Post)
+def refresh_referrers_on_delete(sender, instance, **kwargs):
+    for post_id in RelatedPost.objects.filter(related=instance).values_list('post_id', flat=True):
+        related.schedule(post_id)
+
+
+# Deleting a service or sub-service drops its link rows by cascade, which
+# sends no m2m_changed, so the posts that linked it are found now.
+@receiver(pre_delete, sender=Service)
+@receiver(pre_delete, sender=SubService)
+def refresh_linked_posts_on_delete(sender, instance, **kwargs):
+    for post_id in instance.posts.values_list('pk', flat=True):
+        related.schedule(post_id)
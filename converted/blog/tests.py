@@ -0,0 +1,188 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from services import sitemaps
+from services.models import Service, SubService
+
+from . import related, rendering
+from .models import Post, RelatedPost
+from .views import decode_cursor, encode_cursor
+
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blog-tests',
+    },
+}
+BODY = "<p>Intro paragraph.</p><h2>Why it matters</h2><p>{}</p><h3>Details</h3><img src=\"/x.png\"><h2>Why it matters</h2>"
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, METRICS={'ENABLED': False}, SLOW_QUERIES={'ENABLED': False},
+    BLOG={'PAGE_SIZE': 3, 'RELATED_POSTS': 2},
+)
+class BlogTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        sitemaps.reset()
+        # Services saved here rebuild the sitemaps once they commit.
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.enterContext(override_settings(SITEMAP_ROOT=root))
+
+    def make_post(self, title, days_ago=0, services=(), sub_services=(), **fields):
+        fields.setdefault('body', BODY.format('word ' * 10))
+        fields.setdefault('is_published', True)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title=title, published_at=timezone.now() - timedelta(days=days_ago), **fields)
+            post.services.set(services)
+            post.sub_services.set(sub_services)
+        return post
+
+
+class PostModelTests(BlogTestCase):
+    def test_excerpt_reading_time_and_slug_are_computed_on_save(self):
+        post = self.make_post("Scaling Support", body=BODY.format('word ' * 500))
+        self.assertEqual(post.slug, 'scaling-support')
+        self.assertEqual(post.reading_time, 3)  # ~506 words at 220 wpm
+        self.assertTrue(post.excerpt.startswith('Intro paragraph. Why it matters word'))
+        self.assertTrue(post.excerpt.endswith('…'))
+
+        post.summary = "A short <b>intro</b>."
+        post.save()
+        self.assertEqual(post.excerpt, "A short intro.")
+        self.assertEqual(self.make_post("Scaling Support").slug, 'scaling-support-1')
+
+    def test_rendered_html_gets_anchors_and_is_cached_per_version(self):
+        post = self.make_post("Anchors")
+        article = rendering.rendered(post)
+        self.assertIn('<h2 id="why-it-matters">', article['html'])
+        self.assertIn('<h2 id="why-it-matters-2">', article['html'])
+        self.assertIn('<img loading="lazy" decoding="async" src="/x.png">', article['html'])
+        self.assertEqual(
+            [(entry['level'], entry['id']) for entry in article['toc']],
+            [(2, 'why-it-matters'), (3, 'details'), (2, 'why-it-matters-2')],
+        )
+
+        post.body = "<h2>Changed</h2>"
+        self.assertEqual(rendering.rendered(post), article)  # same updated_at: served from the cache
+        post.save()
+        self.assertEqual(rendering.rendered(post)['toc'][0]['id'], 'changed')
+
+
+class PostListTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.posts = [self.make_post(f"Post {n}", days_ago=n) for n in range(8)]
+        self.make_post("Draft", is_published=False)
+        self.make_post("Scheduled", days_ago=-1)
+
+    def test_keyset_pages_cover_every_published_post_once(self):
+        seen = []
+        url = reverse('blog_list')
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(post.title for post in response.context['posts'])
+            url = response.context['next_url']
+        self.assertEqual(seen, [f"Post {n}" for n in range(8)])
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(reverse('blog_list'))
+        cursor = encode_cursor(self.posts[5])
+        with CaptureQueriesContext(connection) as deep:
+            response = self.client.get(reverse('blog_list'), {'before': cursor})
+        self.assertEqual([post.title for post in response.context['posts']], ["Post 6", "Post 7"])
+        self.assertEqual(len(first), len(deep))
+        self.assertNotIn('OFFSET', deep[0]['sql'])
+        self.assertNotIn('COUNT', deep[0]['sql'])
+        self.assertNotIn('"body"', deep[0]['sql'])
+
+    def test_cursor_round_trip_and_bad_cursors(self):
+        post = self.posts[3]
+        self.assertEqual(decode_cursor(encode_cursor(post)), (post.published_at, post.pk))
+        self.assertEqual(self.client.get(reverse('blog_list'), {'before': 'nonsense'}).status_code, 404)
+
+
+class RelatedPostTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seo = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        self.ads = Service.objects.create(service_name='Ads', short_description='x', is_active=True)
+        self.audit = SubService.objects.create(parent_service=self.seo, title='Audit')
+
+    def related_titles(self, post):
+        return [entry.related.title for entry in post.related_entries.select_related('related')]
+
+    def test_lists_are_maintained_on_write(self):
+        a = self.make_post("A", days_ago=3, services=[self.seo], sub_services=[self.audit])
+        b = self.make_post("B", days_ago=2, services=[self.seo])
+        c = self.make_post("C", days_ago=1, services=[self.ads])
+        self.assertEqual(self.related_titles(a), ["B"])
+        self.assertEqual(self.related_titles(c), [])
+
+        # D beats B for A (shares the sub-service) and joins B's list.
+        d = self.make_post("D", days_ago=4, services=[self.seo], sub_services=[self.audit])
+        self.assertEqual(self.related_titles(a), ["D", "B"])
+        self.assertEqual(self.related_titles(b), ["A", "D"])
+        self.assertEqual(RelatedPost.objects.get(post=a, related=d).score, 5)
+
+        # Unlinking D drops it everywhere; once B is deleted A has nothing left to list.
+        with self.captureOnCommitCallbacks(execute=True):
+            d.services.clear()
+            d.sub_services.clear()
+        self.assertEqual(self.related_titles(a), ["B"])
+        self.assertEqual(self.related_titles(b), ["A"])
+        with self.captureOnCommitCallbacks(execute=True):
+            b.delete()
+        self.assertEqual(self.related_titles(a), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            c.services.add(self.seo)
+        self.assertEqual(self.related_titles(a), ["C"])
+
+        RelatedPost.objects.all().delete()
+        self.assertEqual(related.rebuild_all(), 3)
+        self.assertEqual(self.related_titles(a), ["C"])
+
+    def test_lists_follow_deleted_services_and_sub_services(self):
+        a = self.make_post("A", days_ago=2, services=[self.seo], sub_services=[self.audit])
+        b = self.make_post("B", days_ago=1, services=[self.seo], sub_services=[self.audit])
+        c = self.make_post("C", services=[self.ads])
+        self.assertEqual(RelatedPost.objects.get(post=a, related=b).score, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.audit.delete()
+        self.assertEqual(RelatedPost.objects.get(post=a, related=b).score, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seo.delete()
+        self.assertEqual(self.related_titles(a), [])
+        self.assertEqual(self.related_titles(b), [])
+        self.assertEqual(self.related_titles(c), [])
+
+    def test_detail_page(self):
+        a = self.make_post("A", services=[self.seo], sub_services=[self.audit], summary="Summary.")
+        self.make_post("B", days_ago=1, services=[self.seo])
+        self.make_post("Hidden", days_ago=-1, services=[self.seo])  # scheduled: indexed, not shown
+
+        self.client.get(a.get_absolute_url())  # renders the article into the cache
+        with self.assertNumQueries(4):  # post, services, sub-services, related posts
+            response = self.client.get(a.get_absolute_url())
+        self.assertContains(response, '<h2 id="why-it-matters">')
+        self.assertContains(response, 'href="#details"')
+        self.assertContains(response, reverse('subservice_detail', args=['seo', 'audit']))
+        self.assertEqual([post.title for post in response.context['related_posts']], ["B"])
+
+        self.assertEqual(self.client.get(reverse('blog_post', args=['hidden'])).status_code, 404)
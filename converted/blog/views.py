@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlencode
+
+from django.db.models import Prefetch, Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils import timezone
+
+from services.models import SubService
+
+from . import rendering
+from .conf import get_config
+from .models import Post
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Listing cards never show the article itself.
+CARD_DEFERRED = ('body', 'summary')
+
+
+def encode_cursor(post):
+    """'<published_at in µs since the epoch>-<id>' of the last post on a page."""
+    delta = post.published_at - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}-{post.pk}"
+
+
+def decode_cursor(value):
+    micros, _, pk = value.partition('-')
+    try:
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (ValueError, OverflowError):
+        raise Http404("Invalid cursor.")
+
+
+def post_list(request):
+    """
+    Published posts, newest first, paged by a (published_at, id) cursor:
+    every page, however deep, is one range scan of the keyset index and no
+    COUNT(*).
+    """
+    size = get_config()['PAGE_SIZE']
+    cursor = request.GET.get('before')
+    if cursor:
+        published_at, pk = decode_cursor(cursor)
+        # published_at <= cursor is the only upper bound, so the index scan
+        # starts right at the cursor; the OR just skips its own timestamp's ties.
+        posts = Post.objects.published(until=published_at).filter(Q(published_at__lt=published_at) | Q(pk__lt=pk))
+    else:
+        posts = Post.objects.published()
+    page = list(posts.defer(*CARD_DEFERRED).order_by('-published_at', '-pk')[:size + 1])
+
+    next_url = None
+    if len(page) > size:
+        page = page[:size]
+        next_url = f"{reverse('blog_list')}?{urlencode({'before': encode_cursor(page[-1])})}"
+    if cursor and not page:
+        raise Http404("No posts before this cursor.")
+
+    context = {
+        "posts": page,
+        "featured": page[0] if page and not cursor else None,
+        "next_url": next_url,
+        "is_first_page": not cursor,
+    }
+    return render(request, "blog/post_list.html", context)
+
+
+def post_detail(request, slug):
+    post = get_object_or_404(
+        Post.objects.published().prefetch_related(
+            'services',
+            Prefetch('sub_services', queryset=SubService.objects.select_related('parent_service')),
+        ),
+        slug=slug,
+    )
+    related_posts = [
+        entry.related for entry in post.related_entries.filter(
+            related__is_published=True, related__published_at__lte=timezone.now(),
+        ).select_related('related').defer(*(f'related__{name}' for name in CARD_DEFERRED))
+    ]
+    article = rendering.rendered(post)
+
+    context = {
+        "post": post,
+        "article_html": article['html'],
+        "toc": article['toc'],
+        "services": [service for service in post.services.all() if service.is_active],
+        "sub_services": [
+            sub for sub in post.sub_services.all() if sub.is_active and sub.parent_service.is_active
+        ],
+        "related_posts": related_posts,
+    }
+    return render(request, "blog/post_detail.html", context)
@@ -1,7 +1,20 @@
+import json
+from datetime import datetime, time, timedelta
+
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+
+from . import profiling, rollups
+from .catalog import get_catalog
 from .models import Service,Contact,ServiceDetails, BulletPointServices,FAQ
-from django.contrib import admin
-from .models import SubService, SubServiceFeature
+from .models import SubService, SubServiceFeature, Testimonial
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
@@ -14,14 +27,191 @@ class ServiceAdmin(admin.ModelAdmin):
 
 
 
+CURSOR_VAR = 'cursor'
+LEAD_WINDOWS = (('1', 'Today', 1), ('7', 'Past 7 days', 7), ('30', 'Past 30 days', 30))
+DASHBOARD_WINDOWS = (7, 30, 90, 365)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist paged by a (created_at, id) cursor instead of OFFSET, with no
+    COUNT(*): each page is one indexed range scan however deep it is.
+    """
+    ordering = ['-created_at', '-pk']
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_ordering(self, request, queryset):
+        return list(self.ordering)
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing a filter or search always starts again from the newest lead.
+        new_params = {CURSOR_VAR: None, **(new_params or {})}
+        return super().get_query_string(new_params, remove)
+
+    def _parse_cursor(self, value):
+        direction, _, position = value.partition(':')
+        created, _, pk = position.rpartition('_')
+        try:
+            return direction, datetime.fromisoformat(created), int(pk)
+        except ValueError:
+            raise IncorrectLookupParameters(f"Invalid cursor {value!r}")
+
+    def _cursor(self, direction, contact):
+        return self.get_query_string({CURSOR_VAR: f"{direction}:{contact.created_at.isoformat()}_{contact.pk}"})
+
+    def get_results(self, request):
+        per_page = self.list_per_page
+        queryset = self.queryset
+        value = request.GET.get(CURSOR_VAR)
+        direction = None
+        if value:
+            direction, created, pk = self._parse_cursor(value)
+            if direction == 'before':
+                # Walk forwards from the cursor, then flip back into display order.
+                queryset = queryset.filter(
+                    Q(created_at__gt=created) | Q(created_at=created, pk__gt=pk)
+                ).order_by('created_at', 'pk')
+            else:
+                queryset = queryset.filter(Q(created_at__lt=created) | Q(created_at=created, pk__lt=pk))
+
+        rows = list(queryset[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == 'before':
+            rows.reverse()
+        has_newer = direction == 'after' or (direction == 'before' and has_more)
+        has_older = direction == 'before' or has_more
+
+        self.result_list = rows
+        self.result_count = len(rows)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = has_newer or has_older
+        self.paginator = None
+        self.newer_url = self._cursor('before', rows[0]) if has_newer and rows else None
+        self.older_url = self._cursor('after', rows[-1]) if has_older and rows else None
+        self.newest_url = self.get_query_string() if direction else None
+
+
+class LeadServiceFilter(admin.SimpleListFilter):
+    """Service filter whose counts come from the LeadRollup table."""
+    title = 'service interested'
+    parameter_name = 'service'
+
+    def lookups(self, request, model_admin):
+        counts = rollups.counts_by_service()
+        choices = [
+            (str(service.id), f"{service.service_name} ({counts.get(service.id, 0)})")
+            for service in get_catalog().services
+        ]
+        choices.append(('none', f"No service ({counts.get(None, 0)})"))
+        return choices
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == 'none':
+            return queryset.filter(service_interested__isnull=True)
+        if value:
+            return queryset.filter(service_interested_id=value)
+        return queryset
+
+
+class LeadReceivedFilter(admin.SimpleListFilter):
+    """Date filter whose counts come from the LeadRollup table."""
+    title = 'received'
+    parameter_name = 'received'
+
+    def lookups(self, request, model_admin):
+        return [
+            (value, f"{label} ({rollups.total(rollups.since_days(days))})")
+            for value, label, days in LEAD_WINDOWS
+        ]
+
+    def queryset(self, request, queryset):
+        days = {value: days for value, _, days in LEAD_WINDOWS}.get(self.value())
+        if days is None:
+            return queryset
+        start = datetime.combine(rollups.since_days(days), time.min, tzinfo=timezone.get_current_timezone())
+        return queryset.filter(created_at__gte=start)
+
+
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
     list_display = ('name','email','company','service_interested','page_source','created_at')
-    list_filter = ('service_interested','created_at')
+    list_filter = (LeadServiceFilter, LeadReceivedFilter)
+    list_select_related = ('service_interested',)
     search_fields = ('name','email','company','message','page_source')
     fieldsets = (('Contact Info',{'fields':('name','email','company')}),('Service & Source',{'fields':('service_interested','page_source','page_url')}),('Message Details',{'fields':('message','created_at')}))
-    ordering = ('-created_at',)
+    readonly_fields = ('created_at',)
     list_per_page = 25
+    # Paging is by cursor on (created_at, id), so the list can't be re-sorted
+    # and is never counted or faceted.
+    sortable_by = ()
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    change_list_template = 'admin/services/contact/change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {'lead_total': rollups.total(), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+
+    def get_urls(self):
+        urls = [
+            path(
+                'dashboard/',
+                self.admin_site.admin_view(self.dashboard_view),
+                name='services_contact_dashboard',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def dashboard_view(self, request):
+        """Lead counts by day, service and page source, read from LeadRollup only."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            days = int(request.GET.get('days', 30))
+        except ValueError:
+            days = 30
+        if days not in DASHBOARD_WINDOWS:
+            days = 30
+        since = rollups.since_days(days)
+
+        names = {s.id: s.service_name for s in get_catalog().services}
+
+        def label(service_id):
+            return names.get(service_id, 'No service')
+
+        per_day = {row['day']: row['count'] for row in rollups.breakdown('day', since=since)}
+        daily = [(since + timedelta(days=i), per_day.get(since + timedelta(days=i), 0)) for i in range(days)]
+        peak = max((count for _, count in daily), default=0) or 1
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.opts,
+            'title': 'Lead dashboard',
+            'days': days,
+            'windows': DASHBOARD_WINDOWS,
+            'total': sum(per_day.values()),
+            'all_time': rollups.total(),
+            'daily': [(day, count, round(count * 100 / peak)) for day, count in reversed(daily)],
+            'by_service': [(label(r['service']), r['count']) for r in rollups.breakdown('service', since=since)],
+            'by_source': [(r['page_source'] or '(none)', r['count']) for r in rollups.breakdown('page_source', since=since)],
+            'by_service_source': [
+                (label(r['service']), r['page_source'] or '(none)', r['count'])
+                for r in rollups.breakdown('service', 'page_source', since=since)[:20]
+            ],
+        }
+        return TemplateResponse(request, 'admin/services/contact/dashboard.html', context)
 
 
 class BulletPointInline(admin.TabularInline):
@@ -68,4 +258,63 @@ class FAQAdmin(admin.ModelAdmin):
     list_display = ('question', 'service', 'sub_service', 'is_active', 'order')
     list_filter = ('service', 'sub_service', 'is_active')
     search_fields = ('question', 'answer')
-    ordering = ('order',)
\ No newline at end of file
+    ordering = ('order',)
+
+
+@admin.register(Testimonial)
+class TestimonialAdmin(admin.ModelAdmin):
+    list_display = ('name', 'company', 'designation', 'is_active', 'order')
+    list_editable = ('is_active', 'order')
+    search_fields = ('name', 'company', 'message')
+    fields = ('name', 'designation', 'company', 'message', 'photo', 'photo_thumbnail', 'is_active', 'order')
+    readonly_fields = ('photo_thumbnail',)
+
+
+# Request profiles (services/profiling.py), served under admin/profiles/ for staff.
+
+def profile_reports_view(request):
+    """Stored profiles, newest first, and a form that issues a profiling token."""
+    token = profiling.make_token(request.user) if request.method == 'POST' else None
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'reports': profiling.list_reports(),
+        'token': token,
+        'param': profiling.PARAM,
+        'token_minutes': profiling.get_config()['TOKEN_MAX_AGE'] // 60,
+    }
+    return TemplateResponse(request, 'admin/services/profiles.html', context)
+
+
+def profile_report_view(request, report_id):
+    report_file = profiling.report_path(report_id)
+    if report_file is None:
+        raise Http404("No such profile.")
+    report = json.loads(report_file.read_text())
+    context = {
+        **admin.site.each_context(request),
+        'title': f"{report['method']} {report['path']}",
+        'report': report,
+        'slowest': sorted(report['sql'], key=lambda q: q['ms'], reverse=True),
+    }
+    return TemplateResponse(request, 'admin/services/profile_report.html', context)
+
+
+def profile_speedscope_view(request, report_id):
+    report_file = profiling.report_path(report_id, kind='speedscope')
+    if report_file is None:
+        raise Http404("No such profile.")
+    return FileResponse(
+        open(report_file, 'rb'), as_attachment=True, filename=report_file.name, content_type='application/json',
+    )
+
+
+profile_urls = [
+    path('', admin.site.admin_view(profile_reports_view), name='profile_reports'),
+    path('<str:report_id>/', admin.site.admin_view(profile_report_view), name='profile_report'),
+    path(
+        '<str:report_id>/speedscope.json',
+        admin.site.admin_view(profile_speedscope_view),
+        name='profile_speedscope',
+    ),
+]
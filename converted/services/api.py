@@ -0,0 +1,288 @@
+"""
+Read-only JSON API over the in-memory catalog (services/catalog.py).
+
+    GET api/services/                     active services, paged by cursor
+    GET api/services/<slug>/              one service with its details, bullet
+                                          points, sub-services and FAQs
+    GET api/services/<slug>/<sub_slug>/   one sub-service with its features and FAQs
+
+Every endpoint accepts ``fields=a,b`` to return only those top-level keys.
+The list takes ``limit`` and an opaque ``cursor`` (returned as ``next``).
+
+Responses carry a strong ETag built from the updated_at stamps of everything
+in the payload; writes to bullet points, features and FAQs touch their
+parent's updated_at (services/signals.py) so the stamps cover them too. A
+matching If-None-Match gets a 304. Serialized bodies are kept on the catalog
+snapshot, so each object is encoded once per catalog version.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from bisect import bisect_right
+from operator import attrgetter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .catalog import get_catalog
+
+
+DEFAULTS = {
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 100,
+    'MAX_AGE': 60,
+    # Encoded bodies kept per catalog snapshot (full objects and fields= variants).
+    'MAX_CACHED_BODIES': 2048,
+}
+
+SERVICE_SUMMARY_FIELDS = ('id', 'slug', 'service_name', 'short_description', 'icon_class', 'url', 'updated_at')
+SERVICE_FIELDS = SERVICE_SUMMARY_FIELDS + ('details', 'bullet_points', 'sub_services', 'faqs')
+SUBSERVICE_SUMMARY_FIELDS = ('id', 'slug', 'title', 'description', 'icon_class', 'color_theme', 'url', 'updated_at')
+SUBSERVICE_FIELDS = SUBSERVICE_SUMMARY_FIELDS + ('service', 'features', 'faqs')
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'CATALOG_API', {})}
+
+
+def _stamp(value):
+    return value.isoformat() if value else None
+
+
+def _faqs(entries):
+    return [{'question': f.question, 'answer': f.answer} for f in entries]
+
+
+def _active_subs(service):
+    return [sub for sub in service.sub_services if sub.is_active]
+
+
+def service_summary(service):
+    return {
+        'id': service.id,
+        'slug': service.slug,
+        'service_name': service.service_name,
+        'short_description': service.short_description,
+        'icon_class': service.icon_class,
+        'url': reverse('service_detail', args=[service.slug]),
+        'updated_at': _stamp(service.updated_at),
+    }
+
+
+def subservice_summary(sub):
+    return {
+        'id': sub.id,
+        'slug': sub.slug,
+        'title': sub.title,
+        'description': sub.description,
+        'icon_class': sub.icon_class,
+        'color_theme': sub.color_theme,
+        'url': reverse('subservice_detail', args=[sub.parent_service.slug, sub.slug]),
+        'updated_at': _stamp(sub.updated_at),
+    }
+
+
+def service_payload(service):
+    details = service.details
+    payload = service_summary(service)
+    payload['details'] = details and {
+        'hero_h1': details.hero_h1,
+        'hero_tagline': details.hero_tagline,
+        'short_section_title': details.short_section_title,
+        'short_section_details': details.short_section_details,
+        'short_section_image': details.short_section_image and details.short_section_image.url,
+        'updated_at': _stamp(details.updated_at),
+    }
+    payload['bullet_points'] = [
+        {'title': b.title, 'description': b.description} for b in (details.bullet_points if details else ())
+    ]
+    payload['sub_services'] = [subservice_summary(sub) for sub in _active_subs(service)]
+    payload['faqs'] = _faqs(service.faqs)
+    return payload
+
+
+def subservice_payload(sub):
+    payload = subservice_summary(sub)
+    payload['service'] = {'slug': sub.parent_service.slug, 'service_name': sub.parent_service.service_name}
+    payload['features'] = [f.text for f in sub.features]
+    payload['faqs'] = _faqs(sub.faqs)
+    return payload
+
+
+def service_stamps(service):
+    details = service.details
+    return (
+        service.id, _stamp(service.updated_at), _stamp(details and details.updated_at),
+        *((sub.id, _stamp(sub.updated_at)) for sub in _active_subs(service)),
+    )
+
+
+def subservice_stamps(sub):
+    return (sub.id, _stamp(sub.updated_at), _stamp(sub.parent_service.updated_at))
+
+
+def parse_fields(request, allowed):
+    value = request.GET.get('fields')
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise BadRequest(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(allowed)}.")
+    return fields
+
+
+def _select(payload, fields):
+    return payload if fields is None else {name: payload[name] for name in fields}
+
+
+def _memo(catalog, key, build):
+    """Per-snapshot memo; bounded so client-chosen keys can't grow it forever."""
+    memo = catalog.api_payloads
+    try:
+        return memo[key]
+    except KeyError:
+        value = build()
+        if len(memo) < get_config()['MAX_CACHED_BODIES']:
+            memo[key] = value
+        return value
+
+
+def _etag(*parts):
+    return '"%s"' % hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def _json_response(request, etag, body):
+    """`body` is called only when the client's copy (If-None-Match) is out of date."""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body(), content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=get_config()['MAX_AGE'])
+    return response
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _encode(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_cursor(name):
+    return base64.urlsafe_b64encode(name.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode('utf-8')
+    except (binascii.Error, UnicodeDecodeError):
+        raise BadRequest("Invalid cursor.")
+
+
+def _limit(request, config):
+    value = request.GET.get('limit')
+    if value is None:
+        return config['PAGE_SIZE']
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest("limit must be an integer.")
+    if not 1 <= limit <= config['MAX_PAGE_SIZE']:
+        raise BadRequest(f"limit must be between 1 and {config['MAX_PAGE_SIZE']}.")
+    return limit
+
+
+def _active_services(catalog):
+    """Active services sorted in Python, so bisect agrees with the order."""
+    def build():
+        services = sorted((s for s in catalog.services if s.is_active), key=attrgetter('service_name'))
+        return services, [s.service_name for s in services]
+    return _memo(catalog, ('active',), build)
+
+
+@require_safe
+def service_list(request):
+    config = get_config()
+    catalog = get_catalog()
+    try:
+        fields = parse_fields(request, SERVICE_SUMMARY_FIELDS)
+        limit = _limit(request, config)
+        cursor = request.GET.get('cursor')
+        services, names = _active_services(catalog)
+        start = bisect_right(names, decode_cursor(cursor)) if cursor else 0
+    except BadRequest as exc:
+        return _error(str(exc), 400)
+
+    page = services[start:start + limit]
+    has_next = start + limit < len(services)
+    etag = _etag('services', fields, limit, [(s.id, _stamp(s.updated_at)) for s in page], has_next)
+
+    def build():
+        next_url = None
+        if has_next:
+            params = {'cursor': encode_cursor(page[-1].service_name), 'limit': limit}
+            if fields:
+                params['fields'] = ','.join(fields)
+            next_url = f"{request.path}?{urlencode(params)}"
+        results = [
+            _select(_memo(catalog, ('service-summary', s.id), lambda s=s: service_summary(s)), fields)
+            for s in page
+        ]
+        return _encode({'results': results, 'next': next_url})
+
+    return _json_response(
+        request, etag, lambda: _memo(catalog, ('body', 'services', start, limit, fields), build),
+    )
+
+
+@require_safe
+def service(request, slug):
+    catalog = get_catalog()
+    entry = catalog.service(slug)
+    if entry is None or not entry.is_active:
+        return _error("Service not found.", 404)
+    try:
+        fields = parse_fields(request, SERVICE_FIELDS)
+    except BadRequest as exc:
+        return _error(str(exc), 400)
+
+    def build():
+        payload = _memo(catalog, ('service', entry.id), lambda: service_payload(entry))
+        return _encode(_select(payload, fields))
+
+    return _json_response(
+        request, _etag('service', fields, service_stamps(entry)),
+        lambda: _memo(catalog, ('body', 'service', entry.id, fields), build),
+    )
+
+
+@require_safe
+def subservice(request, service_slug, subservice_slug):
+    catalog = get_catalog()
+    entry = catalog.subservice(service_slug, subservice_slug)
+    if entry is None or not entry.is_active or not entry.parent_service.is_active:
+        return _error("Sub-service not found.", 404)
+    try:
+        fields = parse_fields(request, SUBSERVICE_FIELDS)
+    except BadRequest as exc:
+        return _error(str(exc), 400)
+
+    def build():
+        payload = _memo(catalog, ('subservice', entry.id), lambda: subservice_payload(entry))
+        return _encode(_select(payload, fields))
+
+    return _json_response(
+        request, _etag('subservice', fields, subservice_stamps(entry)),
+        lambda: _memo(catalog, ('body', 'subservice', entry.id, fields), build),
+    )
@@ -0,0 +1,268 @@
+"""
+Per-process, read-only snapshot of the service catalog.
+
+The catalog (Services with their details and bullet points, SubServices with
+their features, FAQs, homepage testimonials) is small and read on every public page, so each worker
+keeps an immutable copy in memory and the views read straight from it.
+
+Freshness comes from a single version number stored in the shared cache
+(settings.CATALOG['CACHE']). Every catalog write bumps it once its transaction
+commits (services/signals.py). Workers compare it with the version of their
+snapshot at most once every CHECK_INTERVAL seconds and rebuild when it moved,
+so in steady state a catalog page costs no SQL at all.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import (
+    FAQ, BulletPointServices, Service, ServiceDetails, SubService, SubServiceFeature, Testimonial,
+)
+
+
+DEFAULTS = {
+    'CACHE': 'default',
+    # Seconds between version checks; 0 checks on every access.
+    'CHECK_INTERVAL': 1.0,
+}
+VERSION_KEY = 'catalog:version'
+
+BulletPoint = namedtuple('BulletPoint', 'title description order')
+Feature = namedtuple('Feature', 'text order')
+FAQEntry = namedtuple('FAQEntry', 'id question answer order')
+# width/height/placeholder feed {% lazy_image %}; unknown for older uploads.
+ImageRef = namedtuple('ImageRef', 'name url width height placeholder', defaults=(None, None, ''))
+TestimonialEntry = namedtuple('TestimonialEntry', 'name designation company message photo')
+
+
+class ServiceEntry:
+    __slots__ = (
+        'id', 'service_name', 'slug', 'short_description', 'icon_class',
+        'is_active', 'updated_at', 'details', 'sub_services', 'faqs',
+    )
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __str__(self):
+        return self.service_name
+
+
+class DetailsEntry:
+    __slots__ = (
+        'hero_h1', 'hero_tagline', 'short_section_title', 'short_section_details',
+        'short_section_image', 'updated_at', 'bullet_points',
+    )
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    # Same title splitting the templates rely on for ServiceDetails.
+    split_short_title = property(ServiceDetails.split_short_title.fget)
+    split_hero_h1 = property(ServiceDetails.split_hero_h1.fget)
+
+
+class SubServiceEntry:
+    __slots__ = (
+        'id', 'title', 'slug', 'description', 'icon_class', 'color_theme',
+        'is_active', 'order', 'updated_at', 'parent_service', 'features', 'faqs',
+    )
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __str__(self):
+        return self.title
+
+
+class Catalog:
+    __slots__ = (
+        'version', 'services', 'services_by_slug', 'subservices_by_slug',
+        'active_service_choices', 'active_service_ids', 'testimonials',
+        # Serialized JSON API payloads, filled lazily by services/api.py.
+        'api_payloads',
+    )
+
+    def service(self, slug):
+        return self.services_by_slug.get(slug)
+
+    def subservice(self, service_slug, subservice_slug):
+        sub = self.subservices_by_slug.get(subservice_slug)
+        if sub is None or sub.parent_service.slug != service_slug:
+            return None
+        return sub
+
+
+def _image(field_file, width=None, height=None, placeholder=''):
+    return ImageRef(field_file.name, field_file.url, width, height, placeholder) if field_file else None
+
+
+def _group(rows, key):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(key(row), []).append(row)
+    return grouped
+
+
+def build(version=None):
+    """Load the whole catalog from the database (six queries)."""
+    bullets = _group(BulletPointServices.objects.order_by('order'), lambda b: b.details_id)
+    features = _group(SubServiceFeature.objects.order_by('order'), lambda f: f.sub_service_id)
+    faqs = _group(FAQ.objects.filter(is_active=True), lambda f: (f.service_id, f.sub_service_id))
+
+    def faq_entries(service_id=None, sub_service_id=None):
+        return tuple(
+            FAQEntry(f.id, f.question, f.answer, f.order)
+            for f in faqs.get((service_id, sub_service_id), ())
+        )
+
+    services = []
+    by_id = {}
+    for service in Service.objects.select_related('details').order_by('service_name'):
+        details = getattr(service, 'details', None)
+        if details is not None:
+            details = DetailsEntry(
+                hero_h1=details.hero_h1,
+                hero_tagline=details.hero_tagline,
+                short_section_title=details.short_section_title,
+                short_section_details=details.short_section_details,
+                short_section_image=_image(
+                    details.short_section_image,
+                    details.short_section_image_width,
+                    details.short_section_image_height,
+                    details.short_section_image_placeholder,
+                ),
+                updated_at=details.updated_at,
+                bullet_points=tuple(
+                    BulletPoint(b.title, b.description, b.order) for b in bullets.get(details.id, ())
+                ),
+            )
+        entry = ServiceEntry(
+            id=service.id,
+            service_name=service.service_name,
+            slug=service.slug,
+            short_description=service.short_description,
+            icon_class=service.icon_class,
+            is_active=service.is_active,
+            updated_at=service.updated_at,
+            details=details,
+            faqs=faq_entries(service_id=service.id),
+        )
+        services.append(entry)
+        by_id[service.id] = entry
+
+    sub_services = {}
+    subservices_by_slug = {}
+    for sub in SubService.objects.order_by('parent_service_id', 'order'):
+        parent = by_id[sub.parent_service_id]
+        entry = SubServiceEntry(
+            id=sub.id,
+            title=sub.title,
+            slug=sub.slug,
+            description=sub.description,
+            icon_class=sub.icon_class,
+            color_theme=sub.color_theme,
+            is_active=sub.is_active,
+            order=sub.order,
+            updated_at=sub.updated_at,
+            parent_service=parent,
+            features=tuple(Feature(f.text, f.order) for f in features.get(sub.id, ())),
+            faqs=faq_entries(sub_service_id=sub.id),
+        )
+        sub_services.setdefault(parent.id, []).append(entry)
+        subservices_by_slug[sub.slug] = entry
+
+    for entry in services:
+        entry.sub_services = tuple(sub_services.get(entry.id, ()))
+
+    catalog = Catalog()
+    catalog.version = version
+    catalog.api_payloads = {}
+    catalog.services = tuple(services)
+    catalog.services_by_slug = {s.slug: s for s in services}
+    catalog.subservices_by_slug = subservices_by_slug
+    catalog.active_service_choices = tuple((s.id, s.service_name) for s in services if s.is_active)
+    catalog.active_service_ids = frozenset(pk for pk, _ in catalog.active_service_choices)
+    catalog.testimonials = tuple(
+        TestimonialEntry(
+            t.name, t.designation, t.company, t.message,
+            # Templates use t.photo.url; serve the 96px crop when there is one.
+            _image(t.photo_thumbnail, t.THUMBNAIL_SIZE, t.THUMBNAIL_SIZE, t.photo_placeholder)
+            or _image(t.photo),
+        )
+        for t in Testimonial.objects.filter(is_active=True)
+    )
+    return catalog
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'CATALOG', {})}
+
+
+def _version_cache():
+    return caches[_config()['CACHE']]
+
+
+def current_version():
+    cache = _version_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Cache was flushed or never seeded: start a fresh, unique version so
+        # every worker's snapshot is treated as out of date.
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Invalidate every worker's snapshot. Call after the write has committed."""
+    cache = _version_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_catalog():
+    global _snapshot, _checked_at
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - _checked_at < _config()['CHECK_INTERVAL']:
+        return snapshot
+
+    version = current_version()
+    if snapshot is not None and snapshot.version == version:
+        _checked_at = now
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = build(version)
+        _checked_at = now
+        return _snapshot
+
+
+def reset():
+    """Drop this process's snapshot (tests, or after a bulk import)."""
+    global _snapshot
+    _snapshot = None
+
+
+def active_service_choices():
+    """(id, service_name) pairs for every active service, ordered by name."""
+    return get_catalog().active_service_choices
+
+
+def active_service_ids():
+    return get_catalog().active_service_ids
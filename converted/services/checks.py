@@ -0,0 +1,50 @@
+"""
+System checks for settings that only work with a single process.
+
+The catalog version counter (services/catalog.py), the contact-form token
+buckets (services/throttling.py) and the page cache that `manage.py
+warm_cache` fills (services/page_cache.py) are shared between workers through
+a Django cache. LocMemCache is private to one process: an admin edit handled
+by one worker would never invalidate the others' catalog snapshots, each
+worker would throttle on its own and a warmed page would vanish with the
+command. Fine for runserver, wrong behind a pre-fork server.
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+from . import catalog, page_cache, throttling
+
+
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def is_process_local(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') == LOCMEM_BACKEND
+
+
+def shared_cache_users():
+    """{cache alias: [what relies on it being shared between processes]}."""
+    users = {}
+    for alias, user in (
+        (catalog._config()['CACHE'], 'the catalog version (CATALOG)'),
+        (throttling.get_config()['CACHE'], 'contact form throttling (CONTACT_THROTTLE)'),
+        (page_cache.get_config()['CACHE'], 'the page cache and warm_cache (PAGE_CACHE)'),
+    ):
+        users.setdefault(alias, []).append(user)
+    return users
+
+
+@register('caches')
+def check_shared_caches(app_configs, **kwargs):
+    if settings.DEBUG:
+        return []
+    return [
+        Error(
+            f"Cache '{alias}' is a LocMemCache, which every worker process keeps to itself, "
+            f"but {', '.join(users)} must be shared between workers.",
+            hint="Use a cross-process backend for it: FileBasedCache, DatabaseCache, Redis or Memcached.",
+            id='services.E001',
+        )
+        for alias, users in shared_cache_users().items()
+        if is_process_local(alias)
+    ]
@@ -0,0 +1,447 @@
+"""
+HTML minification and Brotli/gzip response compression.
+
+CompressionMiddleware minifies text/html responses and then compresses any
+text-like response with the best encoding the client accepts: Brotli
+(optional 'brotli' package) or gzip, at the levels in settings.COMPRESSION.
+Streamed responses are minified and compressed chunk by chunk, and every
+chunk is flushed, so the early flushes of services/streaming.py still reach
+the browser early. Images, fonts, archives and anything that already has a
+Content-Encoding are passed through untouched.
+
+Minification only collapses whitespace runs (to one space, or one newline
+when the run had one) and drops HTML comments. Browsers render collapsed
+whitespace identically outside <pre>, <textarea>, <script> and <style>,
+whose contents are copied verbatim.
+
+Pages kept by services/page_cache.py are minified and compressed once, when
+they are stored (encode_for_cache()); a replay carries those bodies and this
+middleware only picks the one the client accepts.
+
+Strong ETags stay strong: the encoding is appended ("abc" -> "abc-br") and
+stripped again from If-None-Match before the view sees it, so conditional
+requests keep working (services/api.py).
+"""
+import codecs
+import random
+import re
+import string
+from gzip import GzipFile
+from io import BytesIO
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .middleware import is_sessionless
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip is used without it
+    brotli = None
+
+
+DEFAULTS = {
+    'MINIFY': True,
+    'BROTLI_LEVEL': 5,      # 0-11; 4-6 is the usual sweet spot for dynamic pages
+    'GZIP_LEVEL': 6,        # 1-9
+    'MIN_LENGTH': 200,      # smaller bodies aren't worth compressing
+    # Random gzip header padding for responses that may hold per-user secrets
+    # (BREACH), as django.middleware.gzip does. Brotli has no such field, so
+    # those responses only ever get gzip.
+    'MAX_RANDOM_BYTES': 100,
+}
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml',
+    'application/rss+xml', 'application/atom+xml', 'application/manifest+json',
+    'image/svg+xml',
+)
+ENCODINGS = ('br', 'gzip')
+MIDDLEWARE = 'services.compression.CompressionMiddleware'
+
+PROTECTED_TAGS = ('pre', 'textarea', 'script', 'style')
+# The lookahead needs the character after the tag name, so "<pre" at the very
+# end of a chunk waits for more input instead of matching the start of "<preload".
+SPECIAL_RE = re.compile(r'<(?:(pre|textarea|script|style)(?=[\s/>])|(!--))', re.IGNORECASE)
+# Only these count as whitespace; U+00A0 (&nbsp;) must survive.
+OTHER_WHITESPACE_RE = re.compile(r'[\t\r\f]')
+CLOSE_RES = {tag: re.compile(rf'</{tag}[^>]*>', re.IGNORECASE) for tag in PROTECTED_TAGS}
+# Longest prefix of a special opening ("<textarea") that could be cut by a chunk.
+HOLD_BACK = max(len(tag) for tag in PROTECTED_TAGS) + 1
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'COMPRESSION', {})}
+
+
+def _squeeze_spaces(text):
+    if '  ' not in text:
+        return text
+    inner = ' '.join(filter(None, text.split(' ')))
+    if not inner:
+        return ' '
+    return (' ' if text[0] == ' ' else '') + inner + (' ' if text[-1] == ' ' else '')
+
+
+def collapse_whitespace(text):
+    """
+    Replace each whitespace run with '\n' if it contains a newline, else ' '.
+    Built from str.split/join rather than a regex over every character, which
+    is several times faster on indentation-heavy templates.
+    """
+    if '\t' in text or '\r' in text or '\f' in text:
+        text = OTHER_WHITESPACE_RE.sub(' ', text)
+    if '\n' not in text:
+        return _squeeze_spaces(text)
+    lines = [line.strip(' ') for line in text.split('\n')]
+    body = '\n'.join([_squeeze_spaces(line) for line in lines if line])
+    if not body:
+        return '\n'
+    head = '\n' if not lines[0] else (' ' if text[0] == ' ' else '')
+    tail = '\n' if not lines[-1] else (' ' if text[-1] == ' ' else '')
+    return head + body + tail
+
+
+class HTMLMinifier:
+    """
+    Incremental whitespace minifier: feed() chunks of HTML as they are
+    produced, close() at the end. Output never depends on where the input was
+    split, because anything that could continue in the next chunk (a
+    whitespace run, the start of a tag or comment) is held back.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.protected = None  # tag whose contents we're copying verbatim
+        self.after_space = False  # output so far ends in collapsed whitespace
+
+    def feed(self, text):
+        self.buffer += text
+        return self._process(final=False)
+
+    def close(self):
+        return self._process(final=True)
+
+    def _text(self, text):
+        text = collapse_whitespace(text)
+        if self.after_space and text[:1] in (' ', '\n'):
+            # Whitespace on both sides of a dropped comment.
+            text = text[1:]
+        if text:
+            self.after_space = text[-1] in (' ', '\n')
+        return text
+
+    def _markup(self, text):
+        if text:
+            self.after_space = False
+        return text
+
+    def _process(self, final):
+        out = []
+        while self.buffer:
+            if self.protected:
+                close = CLOSE_RES[self.protected].search(self.buffer)
+                if close is None:
+                    # Copy all but a possible partial closing tag.
+                    keep = 0 if final else HOLD_BACK + 1
+                    cut = max(len(self.buffer) - keep, 0)
+                    out.append(self._markup(self.buffer[:cut]))
+                    self.buffer = self.buffer[cut:]
+                    break
+                out.append(self._markup(self.buffer[:close.end()]))
+                self.buffer = self.buffer[close.end():]
+                self.protected = None
+                continue
+
+            match = SPECIAL_RE.search(self.buffer)
+            if match is None:
+                cut = len(self.buffer) if final else self._safe_cut()
+                out.append(self._text(self.buffer[:cut]))
+                self.buffer = self.buffer[cut:]
+                break
+
+            out.append(self._text(self.buffer[:match.start()]))
+            self.buffer = self.buffer[match.start():]
+            if match.group(1):
+                self.protected = match.group(1).lower()
+                continue
+
+            end = self.buffer.find('-->')
+            if end == -1:
+                if final:
+                    out.append(self._markup(self.buffer))
+                    self.buffer = ''
+                break
+            comment = self.buffer[:end + 3]
+            if comment.startswith('<!--[if') or comment.startswith('<!--<!'):
+                out.append(self._markup(comment))  # conditional comments are markup
+            self.buffer = self.buffer[end + 3:]
+        return ''.join(out)
+
+    def _safe_cut(self):
+        cut = len(self.buffer.rstrip(' \t\n\r\f'))
+        tag = self.buffer.rfind('<', max(cut - HOLD_BACK, 0), cut)
+        return tag if tag != -1 else cut
+
+
+def minify_html(text):
+    minifier = HTMLMinifier()
+    return minifier.feed(text) + minifier.close()
+
+
+class _StreamBuffer(BytesIO):
+    def read(self):
+        data = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return data
+
+
+def _random_filename(max_bytes):
+    length = random.randint(1, max_bytes)
+    return ''.join(random.choices(string.ascii_letters, k=length))
+
+
+class Encoder:
+    """
+    Streaming compressor for one response. compress() returns everything
+    needed to decode the data given so far; finish() ends the stream.
+    """
+
+    def __init__(self, encoding, config, padding=False):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=config['BROTLI_LEVEL'])
+        else:
+            self._buffer = _StreamBuffer()
+            filename = _random_filename(config['MAX_RANDOM_BYTES']) if padding else None
+            self._gzip = GzipFile(
+                filename=filename, mode='wb', fileobj=self._buffer,
+                compresslevel=config['GZIP_LEVEL'], mtime=0,
+            )
+
+    def compress(self, data, flush=True):
+        if self.encoding == 'br':
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        self._gzip.write(data)
+        if flush:
+            self._gzip.flush()
+        return self._buffer.read()
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._brotli.finish()
+        self._gzip.close()
+        return self._buffer.read()
+
+
+def compress_bytes(data, encoding, config=None, padding=False):
+    encoder = Encoder(encoding, config or get_config(), padding)
+    return encoder.compress(data, flush=False) + encoder.finish()
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(request):
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    wildcard = accepted.get('*', 0.0)
+    candidates = []
+    for encoding in ENCODINGS:
+        if encoding == 'br' and (brotli is None or not is_sessionless(request)):
+            continue
+        q = accepted.get(encoding, wildcard)
+        if q > 0:
+            candidates.append((q, -ENCODINGS.index(encoding), encoding))
+    return max(candidates)[2] if candidates else None
+
+
+def _is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return (
+        content_type.startswith(COMPRESSIBLE_TYPES)
+        and not response.has_header('Content-Encoding')
+        and 'no-transform' not in response.get('Cache-Control', '')
+    )
+
+
+def _is_html(response):
+    return response.get('Content-Type', '').split(';')[0].strip().lower() == 'text/html'
+
+
+def _wrap_stream(response, transform, finish):
+    """Apply transform(chunk) -> bytes to each streamed chunk, then finish()."""
+    original = response.streaming_content
+    if response.is_async:
+        async def wrapper():
+            async for chunk in original:
+                data = transform(chunk)
+                if data:
+                    yield data
+            data = finish()
+            if data:
+                yield data
+    else:
+        def wrapper():
+            for chunk in original:
+                data = transform(chunk)
+                if data:
+                    yield data
+            data = finish()
+            if data:
+                yield data
+    response.streaming_content = wrapper()
+
+
+def _minify_response(response):
+    charset = response.charset
+    if not response.streaming:
+        try:
+            text = response.content.decode(charset)
+        except UnicodeDecodeError:
+            return
+        response.content = minify_html(text).encode(charset)
+        return
+
+    decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    minifier = HTMLMinifier()
+    _wrap_stream(
+        response,
+        lambda chunk: minifier.feed(decoder.decode(chunk)).encode(charset),
+        lambda: minifier.feed(decoder.decode(b'', final=True)).encode(charset) + minifier.close().encode(charset),
+    )
+
+
+def encode_for_cache(content, headers, config=None):
+    """
+    What a cache should keep of a response this middleware would minify and
+    compress on every replay: (minified content, {encoding: compressed body}).
+    Variants no smaller than the content are left out, as they would be live.
+    Only for session-free responses: the gzip variant has no BREACH padding.
+    """
+    config = config or get_config()
+    response = HttpResponse(content, headers=headers)
+    if not _is_compressible(response):
+        return content, {}
+    if config['MINIFY'] and _is_html(response):
+        _minify_response(response)
+    content = response.content
+    variants = {}
+    if len(content) >= config['MIN_LENGTH']:
+        for encoding in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            compressed = compress_bytes(content, encoding, config)
+            if len(compressed) < len(content):
+                variants[encoding] = compressed
+    return content, variants
+
+
+def _compress_response(response, encoding, config, padding):
+    if not response.streaming:
+        compressed = compress_bytes(response.content, encoding, config, padding)
+        if len(compressed) >= len(response.content):
+            return False
+        response.content = compressed
+        return True
+
+    encoder = Encoder(encoding, config, padding)
+    _wrap_stream(response, encoder.compress, encoder.finish)
+    return True
+
+
+def _tag_etag(response, suffix):
+    etag = response.get('ETag')
+    if etag and etag.startswith('"') and etag.endswith('"'):
+        response['ETag'] = f'{etag[:-1]}-{suffix}"'
+
+
+def _untag_if_none_match(request):
+    """Strip our "-br"/"-gzip" ETag suffixes so views compare plain ETags."""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return None
+    suffixes = tuple(f'-{encoding}"' for encoding in ENCODINGS)
+    tags = []
+    found = None
+    for tag in header.split(','):
+        tag = tag.strip()
+        for suffix in suffixes:
+            if tag.endswith(suffix):
+                found = suffix[1:-1]
+                tag = tag[:-len(suffix)] + '"'
+                break
+        tags.append(tag)
+    request.META['HTTP_IF_NONE_MATCH'] = ', '.join(tags)
+    return found
+
+
+class CompressionMiddleware:
+    """
+    Minify HTML and compress text responses; see the module docstring.
+    Goes near the top of MIDDLEWARE so it sees the final response body.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        revalidated = _untag_if_none_match(request)
+        response = self.get_response(request)
+        return self.process_response(request, response, revalidated)
+
+    def process_response(self, request, response, revalidated=None):
+        if response.status_code == 304:
+            if revalidated:
+                _tag_etag(response, revalidated)
+            return response
+
+        config = get_config()
+        if not _is_compressible(response):
+            return response
+        # Set on page cache replays: the body is minified, these are its encodings.
+        variants = getattr(response, 'encoded_variants', None)
+        if config['MINIFY'] and _is_html(response) and variants is None:
+            _minify_response(response)
+        if not response.streaming and len(response.content) < config['MIN_LENGTH']:
+            self._set_length(response)
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request)
+        padding = not is_sessionless(request)
+        if variants is not None and not padding:
+            if encoding in variants:
+                response.content = variants[encoding]
+                response['Content-Encoding'] = encoding
+                _tag_etag(response, encoding)
+        elif encoding and _compress_response(response, encoding, config, padding):
+            response['Content-Encoding'] = encoding
+            _tag_etag(response, encoding)
+        self._set_length(response)
+        return response
+
+    def _set_length(self, response):
+        if response.streaming:
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            response['Content-Length'] = str(len(response.content))
@@ -1,31 +1,63 @@
 from django import forms
+
+from .catalog import active_service_choices, active_service_ids
 from .models import Contact
 
+INPUT_CLASSES = 'w-full px-4 py-3 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-secondary'
+
+
+def _service_choices():
+    return [('', 'Select a service'), *active_service_choices()]
+
+
+class ActiveServiceField(forms.TypedChoiceField):
+    """
+    Service picker validated against the cached set of active service ids.
+
+    A ModelChoiceField would run a Service query on every submission just to
+    check the id; this field never touches the database and cleans to the
+    integer primary key (or None).
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('required', False)
+        super().__init__(choices=_service_choices, coerce=int, empty_value=None, **kwargs)
+
+    def valid_value(self, value):
+        try:
+            return int(value) in active_service_ids()
+        except (TypeError, ValueError):
+            return False
+
+
 class ContactForm(forms.ModelForm):
+    service_interested = ActiveServiceField(
+        widget=forms.Select(attrs={'class': INPUT_CLASSES}),
+    )
+
     class Meta:
         model = Contact
-        fields = ['name', 'email', 'company', 'service_interested', 'message']
+        # service_interested is handled by ActiveServiceField above and saved
+        # as a raw id, so the model form never looks the Service up.
+        fields = ['name', 'email', 'company', 'message']
         widgets = {
             'name': forms.TextInput(attrs={
-                'class': 'w-full px-4 py-3 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-secondary',
+                'class': INPUT_CLASSES,
                 'placeholder': 'Your Name',
                 'required': True,
             }),
             'email': forms.EmailInput(attrs={
-                'class': 'w-full px-4 py-3 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-secondary',
+                'class': INPUT_CLASSES,
                 'placeholder': 'Your Email',
                 'required': True,
             }),
             'company': forms.TextInput(attrs={
-                'class': 'w-full px-4 py-3 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-secondary',
+                'class': INPUT_CLASSES,
                 'placeholder': 'Your Company (optional)',
             }),
-            'service_interested': forms.Select(attrs={
-                'class': 'w-full px-4 py-3 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-secondary',
-            }),
             'message': forms.Textarea(attrs={
                 'rows': 4,
-                'class': 'w-full px-4 py-3 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-secondary',
+                'class': INPUT_CLASSES,
                 'placeholder': 'Your Message',
                 'required': True,
             }),
@@ -36,3 +68,8 @@ class ContactForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         if not show_service_field:
             self.fields.pop('service_interested', None)
+
+    def save(self, commit=True):
+        if 'service_interested' in self.fields:
+            self.instance.service_interested_id = self.cleaned_data.get('service_interested')
+        return super().save(commit)
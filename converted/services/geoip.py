@@ -0,0 +1,150 @@
+"""
+Country lookup for client IPs.
+
+Two local database formats are supported, chosen by file extension:
+
+* ``*.mmdb`` - a MaxMind/DB-IP country database, read through the optional
+  ``maxminddb`` package in memory-mapped mode.
+* anything else - the compact range file written by ``manage.py build_geoip``:
+  a 8-byte header (``GEO1`` + record count) followed by fixed-size records of
+  (start, end, country) for IPv4 ranges, sorted by start. Lookups are a binary
+  search straight over the memory-mapped file, so nothing is loaded up front.
+
+Results are memoised per IP in an LRU cache sized by settings.GEOIP_CACHE_SIZE.
+A database that can't be opened (corrupt, truncated, .mmdb without maxminddb)
+is logged once and every visitor is 'XX' until reset().
+"""
+import ipaddress
+import logging
+import mmap
+import struct
+from functools import lru_cache
+
+from django.conf import settings
+
+from .utils import get_client_ip
+
+try:
+    import maxminddb
+except ImportError:  # optional dependency, only needed for .mmdb files
+    maxminddb = None
+
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = 'XX'
+MAGIC = b'GEO1'
+HEADER = struct.Struct('>4sI')
+RECORD = struct.Struct('>II2s')
+
+
+class RangeDatabase:
+    def __init__(self, path):
+        with open(path, 'rb') as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a GeoIP range file")
+        if len(self._map) < HEADER.size + self.count * RECORD.size:
+            raise ValueError(f"{path} is truncated: the header promises {self.count} ranges")
+
+    def _record(self, index):
+        return RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+
+    def lookup(self, ip):
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if address.version != 4:
+            return None
+        value = int(address)
+
+        # Rightmost range whose start is <= value.
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] <= value:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+        start, end, country = self._record(lo - 1)
+        return country.decode('ascii') if value <= end else None
+
+
+class MaxMindDatabase:
+    def __init__(self, path):
+        if maxminddb is None:
+            raise ImportError("Reading .mmdb files requires the 'maxminddb' package.")
+        self._reader = maxminddb.open_database(str(path), maxminddb.MODE_MMAP)
+
+    def lookup(self, ip):
+        try:
+            record = self._reader.get(ip)
+        except ValueError:
+            return None
+        country = (record or {}).get('country') or {}
+        return country.get('iso_code')
+
+
+def write_range_file(path, ranges):
+    """Write sorted (start_int, end_int, 'CC') tuples in the range file format."""
+    ranges = sorted(ranges)
+    with open(path, 'wb') as fh:
+        fh.write(HEADER.pack(MAGIC, len(ranges)))
+        for start, end, country in ranges:
+            fh.write(RECORD.pack(start, end, country.upper().encode('ascii')))
+
+
+# An empty file fails in mmap (ValueError), a short header in struct.
+OPEN_ERRORS = (OSError, ValueError, struct.error, ImportError) + (
+    (maxminddb.InvalidDatabaseError,) if maxminddb is not None else ()
+)
+
+
+def _open_database():
+    path = getattr(settings, 'GEOIP_PATH', None)
+    if not path:
+        return None
+    try:
+        if str(path).endswith('.mmdb'):
+            return MaxMindDatabase(path)
+        return RangeDatabase(path)
+    except FileNotFoundError:
+        return None
+    except OPEN_ERRORS as exc:
+        # Called once per reset(): the failure is remembered, not retried per request.
+        logger.error("GeoIP database %s unusable, every visitor is %r: %s", path, UNKNOWN, exc)
+        return None
+
+
+_lookup = None
+
+
+def lookup_country(ip):
+    """ISO country code for an IP, or 'XX' when it can't be resolved."""
+    global _lookup
+    if _lookup is None:
+        database = _open_database()
+
+        @lru_cache(maxsize=getattr(settings, 'GEOIP_CACHE_SIZE', 4096))
+        def cached(ip):
+            return (database.lookup(ip) if database else None) or UNKNOWN
+
+        _lookup = cached
+    return _lookup(ip)
+
+
+def reset():
+    """Forget the open database and cached lookups (after rebuilding the file)."""
+    global _lookup
+    _lookup = None
+
+
+def country_for_request(request):
+    country = request.META.get('HTTP_CF_IPCOUNTRY', '').upper()
+    if country and country != UNKNOWN:
+        return country
+    return lookup_country(get_client_ip(request))
@@ -0,0 +1,284 @@
+"""
+Self-hosted Font Awesome subset.
+
+Instead of pulling the full Font Awesome CSS and webfonts from a CDN, the site
+can serve a subset that only contains the icons it actually uses: the
+icon_class of every Service and SubService plus any fa-* classes written
+straight into the templates.
+
+build_subset() reads an unpacked Font Awesome Free package
+(settings.FONTAWESOME['SOURCE_DIR'], containing css/ and webfonts/), subsets
+the WOFF2 fonts with fontTools (optional dependency: fonttools + brotli) and
+writes a minimal icons.css plus a manifest.json into
+settings.FONTAWESOME['OUTPUT_DIR'], which lives under STATICFILES_DIRS.
+
+A deployed site serves the collected STATIC_ROOT, not STATICFILES_DIRS, so
+once STATIC_ROOT exists every build is also copied into its fontawesome/
+folder (publish()). That is what puts a rebuild triggered by an admin edit
+live without another `collectstatic` run.
+"""
+import hashlib
+import json
+import logging
+import re
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+
+from .models import Service, SubService
+
+
+logger = logging.getLogger(__name__)
+
+# Class tokens that pick a font style, old (fas) and new (fa-solid) syntax.
+STYLE_TOKENS = {
+    'fa-solid': 'solid', 'fas': 'solid', 'fa': 'solid',
+    'fa-regular': 'regular', 'far': 'regular',
+    'fa-brands': 'brands', 'fab': 'brands',
+}
+FONT_FILES = {
+    'solid': ('fa-solid-900.woff2', 900),
+    'regular': ('fa-regular-400.woff2', 400),
+    'brands': ('fa-brands-400.woff2', 400),
+}
+FAMILY = {'solid': 'FA Subset', 'regular': 'FA Subset', 'brands': 'FA Subset Brands'}
+# OUTPUT_DIR's path among the static files: templates link static('fontawesome/css/icons.css').
+STATIC_PREFIX = 'fontawesome'
+
+CLASS_ATTR_RE = re.compile(r'class\s*=\s*"([^"]*)"')
+RULE_RE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+CODEPOINT_RE = re.compile(r'(?:--fa|content)\s*:\s*"\\([0-9a-fA-F]+)')
+SELECTOR_NAME_RE = re.compile(r'\.fa-([a-z0-9-]+)')
+
+
+def _config():
+    return getattr(settings, 'FONTAWESOME', {})
+
+
+def output_dir():
+    return Path(_config()['OUTPUT_DIR'])
+
+
+def published_dir():
+    """The subset's folder in the collected STATIC_ROOT, or None before the first collectstatic."""
+    root = settings.STATIC_ROOT
+    if not root or not Path(root).is_dir():
+        return None
+    return Path(root) / STATIC_PREFIX
+
+
+def publish():
+    """Copy the build from OUTPUT_DIR into STATIC_ROOT, where the live site serves it from."""
+    target = published_dir()
+    source = output_dir()
+    if target is None or target.resolve() == source.resolve():
+        return None
+    for name in ('css', 'webfonts'):
+        shutil.copytree(source / name, target / name, dirs_exist_ok=True)
+    # The manifest last: it is what makes the templates link the new version.
+    shutil.copy2(source / 'manifest.json', target / 'manifest.json')
+    return target
+
+
+def parse_class_string(value):
+    """Yield (style, icon_name) pairs for one HTML class attribute value."""
+    tokens = (value or '').split()
+    style = next((STYLE_TOKENS[t] for t in tokens if t in STYLE_TOKENS), 'solid')
+    for token in tokens:
+        if token.startswith('fa-') and token not in STYLE_TOKENS:
+            yield style, token[3:]
+
+
+def _template_dirs():
+    for engine in engines.all():
+        yield from getattr(engine, 'template_dirs', ())
+
+
+def collect_icons():
+    """{style: set(icon names)} used by the catalog and the templates."""
+    icons = {style: set() for style in FONT_FILES}
+
+    class_strings = list(Service.objects.values_list('icon_class', flat=True))
+    class_strings += SubService.objects.values_list('icon_class', flat=True)
+    # Model defaults, so a freshly created row never shows a missing glyph.
+    class_strings += [
+        Service._meta.get_field('icon_class').default,
+        SubService._meta.get_field('icon_class').default,
+    ]
+    for directory in _template_dirs():
+        for path in Path(directory).rglob('*.html'):
+            class_strings += CLASS_ATTR_RE.findall(path.read_text(encoding='utf-8'))
+
+    for value in class_strings:
+        for style, name in parse_class_string(value):
+            icons[style].add(name)
+    return icons
+
+
+def parse_codepoints(css):
+    """Map icon name -> codepoint from Font Awesome's all.css (v5-v7 syntax)."""
+    codepoints = {}
+    for selectors, body in RULE_RE.findall(css):
+        match = CODEPOINT_RE.search(body)
+        if not match:
+            continue
+        for name in SELECTOR_NAME_RE.findall(selectors):
+            codepoints.setdefault(name, int(match.group(1), 16))
+    return codepoints
+
+
+def _source_css(source):
+    for name in ('all.css', 'all.min.css'):
+        path = source / 'css' / name
+        if path.exists():
+            return path.read_text(encoding='utf-8')
+    raise FileNotFoundError(f"No css/all.css in {source}")
+
+
+def _fonttools_subset():
+    # Imported on first use: fontTools.subset alone costs every worker ~90 ms
+    # of startup, and only the subset build needs it.
+    try:
+        from fontTools import subset
+    except ImportError:  # optional dependency, only needed to build the subset
+        raise ImportError("Building the icon subset requires 'fonttools' and 'brotli'.") from None
+    return subset
+
+
+def _subset_font(source_path, target_path, codepoints):
+    ft_subset = _fonttools_subset()
+    options = ft_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    font = ft_subset.load_font(str(source_path), options)
+    subsetter = ft_subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    ft_subset.save_font(font, str(target_path), options)
+
+
+def _render_css(used):
+    lines = []
+    for style, codepoints in used.items():
+        if not codepoints:
+            continue
+        filename, weight = FONT_FILES[style]
+        lines.append(
+            f'@font-face{{font-family:"{FAMILY[style]}";font-style:normal;font-weight:{weight};'
+            f'font-display:block;src:url(../webfonts/{filename}) format("woff2")}}'
+        )
+
+    style_selectors = ','.join(f'.{token}' for token in STYLE_TOKENS)
+    lines.append(
+        f'{style_selectors}{{-moz-osx-font-smoothing:grayscale;-webkit-font-smoothing:antialiased;'
+        'display:inline-block;font-style:normal;font-variant:normal;line-height:1;text-rendering:auto}'
+    )
+    lines.append(','.join(f'.{token}::before' for token in STYLE_TOKENS) + '{content:var(--fa)}')
+    for token, style in STYLE_TOKENS.items():
+        lines.append(f'.{token}{{font-family:"{FAMILY[style]}";font-weight:{FONT_FILES[style][1]}}}')
+
+    names = {}
+    for codepoints in used.values():
+        names.update(codepoints)
+    for name, codepoint in sorted(names.items()):
+        lines.append(f'.fa-{name}{{--fa:"\\{codepoint:x}"}}')
+    return '\n'.join(lines) + '\n'
+
+
+def build_subset(icons=None):
+    """
+    Write the subset fonts, icons.css and manifest.json. Returns the manifest.
+    Icon names unknown to the source package are reported in 'missing'.
+    """
+    _fonttools_subset()
+    source = Path(_config()['SOURCE_DIR'])
+    target = output_dir()
+    icons = collect_icons() if icons is None else icons
+    codepoints = parse_codepoints(_source_css(source))
+
+    used = {style: {} for style in FONT_FILES}
+    missing = []
+    for style, names in icons.items():
+        for name in sorted(names):
+            if name in codepoints:
+                used[style][name] = codepoints[name]
+            else:
+                missing.append(f'{style}:{name}')
+
+    (target / 'css').mkdir(parents=True, exist_ok=True)
+    (target / 'webfonts').mkdir(parents=True, exist_ok=True)
+    for style, glyphs in used.items():
+        if glyphs:
+            filename = FONT_FILES[style][0]
+            _subset_font(source / 'webfonts' / filename, target / 'webfonts' / filename, glyphs.values())
+
+    css = _render_css(used)
+    (target / 'css' / 'icons.css').write_text(css, encoding='utf-8')
+    manifest = {
+        'version': hashlib.sha1(css.encode('utf-8')).hexdigest()[:12],
+        'icons': {style: sorted(names) for style, names in used.items()},
+        'missing': missing,
+    }
+    (target / 'manifest.json').write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    publish()
+    reset()
+    return manifest
+
+
+# (stat key, manifest) of the last read; see load_manifest().
+_manifest = None
+
+
+def _stat_key(path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_manifest():
+    """
+    The current build's manifest, or {} when no subset has been built.
+    It is re-read whenever the file changes, so a rebuild by another worker
+    (or a first `manage.py build_icons`) shows up without a restart; the
+    check costs one stat() per call.
+    """
+    global _manifest
+    try:
+        path = output_dir() / 'manifest.json'
+    except KeyError:  # no FONTAWESOME['OUTPUT_DIR']
+        return {}
+    key = _stat_key(path)
+    if _manifest is None or _manifest[0] != key:
+        try:
+            manifest = json.loads(path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+        _manifest = (key, manifest)
+    return _manifest[1]
+
+
+def reset():
+    global _manifest
+    _manifest = None
+
+
+def is_covered(icon_class):
+    """True if every icon named in `icon_class` is already in the built subset."""
+    built = load_manifest().get('icons', {})
+    return all(name in built.get(style, ()) for style, name in parse_class_string(icon_class))
+
+
+def rebuild_if_needed(icon_class):
+    """Signal hook: rebuild the subset when an admin saves an icon it lacks."""
+    if not load_manifest() or is_covered(icon_class):
+        return
+    try:
+        manifest = build_subset()
+    except (ImportError, OSError) as exc:
+        logger.warning("Font Awesome subset not rebuilt for %r: %s", icon_class, exc)
+        return
+    logger.info("Rebuilt Font Awesome subset (version %s)", manifest['version'])
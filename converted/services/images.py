@@ -0,0 +1,41 @@
+"""
+Low-quality image placeholders (LQIP) for catalog imagery.
+
+When an image is uploaded its intrinsic size is recorded and a tiny preview
+(PLACEHOLDER_SIZE px on the long side, a few hundred bytes) is stored next to
+it as a data: URI. The {% lazy_image %} tag (services_tags.py) paints that
+preview as the <img>'s background and sets width/height, so the page lays out
+at its final size straight away and the real file loads lazily on top.
+"""
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageFilter, ImageOps, features
+
+
+PLACEHOLDER_SIZE = 16
+# WebP previews are about a fifth of the size of JPEG ones; older Pillow
+# builds without libwebp fall back to JPEG.
+PLACEHOLDER_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+
+
+def placeholder(image):
+    """data: URI of a blurred PLACEHOLDER_SIZE px preview of an (upright) PIL image."""
+    preview = image.convert('RGB')
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+    preview = preview.filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    preview.save(buffer, format=PLACEHOLDER_FORMAT, quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f"data:image/{PLACEHOLDER_FORMAT.lower()};base64,{encoded}"
+
+
+def inspect(field_file):
+    """(width, height, placeholder) of an uploaded image file, as displayed."""
+    field_file.seek(0)
+    with Image.open(field_file) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        preview = placeholder(image)
+    field_file.seek(0)
+    return width, height, preview
@@ -0,0 +1,37 @@
+"""
+Jinja2 environment for the optional 'jinja2' template engine.
+
+The public templates have Jinja ports under jinja2/ (same relative names as
+in templates/), rendered through django.template.backends.jinja2 when a view
+is switched over in settings.PUBLIC_TEMPLATE_ENGINES. Compiled templates are
+kept in a FileSystemBytecodeCache, so a fresh worker loads them without
+re-parsing.
+"""
+from pathlib import Path
+
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from jinja2 import Environment, FileSystemBytecodeCache
+
+from .templatetags.services_tags import fontawesome_css, lazy_image
+
+
+def url(viewname, *args, **kwargs):
+    """{% url %} for Jinja: url('service_detail', service.slug)."""
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def environment(bytecode_cache_dir=None, **options):
+    if bytecode_cache_dir:
+        Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+        options['bytecode_cache'] = FileSystemBytecodeCache(str(bytecode_cache_dir))
+    env = Environment(**options)
+    env.globals.update(url=url, static=static, fontawesome_css=fontawesome_css, lazy_image=lazy_image)
+    # Django's own filters, so ported templates produce the same output.
+    env.filters.update(
+        truncatewords=defaultfilters.truncatewords,
+        linebreaks=defaultfilters.linebreaks_filter,
+        escapejs=defaultfilters.escapejs_filter,
+    )
+    return env
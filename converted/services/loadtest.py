@@ -0,0 +1,233 @@
+"""
+Closed-loop HTTP load generator behind `manage.py loadtest`.
+
+Virtual users (one thread each) keep picking a scenario from the traffic mix
+and running it against the target until the time is up:
+
+    crawler   GET a random service_detail / subservice_detail page
+    home      GET / as a visitor from a random country (CF-IPCountry)
+    contact   fetch a CSRF token from api/csrf/, then POST `burst` contact
+              messages to / the way the homepage form's fetch() does
+
+Pages to crawl are discovered through the JSON catalog API, so any running
+copy of the site can be targeted. Every request is recorded; report() turns
+the records into per-window throughput, error rate and latency percentiles.
+"""
+import http.client
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+
+COUNTRIES = ('US', 'US', 'GB', 'BD', 'BD', 'IN', 'DE', 'CA', 'AU', 'XX')
+DEFAULT_MIX = {'crawler': 80, 'home': 15, 'contact': 5}
+
+
+def parse_mix(value):
+    """'crawler=80,home=15,contact=5' -> {'crawler': 80.0, ...}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}.")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("The traffic mix needs at least one scenario with a positive weight.")
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Client:
+    """One virtual user: a keep-alive connection and its own cookie jar."""
+
+    def __init__(self, base_url, recorder, timeout=30):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = {}
+        self.connection = None
+
+    def request(self, label, method, path, body=None, headers=None):
+        """Send one request and record it under `label`; returns (status, body)."""
+        headers = {'Accept-Encoding': 'identity', **(headers or {})}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        started = time.perf_counter()
+        status, content = 0, b''
+        for attempt in (1, 2):  # a kept-alive connection may have been closed by the server
+            try:
+                if self.connection is None:
+                    self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+                self.connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                content = response.read()
+                status = response.status
+                for header in response.headers.get_all('Set-Cookie') or ():
+                    cookie = SimpleCookie(header)
+                    self.cookies.update((name, morsel.value) for name, morsel in cookie.items())
+                if response.will_close:
+                    self.close()
+                break
+            except (OSError, http.client.HTTPException):
+                self.close()
+                if attempt == 2:
+                    status = 0
+        self.recorder.add(label, status, time.perf_counter() - started)
+        return status, content
+
+    def get_json(self, label, path):
+        status, content = self.request(label, 'GET', path, headers={'Accept': 'application/json'})
+        if status != 200:
+            raise RuntimeError(f"GET {path} returned {status or 'no response'}.")
+        return json.loads(content)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def discover(client):
+    """Paths of every active service page and sub-service page, via the catalog API."""
+    paths = []
+    cursor_path = '/api/services/?limit=100&fields=slug,url'
+    while cursor_path:
+        page = client.get_json('discover', cursor_path)
+        for service in page['results']:
+            paths.append(service['url'])
+            detail = client.get_json('discover', f"/api/services/{service['slug']}/?fields=sub_services")
+            paths.extend(sub['url'] for sub in detail['sub_services'])
+        cursor_path = page['next']
+    return paths
+
+
+def crawler(client, rng, pages, **options):
+    client.request('crawler', 'GET', rng.choice(pages), headers={'User-Agent': 'Mozilla/5.0 (compatible; Googlebot/2.1)'})
+
+
+def home(client, rng, **options):
+    client.request('home', 'GET', '/', headers={'CF-IPCountry': rng.choice(COUNTRIES)})
+
+
+def contact(client, rng, burst=1, **options):
+    # A fresh visitor each time. The address only counts for throttling where
+    # the server trusts one proxy hop (the local loadtest server does);
+    # behind a real proxy every burst comes from this machine.
+    client.cookies.clear()
+    ip = f"198.18.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+    status, content = client.request('contact', 'GET', '/api/csrf/', headers={'X-Forwarded-For': ip})
+    if status != 200:
+        return
+    token = json.loads(content)['csrfToken']
+    for _ in range(burst):
+        body = urlencode({
+            'name': 'Load Test',
+            'email': f"loadtest+{uuid.uuid4().hex[:12]}@example.com",
+            'message': f"Load test message {uuid.uuid4().hex}",
+        })
+        client.request('contact', 'POST', '/', body=body, headers={
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json',
+            'X-CSRFToken': token,
+            'X-Forwarded-For': ip,
+        })
+
+
+SCENARIOS = {'crawler': crawler, 'home': home, 'contact': contact}
+
+
+class Recorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.records = []  # (seconds since start, label, status, latency)
+        self._lock = threading.Lock()
+
+    def add(self, label, status, latency):
+        with self._lock:
+            self.records.append((time.perf_counter() - self.started, label, status, latency))
+
+    def since(self, index):
+        with self._lock:
+            return self.records[index:]
+
+
+def is_error(status):
+    # 429 is the contact throttle doing its job, reported separately.
+    return status == 0 or (status >= 400 and status != 429)
+
+
+def summarize(records, seconds):
+    latencies = sorted(latency for _, _, _, latency in records)
+    statuses = Counter(status for _, _, status, _ in records)
+    errors = sum(count for status, count in statuses.items() if is_error(status))
+    return {
+        'requests': len(records),
+        'rps': len(records) / seconds if seconds else 0.0,
+        'errors': errors,
+        'error_rate': errors / len(records) if records else 0.0,
+        'throttled': statuses.get(429, 0),
+        'statuses': dict(sorted(statuses.items())),
+        'p50': percentile(latencies, 0.50),
+        'p90': percentile(latencies, 0.90),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1] if latencies else 0.0,
+    }
+
+
+def run(base_url, mix, pages, concurrency, duration, burst=1, seed=None, on_window=None, window=5.0):
+    """
+    Run the mix with `concurrency` virtual users for `duration` seconds.
+    `on_window(summary, start, end)` is called every `window` seconds with
+    the stats of that window. Returns the Recorder.
+    """
+    recorder = Recorder()
+    stop = threading.Event()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    def user(number):
+        rng = random.Random(None if seed is None else seed + number)
+        client = Client(base_url, recorder)
+        try:
+            while not stop.is_set():
+                name = rng.choices(names, weights)[0]
+                SCENARIOS[name](client, rng, pages=pages, burst=burst)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=user, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+
+    seen = 0
+    window_start = 0.0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        stop.wait(min(window, max(0.0, deadline - time.perf_counter())))
+        records = recorder.since(seen)
+        seen += len(records)
+        window_end = time.perf_counter() - recorder.started
+        if on_window is not None:
+            on_window(summarize(records, window_end - window_start), window_start, window_end)
+        window_start = window_end
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return recorder
@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from services import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the lead rollup (day x service x page source) from the Contact table, "
+        "for all days or for a date range."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help="First day to recount (YYYY-MM-DD).")
+        parser.add_argument('--until', type=date.fromisoformat, help="Last day to recount (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        rows = rollups.rebuild(options['since'], options['until'])
+        span = f"{options['since'] or 'start'} .. {options['until'] or 'today'}"
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rollup rows ({span}, {rollups.total()} leads in total)."))
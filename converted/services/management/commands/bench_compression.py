@@ -0,0 +1,102 @@
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from services import compression
+from services.catalog import get_catalog
+from services.page_cache import _drain
+
+from .warm_cache import catalog_paths
+
+
+def _levels(value):
+    return [int(level) for level in value.split(',') if level.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the public pages and report, per page, the bytes saved and CPU time "
+        "spent by HTML minification and by gzip/Brotli at the given levels."
+    )
+
+    def add_arguments(self, parser):
+        config = compression.get_config()
+        parser.add_argument('--gzip-levels', type=_levels, default=[config['GZIP_LEVEL']],
+                            help="Comma-separated gzip levels (default: COMPRESSION['GZIP_LEVEL']).")
+        parser.add_argument('--brotli-levels', type=_levels, default=[config['BROTLI_LEVEL']],
+                            help="Comma-separated Brotli levels (default: COMPRESSION['BROTLI_LEVEL']).")
+        parser.add_argument('--repeat', type=int, default=5, help="Timing runs per measurement (default: 5).")
+
+    def handle(self, *args, **options):
+        encoders = [('gzip', level) for level in options['gzip_levels']]
+        if compression.brotli is None:
+            self.stderr.write("The 'brotli' package is not installed; skipping Brotli.")
+        else:
+            encoders += [('br', level) for level in options['brotli_levels']]
+        self.repeat = max(1, options['repeat'])
+
+        site = urlsplit(settings.SITE_URL)
+        self.factory = RequestFactory(HTTP_HOST=site.netloc)
+        self.secure = site.scheme == 'https'
+        get_catalog()
+
+        paths = [reverse('home')] + catalog_paths()
+        if not paths:
+            raise CommandError("No pages to benchmark.")
+
+        header = f"{'raw':>8} {'minified':>15} {'min ms':>7}"
+        for encoding, level in encoders:
+            header += f" {f'{encoding}-{level}':>8} {'ms':>6}"
+        self.stdout.write(f"{header}  path")
+
+        totals = {'raw': 0, 'minified': 0, 'min_ms': 0.0}
+        encoded = {key: [0, 0.0] for key in encoders}
+        for path in paths:
+            raw = self.render(path)
+            minified, min_ms = self.measure(lambda: compression.minify_html(raw.decode()).encode())
+            saved = 100 * (1 - len(minified) / len(raw)) if raw else 0
+            line = f"{len(raw):8d} {len(minified):8d} ({saved:3.0f}%) {min_ms:7.2f}"
+            totals['raw'] += len(raw)
+            totals['minified'] += len(minified)
+            totals['min_ms'] += min_ms
+            for encoding, level in encoders:
+                config = {**compression.get_config(), 'GZIP_LEVEL': level, 'BROTLI_LEVEL': level}
+                body, ms = self.measure(lambda: compression.compress_bytes(minified, encoding, config))
+                line += f" {len(body):8d} {ms:6.2f}"
+                encoded[encoding, level][0] += len(body)
+                encoded[encoding, level][1] += ms
+            self.stdout.write(f"{line}  {path}")
+
+        line = f"{totals['raw']:8d} {totals['minified']:8d}        {totals['min_ms']:7.2f}"
+        for size, ms in encoded.values():
+            line += f" {size:8d} {ms:6.2f}"
+        self.stdout.write(f"{line}  TOTAL ({len(paths)} pages)")
+        for (encoding, level), (size, ms) in encoded.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{encoding}-{level}: {100 * (1 - size / totals['raw']):.1f}% smaller than raw, "
+                f"{ms / len(paths):.2f} ms CPU per page (+{totals['min_ms'] / len(paths):.2f} ms minify)"
+            ))
+
+    def render(self, path):
+        request = self.factory.get(path, secure=self.secure)
+        # What the session-free middleware path would have set for an anonymous visitor.
+        request._sessionless = True
+        request.user = AnonymousUser()
+        request.country = 'XX'
+        match = resolve(path)
+        request.resolver_match = match
+        # Bypass the page cache so every page is really rendered.
+        view = getattr(match.func, '__wrapped__', match.func)
+        return _drain(view(request, *match.args, **match.kwargs))
+
+    def measure(self, func):
+        """Result of func() and its average CPU time in milliseconds."""
+        started = time.process_time()
+        for _ in range(self.repeat):
+            result = func()
+        return result, (time.process_time() - started) * 1000 / self.repeat
@@ -0,0 +1,91 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines, loader
+from django.test import RequestFactory
+
+from services.catalog import (
+    BulletPoint, DetailsEntry, FAQEntry, Feature, ServiceEntry, SubServiceEntry,
+)
+
+
+COLORS = ('accent', 'green', 'purple', 'yellow', 'red', 'gray')
+
+
+def _sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+def fake_service(sub_services, features=5, faqs=20):
+    """An in-memory catalog entry shaped like services/catalog.py builds them."""
+    service = ServiceEntry(
+        id=1, service_name='Automation Workflow', slug='automation-workflow',
+        short_description='Automate the busywork.', icon_class='fa-solid fa-gears',
+        is_active=True, updated_at=None,
+        faqs=tuple(FAQEntry(i, f'Question {i}?', f'Answer {i}.\n\nSecond paragraph.', i) for i in range(faqs)),
+    )
+    service.details = DetailsEntry(
+        hero_h1='Automate / Everything', hero_tagline='Less busywork, more growth.',
+        short_section_title='Why / Automate', short_section_details='Details.',
+        short_section_image=None, updated_at=None,
+        bullet_points=tuple(BulletPoint(f'Point {i}', 'Description', i) for i in range(4)),
+    )
+    service.sub_services = tuple(
+        SubServiceEntry(
+            id=i, title=f'Sub-service {i}', slug=f'sub-service-{i}', description='What it does, briefly.',
+            icon_class='fa-solid fa-robot', color_theme=COLORS[i % len(COLORS)], is_active=True,
+            order=i, updated_at=None, parent_service=service,
+            features=tuple(Feature(f'Feature {j}', j) for j in range(features)), faqs=(),
+        )
+        for i in range(sub_services)
+    )
+    return service
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare Django and Jinja2 render times of service_detail.html "
+        "with 10/100/500 (or --sizes) sub-services."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=_sizes, default=[10, 100, 500],
+                            help="Comma-separated sub-service counts (default: 10,100,500).")
+        parser.add_argument('--repeat', type=int, default=20, help="Renders per measurement (default: 20).")
+        parser.add_argument('--template', default='services/service_detail.html')
+
+    def handle(self, *args, **options):
+        names = [name for name in ('django', 'jinja2') if name in engines]
+        if 'jinja2' not in names:
+            raise CommandError("The Jinja2 engine is not configured (is the 'jinja2' package installed?).")
+
+        request = RequestFactory().get('/automation-workflow/')
+        request.user = AnonymousUser()
+        templates = {name: loader.get_template(options['template'], using=name) for name in names}
+
+        self.stdout.write(f"{'subs':>6} {'django ms':>10} {'jinja2 ms':>10} {'speedup':>8} {'bytes':>9}")
+        for size in options['sizes']:
+            service = fake_service(size)
+            context = {
+                'service': service,
+                'details': service.details,
+                'bullet_points': service.details.bullet_points,
+                'sub_services': service.sub_services,
+                'faqs': service.faqs,
+            }
+            timings = {}
+            output = {}
+            for name, template in templates.items():
+                output[name] = template.render(context, request)  # warm-up
+                runs = []
+                for _ in range(max(1, options['repeat'])):
+                    started = time.perf_counter()
+                    template.render(context, request)
+                    runs.append((time.perf_counter() - started) * 1000)
+                timings[name] = statistics.median(runs)
+            self.stdout.write(
+                f"{size:6d} {timings['django']:10.2f} {timings['jinja2']:10.2f} "
+                f"{timings['django'] / timings['jinja2']:7.1f}x {len(output['jinja2']):9d}"
+            )
@@ -0,0 +1,59 @@
+import csv
+import ipaddress
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from services.geoip import write_range_file
+
+
+def _to_int(value):
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    address = ipaddress.ip_address(value)
+    if address.version != 4:
+        raise ValueError("IPv6 ranges are not supported")
+    return int(address)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the compact GeoIP range file from a CSV of "
+        "'start_ip,end_ip,country_code' rows (DB-IP / IP2Location lite format). "
+        "IPv6 rows are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--output', default=None, help="Defaults to settings.GEOIP_PATH.")
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'GEOIP_PATH', None)
+        if not output:
+            raise CommandError("Pass --output or set GEOIP_PATH.")
+        if str(output).endswith('.mmdb'):
+            raise CommandError("GEOIP_PATH points at a .mmdb file; use it directly instead.")
+
+        ranges = []
+        skipped = 0
+        with open(options['csv_path'], newline='', encoding='utf-8') as fh:
+            for row in csv.reader(fh):
+                if len(row) < 3:
+                    skipped += 1
+                    continue
+                try:
+                    start, end = _to_int(row[0]), _to_int(row[1])
+                except ValueError:
+                    skipped += 1  # header line or malformed address
+                    continue
+                country = row[2].strip().upper()
+                if end > 0xFFFFFFFF or len(country) != 2:
+                    skipped += 1
+                    continue
+                ranges.append((start, end, country))
+
+        write_range_file(output, ranges)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(ranges)} ranges to {output} ({skipped} rows skipped)."
+        ))
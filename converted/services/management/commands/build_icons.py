@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from services import icons
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a Font Awesome subset (WOFF2 + minimal CSS) containing only the "
+        "icons used by Services, SubServices and the templates."
+    )
+
+    def handle(self, *args, **options):
+        try:
+            manifest = icons.build_subset()
+        except (ImportError, FileNotFoundError) as exc:
+            raise CommandError(str(exc))
+
+        count = sum(len(names) for names in manifest['icons'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} icons to {icons.output_dir()} (version {manifest['version']})."
+        ))
+        if manifest['missing']:
+            self.stdout.write(self.style.WARNING(
+                "Not found in the Font Awesome source: " + ', '.join(manifest['missing'])
+            ))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from services import sitemaps
+
+
+class Command(BaseCommand):
+    help = "Pre-render sitemap.xml, the per-section sitemap pages and robots.txt."
+
+    def add_arguments(self, parser):
+        # No `choices`: before Python 3.12 argparse checks the empty default list against them.
+        parser.add_argument(
+            'sections', nargs='*',
+            help=f"Only rebuild these sections: {', '.join(sorted(sitemaps.SECTIONS))} (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        unknown = sorted(set(options['sections']) - set(sitemaps.SECTIONS))
+        if unknown:
+            raise CommandError(f"Unknown sitemap section(s): {', '.join(unknown)}")
+        sitemaps.regenerate(options['sections'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Sitemaps written to {settings.SITEMAP_ROOT}"))
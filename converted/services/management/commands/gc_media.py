@@ -0,0 +1,45 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from services.storage import ContentAddressedStorage, unreferenced_blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete content-addressed media files that no longer belong to any row "
+        "(see services/storage.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="List what would be deleted, delete nothing.")
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help="Keep files younger than this many hours, which may belong to an upload in progress (default: 24).",
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not a ContentAddressedStorage; nothing to collect.")
+
+        count = size = 0
+        for name, bytes_ in unreferenced_blobs(default_storage, min_age=options['min_age'] * 3600):
+            count += 1
+            size += bytes_
+            if options['verbosity'] > 1 or options['dry_run']:
+                self.stdout.write(name)
+            if not options['dry_run']:
+                default_storage.delete(name)
+                self.remove_empty_parent(name)
+
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} unreferenced files ({size / 1024:.1f} KiB)."))
+
+    def remove_empty_parent(self, name):
+        # The two-character fan-out directory, once its last blob is gone.
+        directory = os.path.dirname(default_storage.path(name))
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
@@ -0,0 +1,174 @@
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from services import loadtest
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"The server exited with status {process.returncode}.")
+        try:
+            with urllib.request.urlopen(f"{url}/api/csrf/", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"The server did not answer at {url} within {timeout}s.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a traffic mix (crawlers on the catalog pages, homepage visitors, "
+        "contact-form bursts) against the site and report throughput, error rates "
+        "and latency percentiles. Without --url a local server (runserver, DEBUG off) "
+        "is started on a freshly migrated and seeded temporary database; point --url "
+        "at the production WSGI server for capacity numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Site to test, e.g. http://127.0.0.1:8000 (default: start one locally).")
+        parser.add_argument(
+            '--mix', type=loadtest.parse_mix, default=loadtest.DEFAULT_MIX,
+            help="Scenario weights (default: crawler=80,home=15,contact=5).",
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help="Virtual users (default: 8).")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run (default: 30).")
+        parser.add_argument('--window', type=float, default=5, help="Seconds per progress line (default: 5).")
+        parser.add_argument('--burst', type=int, default=3, help="Contact POSTs per contact visit (default: 3).")
+        parser.add_argument('--seed', type=int, help="Random seed, for repeatable runs.")
+        parser.add_argument(
+            '--target-rps', type=float,
+            help="Launch traffic to plan for; prints how many servers like this one it needs.",
+        )
+        parser.add_argument('--services', type=int, default=12, help="Seeded services (local server only).")
+        parser.add_argument('--subservices', type=int, default=8, help="Seeded sub-services per service.")
+        parser.add_argument(
+            '--server-arg', action='append', default=[],
+            help="Extra argument for the local runserver (repeatable), e.g. --server-arg=--nothreading.",
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['duration'] <= 0:
+            raise CommandError("--concurrency and --duration must be positive.")
+        with ExitStack() as stack:
+            url = options['url'] or stack.enter_context(self.local_server(options))
+            url = url.rstrip('/')
+            client = loadtest.Client(url, loadtest.Recorder())
+            try:
+                pages = loadtest.discover(client)
+            except (RuntimeError, ValueError) as exc:
+                raise CommandError(f"Could not list the catalog through {url}/api/services/: {exc}")
+            finally:
+                client.close()
+            if not pages and options['mix'].get('crawler'):
+                raise CommandError("The catalog has no active pages to crawl.")
+
+            mix = ', '.join(f"{name} {weight:g}" for name, weight in options['mix'].items())
+            self.stdout.write(
+                f"{url}: {len(pages)} catalog pages, {options['concurrency']} users, "
+                f"{options['duration']:g}s, mix {mix}"
+            )
+            self.stdout.write(f"{'window':>13} {'req/s':>8} {'errors':>7} {'429':>5} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+            recorder = loadtest.run(
+                url, options['mix'], pages, options['concurrency'], options['duration'],
+                burst=options['burst'], seed=options['seed'], on_window=self.write_window, window=options['window'],
+            )
+        self.write_report(recorder, options)
+
+    @contextmanager
+    def local_server(self, options):
+        """
+        Migrate and seed a temporary SQLite database and serve it with runserver.
+        Everything the server writes (cache, metrics, logs, sitemaps) goes to the
+        same temporary directory, and DEBUG is off as in production.
+        """
+        manage = str(Path(settings.BASE_DIR) / 'manage.py')
+        with tempfile.TemporaryDirectory(prefix='loadtest-') as directory:
+            env = {
+                **os.environ,
+                'SQLITE_PATH': os.path.join(directory, 'db.sqlite3'),
+                'DJANGO_VAR_DIR': directory,
+                'DJANGO_DEBUG': '0',
+                'DJANGO_ALLOWED_HOSTS': '127.0.0.1',
+                # Stands in for the proxy, so each simulated visitor has its own address.
+                'DJANGO_TRUSTED_PROXY_COUNT': '1',
+            }
+            self.stdout.write("Preparing a seeded database...")
+            for command in (
+                ['migrate', '--noinput', '--verbosity=0'],
+                ['seed_catalog', f"--services={options['services']}", f"--subservices={options['subservices']}"],
+            ):
+                command.append('--skip-checks')
+                subprocess.run([sys.executable, manage, *command], env=env, check=True, stdout=subprocess.DEVNULL)
+
+            port = _free_port()
+            url = f"http://127.0.0.1:{port}"
+            process = subprocess.Popen(
+                [sys.executable, manage, 'runserver', f"127.0.0.1:{port}", '--noreload', *options['server_arg']],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                _wait_until_up(url, process)
+                yield url
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+
+    def write_window(self, summary, start, end):
+        line = (
+            f"{start:5.0f}-{end:5.0f}s {summary['rps']:8.1f} {summary['error_rate']:6.1%} {summary['throttled']:5d} "
+            f"{summary['p50'] * 1000:8.1f} {summary['p90'] * 1000:8.1f} {summary['p99'] * 1000:8.1f}"
+        )
+        self.stdout.write(self.style.ERROR(line) if summary['errors'] else line)
+
+    def write_report(self, recorder, options):
+        records = recorder.records
+        seconds = max(r[0] for r in records) if records else 0
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'scenario':<9} {'requests':>9} {'req/s':>8} {'errors':>7} {'429':>5} "
+            f"{'p50 ms':>8} {'p90 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses"
+        )
+        groups = {name: [r for r in records if r[1] == name] for name in options['mix']}
+        groups['total'] = records
+        for name, group in groups.items():
+            s = loadtest.summarize(group, seconds)
+            statuses = ' '.join(f"{status or 'ERR'}:{count}" for status, count in s['statuses'].items())
+            self.stdout.write(
+                f"{name:<9} {s['requests']:9d} {s['rps']:8.1f} {s['error_rate']:6.1%} {s['throttled']:5d} "
+                f"{s['p50'] * 1000:8.1f} {s['p90'] * 1000:8.1f} {s['p95'] * 1000:8.1f} "
+                f"{s['p99'] * 1000:8.1f} {s['max'] * 1000:8.1f}  {statuses}"
+            )
+
+        total = loadtest.summarize(records, seconds)
+        if options['target_rps'] and total['rps']:
+            servers = math.ceil(options['target_rps'] / total['rps'])
+            self.stdout.write(
+                f"\n{options['target_rps']:g} req/s at this mix needs about {servers} server(s) "
+                f"like this one ({total['rps']:.1f} req/s each, before headroom)."
+            )
+            if not options['url']:
+                self.stdout.write(self.style.WARNING(
+                    "Measured against a single runserver process: rerun with --url against the "
+                    "production WSGI server before planning capacity on it."
+                ))
+        if total['errors']:
+            self.stdout.write(self.style.ERROR(f"{total['errors']} of {total['requests']} requests failed."))
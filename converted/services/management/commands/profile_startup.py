@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from services import startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker startup: import time per module of the WSGI application, "
+        "then time to first request and per-worker memory for a small pre-fork "
+        "server, with and without DJANGO_PRELOAD (see services/preload.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help="Slowest modules to list (default: 25).")
+        parser.add_argument('--workers', type=int, default=4, help="Workers to fork per run (default: 4).")
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help="Path each worker requests, repeatable (default: /).",
+        )
+        parser.add_argument('--host', default='localhost', help="Host header for those requests (default: localhost).")
+        parser.add_argument('--requests', type=int, default=3, help="Requests per worker (default: 3).")
+        parser.add_argument('--imports-only', action='store_true', help="Skip the worker runs.")
+
+    def handle(self, *args, **options):
+        self.env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'website.settings')}
+        self.env.pop('DJANGO_PRELOAD', None)
+        self.wsgi = settings.WSGI_APPLICATION
+        self.write_imports(options['top'])
+        if options['imports_only']:
+            return
+        if not hasattr(os, 'fork'):
+            raise CommandError("The worker runs need os.fork(); use --imports-only on this platform.")
+        runs = [self.probe(preload, options) for preload in (False, True)]
+        self.write_runs(runs)
+
+    def run(self, command):
+        result = subprocess.run(
+            [sys.executable, *command], cwd=settings.BASE_DIR, env=self.env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"{' '.join(command)} failed:\n{result.stderr[-2000:]}")
+        return result
+
+    def write_imports(self, top):
+        module = self.wsgi.rpartition('.')[0]
+        modules = startup.parse_import_times(self.run(['-X', 'importtime', '-c', f'import {module}']).stderr)
+        total = sum(own for _, own, _, _ in modules)
+        self.stdout.write(f"Importing {module}: {len(modules)} modules, {total / 1000:.0f} ms\n")
+
+        packages = {}
+        for name, own, _, _ in modules:
+            package = name.partition('.')[0]
+            packages[package] = packages.get(package, 0) + own
+        self.stdout.write(f"{'package':<32} {'ms':>8} {'share':>6}")
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"{package:<32} {own / 1000:8.1f} {own / total:6.1%}")
+
+        self.stdout.write(f"\n{'module':<48} {'self ms':>8} {'total ms':>9}")
+        for name, own, cumulative, depth in sorted(modules, key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"{name:<48} {own / 1000:8.1f} {cumulative / 1000:9.1f}")
+
+    def probe(self, preload, options):
+        command = [
+            '-m', 'services.startup', f'--wsgi={self.wsgi}', f"--workers={options['workers']}",
+            f"--host={options['host']}", f"--requests={options['requests']}",
+        ]
+        command += [f'--path={path}' for path in options['paths'] or ['/']]
+        if preload:
+            command.append('--preload')
+        return json.loads(self.run(command).stdout)
+
+    def write_runs(self, runs):
+        self.stdout.write(
+            f"\n{'mode':<10} {'load ms':>8} {'1st req ms':>11} {'next ms':>8} "
+            f"{'rss MiB':>8} {'pss MiB':>8} {'private MiB':>12} {'shared MiB':>11}  (per worker)"
+        )
+        for run in runs:
+            workers = [w for w in run['workers'] if 'error' not in w]
+            for failed in (w for w in run['workers'] if 'error' in w):
+                self.stdout.write(self.style.ERROR(f"worker {failed['pid']}: {failed['error']}"))
+            if not workers:
+                continue
+            first = sum(w['ms'][0] for w in workers) / len(workers)
+            later = [ms for w in workers for ms in w['ms'][1:]]
+
+            def mib(field):
+                values = [w['memory'].get(field) for w in workers]
+                return f"{sum(values) / len(values) / 1024:.1f}" if None not in values else '-'
+
+            self.stdout.write(
+                f"{'preload' if run['preload'] else 'cold':<10} {run['load_ms']:8.0f} {first:11.1f} "
+                f"{(sum(later) / len(later) if later else 0):8.1f} {mib('rss'):>8} {mib('pss'):>8} "
+                f"{mib('private'):>12} {mib('shared'):>11}"
+            )
+            bad = [s for w in workers for s in w['statuses'] if s >= 400]
+            if bad:
+                self.stdout.write(self.style.WARNING(f"  {len(bad)} requests answered {sorted(set(bad))}"))
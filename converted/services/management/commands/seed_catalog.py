@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from services.models import (
+    FAQ, BulletPointServices, Service, ServiceDetails, SubService, SubServiceFeature, Testimonial,
+)
+
+
+COLORS = ('accent', 'green', 'purple', 'yellow', 'red')
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic, fully active catalog (services with "
+        "details, sub-services, features, FAQs, testimonials) for load tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=12)
+        parser.add_argument('--subservices', type=int, default=8, help="Sub-services per service (default: 8).")
+        parser.add_argument('--features', type=int, default=5, help="Features per sub-service (default: 5).")
+        parser.add_argument('--faqs', type=int, default=6, help="FAQs per service and per sub-service (default: 6).")
+        parser.add_argument('--testimonials', type=int, default=6)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        start = Service.objects.count()
+        features = []
+        faqs = []
+        for n in range(start, start + options['services']):
+            service = Service.objects.create(
+                service_name=f"Seeded Service {n}",
+                short_description=f"Automation package number {n}, seeded for load testing.",
+                icon_class='fa-solid fa-robot',
+                is_active=True,
+            )
+            details = ServiceDetails.objects.create(
+                service=service,
+                hero_h1=f"Automate / Service {n}",
+                hero_tagline="Less busywork, more growth.",
+                short_section_title="Why / Automate",
+                short_section_details="Synthetic details text. " * 8,
+            )
+            BulletPointServices.objects.bulk_create(
+                BulletPointServices(details=details, order=i, title=f"Benefit {i}", description="Synthetic benefit.")
+                for i in range(4)
+            )
+            faqs += [
+                FAQ(service=service, question=f"Service {n} question {i}?", answer="Synthetic answer.\n\nTwo paragraphs.")
+                for i in range(options['faqs'])
+            ]
+            for i in range(options['subservices']):
+                sub = SubService.objects.create(
+                    parent_service=service,
+                    title=f"Seeded Sub-service {n}.{i}",
+                    description="What this sub-service does, in a couple of synthetic sentences. " * 2,
+                    color_theme=COLORS[i % len(COLORS)],
+                    order=i,
+                )
+                features += [
+                    SubServiceFeature(sub_service=sub, order=j, text=f"Feature {j} of sub-service {n}.{i}")
+                    for j in range(options['features'])
+                ]
+                faqs += [
+                    FAQ(sub_service=sub, question=f"Sub-service {n}.{i} question {j}?", answer="Synthetic answer.")
+                    for j in range(options['faqs'])
+                ]
+        SubServiceFeature.objects.bulk_create(features)
+        FAQ.objects.bulk_create(faqs)
+        Testimonial.objects.bulk_create(
+            Testimonial(name=f"Customer {i}", company=f"Company {i}", message="Synthetic praise. " * 6, order=i)
+            for i in range(options['testimonials'])
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['services']} services with {options['subservices']} sub-services each, "
+            f"{len(features)} features, {len(faqs)} FAQs and {options['testimonials']} testimonials."
+        ))
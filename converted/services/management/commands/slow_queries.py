@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from services import slow_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarise the slow-query log by query shape: how often each shape ran "
+        "slowly, its total, average and worst time, and where it was called "
+        "from (see services/slow_queries.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help="Shapes to show, 0 for all (default: 20).")
+        parser.add_argument(
+            '--sort', choices=slow_queries.SORT_KEYS, default='total',
+            help="Order by total time, count, worst or average time (default: total).",
+        )
+        parser.add_argument('--plans', action='store_true', help="Print the captured query plan of each shape.")
+        parser.add_argument('--log', help="Log file to read (default: SLOW_QUERIES['LOG']).")
+        parser.add_argument('--clear', action='store_true', help="Empty the log after printing it.")
+
+    def handle(self, *args, **options):
+        path = options['log'] or slow_queries.log_path()
+        rows = slow_queries.report(slow_queries.read_log(path), sort=options['sort'], top=options['top'])
+        if not rows:
+            self.stdout.write(f"No slow queries logged in {path}.")
+            return
+
+        self.stdout.write(f"{'fingerprint':<12} {'count':>6} {'total ms':>10} {'avg ms':>9} {'max ms':>9}  last seen")
+        for row in rows:
+            last = time.strftime('%Y-%m-%d %H:%M', time.localtime(row['last']))
+            self.stdout.write(self.style.WARNING(
+                f"{row['fingerprint']:<12} {row['count']:6d} {row['total']:10.1f} {row['avg']:9.1f} {row['max']:9.1f}  {last}"
+            ))
+            self.stdout.write(f"  {row['shape']}")
+            self.stdout.write(f"  slowest: params {row['params']}")
+            for site, count in sorted(row['sites'].items(), key=lambda item: -item[1])[:3]:
+                self.stdout.write(f"  {count:>5}x {site or '<unknown>'}")
+            if options['plans'] and row['plan']:
+                for line in row['plan']:
+                    self.stdout.write(f"  | {line}")
+            self.stdout.write('')
+
+        if options['clear']:
+            open(path, 'w').close()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {path}."))
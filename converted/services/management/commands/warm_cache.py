@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from services import checks, page_cache
+from services.catalog import get_catalog
+from services.models import Service, SubService
+
+
+def catalog_paths():
+    """URL of every public catalog page: active services and their active sub-services."""
+    paths = [
+        reverse('service_detail', args=[slug])
+        for slug in Service.objects.filter(is_active=True).order_by('id').values_list('slug', flat=True)
+    ]
+    paths += [
+        reverse('subservice_detail', args=[service_slug, slug])
+        for service_slug, slug in (
+            SubService.objects.filter(is_active=True, parent_service__is_active=True)
+            .order_by('id')
+            .values_list('parent_service__slug', 'slug')
+        )
+    ]
+    return paths
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-render every active Service and SubService page into the page cache "
+        "and report how long each one took to render."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Pages rendered in parallel (default: 4).")
+        parser.add_argument('--top', type=int, default=10, help="How many of the slowest pages to list (0 = all).")
+
+    def handle(self, *args, **options):
+        alias = page_cache.get_config()['CACHE']
+        if checks.is_process_local(alias):
+            raise CommandError(
+                f"The page cache '{alias}' is a LocMemCache: pages warmed here would disappear with this "
+                f"process, and the server would never see them. Point it at a shared cache backend first."
+            )
+        site = urlsplit(settings.SITE_URL)
+        # Requests must carry the public host so their cache keys match real visitors'.
+        self.factory = RequestFactory(HTTP_HOST=site.netloc)
+        self.secure = site.scheme == 'https'
+
+        paths = catalog_paths()
+        # Load the in-memory catalog once here rather than in every worker thread.
+        get_catalog()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            results = list(pool.map(self.render, paths))
+        elapsed = time.perf_counter() - started
+
+        failures = [r for r in results if r['error']]
+        results.sort(key=lambda r: r['ms'], reverse=True)
+        shown = results[:options['top']] if options['top'] else results
+
+        self.stdout.write(f"{'ms':>9}  {'bytes':>8}  status  path")
+        for r in shown:
+            status = 'ERROR' if r['error'] else r['status']
+            self.stdout.write(f"{r['ms']:9.1f}  {r['bytes']:8d}  {status:>6}  {r['path']}")
+            if r['error']:
+                self.stdout.write(self.style.ERROR(f"           {r['error']}"))
+
+        total_ms = sum(r['ms'] for r in results)
+        average = total_ms / len(results) if results else 0
+        summary = (
+            f"Warmed {len(results) - len(failures)}/{len(results)} pages in {elapsed:.2f}s "
+            f"(avg render {average:.1f} ms, {options['workers']} workers)."
+        )
+        self.stdout.write(self.style.ERROR(summary) if failures else self.style.SUCCESS(summary))
+
+    def render(self, path):
+        request = self.factory.get(path, secure=self.secure)
+        # What the session-free middleware path would have set for an anonymous visitor.
+        request._sessionless = True
+        request.user = AnonymousUser()
+        request.country = 'XX'
+
+        match = resolve(path)
+        request.resolver_match = match  # picks the view's template engine
+        view = getattr(match.func, 'refresh', match.func)
+        result = {'path': path, 'status': None, 'bytes': 0, 'ms': 0.0, 'error': None}
+        started = time.perf_counter()
+        try:
+            response = view(request, *match.args, **match.kwargs)
+            result['status'] = response.status_code
+            result['bytes'] = len(response.content)
+        except Exception as exc:
+            result['error'] = f"{type(exc).__name__}: {exc}"
+        finally:
+            result['ms'] = (time.perf_counter() - started) * 1000
+            connections.close_all()
+        return result
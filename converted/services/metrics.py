@@ -0,0 +1,354 @@
+"""
+Prometheus metrics for the app, served at /metrics.
+
+Every worker process adds to its own file in METRICS['DIR'] (`<pid>.db`),
+memory-mapped, so recording a sample is a dict lookup and an in-place float
+add with no lock shared between processes. The /metrics view reads every
+file in the directory and sums the series, so whichever worker answers the
+scrape reports the totals of all of them, including workers that have
+since exited. Clear DIR when the server is (re)started, e.g. in the
+service's ExecStartPre, or totals carry over from the previous run.
+
+    http_request_duration_seconds{view}     histogram; time until the response
+                                            is returned (streamed bodies excluded)
+    http_requests_total{view,status}        counter
+    db_queries_per_request{view}            histogram of queries per request
+    db_query_duration_seconds_total{view}   counter
+    page_cache_requests_total{result}       hit / miss / stale / rebuild
+    contact_submissions_total{result}       saved / duplicate / rate_limited / invalid
+    template_render_seconds{template}       histogram
+
+`view` is the URL name ('home', 'service_detail', ...), 'admin' for any
+admin page and 'unmatched' for 404s that resolved to no URL.
+
+The endpoint answers requests carrying `Authorization: Bearer <TOKEN>` or
+whose REMOTE_ADDR is in ALLOWED_IPS (CIDR ranges allowed); everything else
+gets a 404. Proxy headers are deliberately not consulted, and behind a local
+reverse proxy every visitor's REMOTE_ADDR is the proxy's, so only list
+addresses that reach the app directly.
+"""
+import ipaddress
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'DIR': None,  # defaults to <VAR_DIR>/cache/metrics
+    'TOKEN': '',
+    'ALLOWED_IPS': (),
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+def metrics_dir(config=None):
+    directory = (config or get_config())['DIR']
+    return Path(directory) if directory else Path(settings.VAR_DIR) / 'cache' / 'metrics'
+
+
+class ValueFile:
+    """
+    Append-only file of (key, float) entries, written through an mmap by a
+    single process:
+
+        header:  <Q used bytes>
+        entry:   <I key length> <key, padded to 8 bytes> <d value>
+
+    A new entry is written before `used` moves past it, so readers never see
+    a half-written key.
+    """
+    INITIAL_SIZE = 64 * 1024
+    HEADER = struct.Struct('<Q')
+    LENGTH = struct.Struct('<I')
+    VALUE = struct.Struct('<d')
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self.INITIAL_SIZE)
+        self._map()
+        self._used = self.HEADER.unpack_from(self._mmap, 0)[0] or self.HEADER.size
+        self._positions = {key: position for key, _, position in self.entries(self._mmap, self._used)}
+
+    def _map(self):
+        self._mmap = mmap.mmap(self._file.fileno(), os.fstat(self._file.fileno()).st_size)
+
+    @classmethod
+    def entries(cls, data, used=None):
+        """(key, value, value offset) for every entry in `data`."""
+        if used is None:
+            used = cls.HEADER.unpack_from(data, 0)[0] if len(data) >= cls.HEADER.size else 0
+        used = min(used, len(data))
+        position = cls.HEADER.size
+        while position < used:
+            length = cls.LENGTH.unpack_from(data, position)[0]
+            key_start = position + cls.LENGTH.size
+            value_at = key_start + length + (-(cls.LENGTH.size + length) % 8)
+            yield data[key_start:key_start + length].decode('utf-8'), cls.VALUE.unpack_from(data, value_at)[0], value_at
+            position = value_at + cls.VALUE.size
+
+    def _add_entry(self, key):
+        encoded = key.encode('utf-8')
+        padding = -(self.LENGTH.size + len(encoded)) % 8
+        size = self.LENGTH.size + len(encoded) + padding + self.VALUE.size
+        if self._used + size > len(self._mmap):
+            capacity = max(2 * len(self._mmap), self._used + size)
+            self._mmap.close()
+            self._file.truncate(capacity)
+            self._map()
+        position = self._used
+        self.LENGTH.pack_into(self._mmap, position, len(encoded))
+        self._mmap[position + self.LENGTH.size:position + self.LENGTH.size + len(encoded)] = encoded
+        value_at = position + self.LENGTH.size + len(encoded) + padding
+        self.VALUE.pack_into(self._mmap, value_at, 0.0)
+        self._used = value_at + self.VALUE.size
+        self.HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = value_at
+        return value_at
+
+    def add(self, key, amount):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._add_entry(key)
+        self.VALUE.pack_into(self._mmap, position, self.VALUE.unpack_from(self._mmap, position)[0] + amount)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+_values = None
+_pid = None
+# Only this process's threads ever write its file.
+_lock = threading.Lock()
+
+
+def _add(key, amount):
+    global _values, _pid
+    with _lock:
+        if _values is None or _pid != os.getpid():  # first use, or a forked worker
+            directory = metrics_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            _pid = os.getpid()
+            _values = ValueFile(directory / f'{_pid}.db')
+        _values.add(key, amount)
+
+
+def reset():
+    """Close this process's file (tests, or after DIR changed)."""
+    global _values
+    with _lock:
+        if _values is not None:
+            _values.close()
+        _values = None
+
+
+@lru_cache(maxsize=4096)
+def _series_key(name, suffix, labels):
+    return json.dumps([name, suffix, labels], separators=(',', ':'))
+
+
+def _key(name, suffix='', **labels):
+    return _series_key(name, suffix, tuple(sorted(labels.items())))
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if get_config()['ENABLED']:
+            _add(_key(self.name, '_total', **labels), amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(b) for b in buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        if not get_config()['ENABLED']:
+            return
+        # Each sample lands in one bucket; render() makes them cumulative.
+        bucket = next(b for b in self.buckets if value <= b)
+        _add(_key(self.name, '_bucket', le=_format(bucket), **labels), 1)
+        _add(_key(self.name, '_sum', **labels), value)
+
+
+REGISTRY = {}
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "Time spent producing a response, by URL name.", ['view'],
+)
+REQUESTS = Counter('http_requests', "Responses by URL name and status code.", ['view', 'status'])
+DB_QUERIES = Histogram(
+    'db_queries_per_request', "Database queries run per request, by URL name.", ['view'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME = Counter('db_query_duration_seconds', "Time spent in database queries, by URL name.", ['view'])
+PAGE_CACHE = Counter('page_cache_requests', "Page cache lookups by result.", ['result'])
+CONTACT_SUBMISSIONS = Counter('contact_submissions', "Contact form submissions by outcome.", ['result'])
+TEMPLATE_RENDER = Histogram('template_render_seconds', "Template render time, by template.", ['template'])
+
+
+def _format(value):
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+def collect(directory=None):
+    """{key: value} summed over every worker's file."""
+    totals = {}
+    for path in sorted(Path(directory or metrics_dir()).glob('*.db')):
+        try:
+            data = path.read_bytes()
+        except OSError:  # removed while we were listing
+            continue
+        for key, value, _ in ValueFile.entries(data):
+            totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def _labels(items):
+    if not items:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for name, value in items
+    )
+    return '{%s}' % ','.join(f'{name}="{value}"' for name, value in escaped)
+
+
+def render(totals=None):
+    """The Prometheus text exposition of every registered metric."""
+    if totals is None:
+        totals = collect()
+    series = {}
+    for key, value in totals.items():
+        name, suffix, labels = json.loads(key)
+        labels = tuple(tuple(item) for item in labels)
+        series.setdefault(name, {}).setdefault(suffix, []).append((labels, value))
+
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        samples = series.get(name, {})
+        if metric.type == 'counter':
+            for labels, value in sorted(samples.get('_total', ())):
+                lines.append(f'{name}_total{_labels(labels)} {value!r}')
+            continue
+
+        buckets = {}
+        for labels, value in samples.get('_bucket', ()):
+            le = dict(labels)['le']
+            rest = tuple(item for item in labels if item[0] != 'le')
+            buckets.setdefault(rest, {})[le] = value
+        sums = dict(samples.get('_sum', ()))
+        for labels in sorted(buckets):
+            cumulative = 0.0
+            for bound in metric.buckets:
+                le = _format(bound)
+                cumulative += buckets[labels].get(le, 0.0)
+                lines.append(f'{name}_bucket{_labels(labels + (("le", le),))} {cumulative!r}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative!r}')
+            lines.append(f'{name}_sum{_labels(labels)} {sums.get(labels, 0.0)!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    if 'admin' in match.namespaces:
+        return 'admin'
+    return match.url_name or match.view_name
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and database use per request. Goes first in
+    MIDDLEWARE so the timings cover the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_config()['ENABLED']:
+            return self.get_response(request)
+
+        queries = [0, 0.0]
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = view_label(request)
+        REQUEST_LATENCY.observe(elapsed, view=view)
+        REQUESTS.inc(view=view, status=str(response.status_code))
+        DB_QUERIES.observe(queries[0], view=view)
+        if queries[1]:
+            DB_TIME.inc(queries[1], view=view)
+        return response
+
+
+def _allowed(request, config):
+    header = request.headers.get('Authorization', '')
+    if config['TOKEN'] and header.startswith('Bearer '):
+        return constant_time_compare(header[len('Bearer '):], config['TOKEN'])
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in config['ALLOWED_IPS'])
+
+
+@never_cache
+def metrics_view(request):
+    config = get_config()
+    if not _allowed(request, config):
+        raise Http404
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.urls import Resolver404, resolve
+
+from .geoip import country_for_request
+
+
+class CountryMiddleware:
+    """
+    Sets ``request.country`` to an ISO country code ('XX' when unknown).
+
+    Cloudflare's CF-IPCountry header is used when present; otherwise the client
+    IP is resolved against the local GeoIP database (see services/geoip.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.country = country_for_request(request)
+        return self.get_response(request)
+
+
+# Modules whose views never need request.session or request.user.
+SESSIONLESS_MODULES = ('services.views', 'services.api')
+
+
+def is_sessionless(request):
+    """
+    True for anonymous GET/HEAD requests to the public ``services`` views
+    and the read-only catalog API.
+
+    These pages never need a session: flash messages live in a signed cookie
+    (MESSAGE_STORAGE) and nothing on them depends on the logged-in user. A
+    request that already carries a session cookie keeps the normal path so
+    logged-in staff still see themselves as logged in.
+    """
+    cached = getattr(request, '_sessionless', None)
+    if cached is not None:
+        return cached
+
+    sessionless = False
+    if request.method in ('GET', 'HEAD') and settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            match = None
+        sessionless = match is not None and match.func.__module__ in SESSIONLESS_MODULES
+    request._sessionless = sessionless
+    return sessionless
+
+
+class SessionlessSessionMiddleware(SessionMiddleware):
+    """SessionMiddleware that doesn't attach a session on the anonymous fast path."""
+
+    def process_request(self, request):
+        if not is_sessionless(request):
+            super().process_request(request)
+
+    def process_response(self, request, response):
+        if not hasattr(request, 'session'):
+            return response
+        return super().process_response(request, response)
+
+
+async def _anonymous_auser():
+    return AnonymousUser()
+
+
+class SessionlessAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware that skips the session lookup on the fast path."""
+
+    def process_request(self, request):
+        if is_sessionless(request):
+            request.user = AnonymousUser()
+            request.auser = _anonymous_auser
+            return
+        super().process_request(request)
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0013_service_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Testimonial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150)),
+                ('designation', models.CharField(blank=True, max_length=150)),
+                ('company', models.CharField(blank=True, max_length=200)),
+                ('message', models.TextField()),
+                ('photo', models.ImageField(blank=True, null=True, upload_to='testimonials/photos/')),
+                ('photo_thumbnail', models.ImageField(blank=True, editable=False, help_text='96px square crop of the photo, generated automatically.', null=True, upload_to='testimonials/thumbnails/')),
+                ('is_active', models.BooleanField(default=True)),
+                ('order', models.PositiveSmallIntegerField(default=0, help_text='Order for display (lower first)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Testimonial',
+                'verbose_name_plural': 'Testimonials',
+                'ordering': ['order', '-created_at'],
+            },
+        ),
+    ]
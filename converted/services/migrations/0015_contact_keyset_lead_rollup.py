@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def fill_lead_rollup(apps, schema_editor):
+    Contact = apps.get_model('services', 'Contact')
+    LeadRollup = apps.get_model('services', 'LeadRollup')
+    rows = (
+        Contact.objects.annotate(day=TruncDate('created_at'))
+        .values('day', 'service_interested')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    LeadRollup.objects.bulk_create(
+        LeadRollup(day=row['day'], service_id=row['service_interested'], count=row['n']) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0014_testimonial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Lead Rollup',
+                'verbose_name_plural': 'Lead Rollups',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['-created_at', '-id'], name='contact_created_keyset'),
+        ),
+        migrations.AddField(
+            model_name='leadrollup',
+            name='service',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lead_rollups', to='services.service'),
+        ),
+        migrations.AddConstraint(
+            model_name='leadrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'service'), name='lead_rollup_day_service'),
+        ),
+        migrations.RunPython(fill_lead_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:58
+
+from django.db import migrations, models
+from django.db.models import Count, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def refill_lead_rollup(apps, schema_editor):
+    # Existing rows were counted per (day, service) only; split them by source.
+    Contact = apps.get_model('services', 'Contact')
+    LeadRollup = apps.get_model('services', 'LeadRollup')
+    rows = (
+        Contact.objects.annotate(day=TruncDate('created_at'), source=Coalesce('page_source', Value('')))
+        .values('day', 'service_interested', 'source')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    LeadRollup.objects.all().delete()
+    LeadRollup.objects.bulk_create(
+        LeadRollup(day=row['day'], service_id=row['service_interested'], page_source=row['source'], count=row['n'])
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0015_contact_keyset_lead_rollup'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='leadrollup',
+            name='lead_rollup_day_service',
+        ),
+        migrations.AddField(
+            model_name='leadrollup',
+            name='page_source',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name='leadrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'service', 'page_source'), name='lead_rollup_day_service_source'),
+        ),
+        migrations.RunPython(refill_lead_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:09
+
+from django.db import migrations, models
+from PIL import Image
+
+from services import images
+
+
+def fill_placeholders(apps, schema_editor):
+    # Images uploaded before this migration; missing or unreadable files are
+    # skipped and simply render without a placeholder.
+    ServiceDetails = apps.get_model('services', 'ServiceDetails')
+    Testimonial = apps.get_model('services', 'Testimonial')
+    for details in ServiceDetails.objects.filter(short_section_image__gt=''):
+        try:
+            with details.short_section_image.open() as image:
+                width, height, preview = images.inspect(image)
+        except OSError:
+            continue
+        ServiceDetails.objects.filter(pk=details.pk).update(
+            short_section_image_width=width,
+            short_section_image_height=height,
+            short_section_image_placeholder=preview,
+        )
+    for testimonial in Testimonial.objects.filter(photo_thumbnail__gt=''):
+        try:
+            with testimonial.photo_thumbnail.open() as thumbnail, Image.open(thumbnail) as image:
+                preview = images.placeholder(image)
+        except OSError:
+            continue
+        Testimonial.objects.filter(pk=testimonial.pk).update(photo_placeholder=preview)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0016_lead_rollup_page_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicedetails',
+            name='short_section_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='servicedetails',
+            name='short_section_image_placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Tiny blurred preview of the image (data: URI), generated automatically.'),
+        ),
+        migrations.AddField(
+            model_name='servicedetails',
+            name='short_section_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='photo_placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Tiny blurred preview of the thumbnail (data: URI), generated automatically.'),
+        ),
+        migrations.RunPython(fill_placeholders, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,23 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
 from django.db import models
+from django.urls import Resolver404, resolve
 from django.utils.text import slugify
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
 from django.core.validators import MinLengthValidator
+from PIL import Image, ImageOps
+
+from . import images
+
+
+def is_reserved_slug(slug):
+    """True if /<slug>/ belongs to a route mounted before the services (the blog, the admin)."""
+    try:
+        return resolve(f'/{slug}/').url_name != 'service_detail'
+    except Resolver404:
+        return False
 
 
 class Service(models.Model):
@@ -19,6 +36,7 @@ class Service(models.Model):
         default=False,
         help_text="Set to True to make this service Details visible on the site."
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Service"
@@ -28,12 +46,16 @@ class Service(models.Model):
     def __str__(self):
         return self.service_name
 
+    def clean(self):
+        if self.slug and is_reserved_slug(self.slug):
+            raise ValidationError({'slug': f"/{self.slug}/ is already used by another part of the site."})
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.service_name)
             slug = base_slug
             counter = 1
-            while Service.objects.filter(slug=slug).exists():
+            while Service.objects.filter(slug=slug).exists() or is_reserved_slug(slug):
                 slug = f"{base_slug}-{counter}"
                 counter += 1
             self.slug = slug
@@ -57,6 +79,14 @@ class ServiceDetails(models.Model):
         blank=True,
         help_text="Image shown beside the short details (like illustration/card)"
     )
+    # Filled from the upload in save(); lets pages reserve the image's space up front.
+    short_section_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    short_section_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    short_section_image_placeholder = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Tiny blurred preview of the image (data: URI), generated automatically."
+    )
 
     # metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -89,6 +119,17 @@ class ServiceDetails(models.Model):
     def __str__(self):
         return f"Details for {self.service.service_name}"
 
+    def save(self, *args, **kwargs):
+        image = self.short_section_image
+        if not image:
+            self.short_section_image_width = self.short_section_image_height = None
+            self.short_section_image_placeholder = ''
+        elif not image._committed:
+            # A new upload: measure it before the FileField commits it to storage.
+            (self.short_section_image_width, self.short_section_image_height,
+             self.short_section_image_placeholder) = images.inspect(image)
+        super().save(*args, **kwargs)
+
 
 # Bullet points for the short-details area: name + description
 class BulletPointServices(models.Model):
@@ -143,11 +184,44 @@ class Contact(models.Model):
         verbose_name = "Contact Message"
         verbose_name_plural = "Contact Messages"
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination in the admin walks (created_at, id) backwards.
+            models.Index(fields=['-created_at', '-id'], name='contact_created_keyset'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.email})"
 
 
+class LeadRollup(models.Model):
+    """
+    Number of Contact messages received per day, service and page source, maintained as
+    leads come in (services/rollups.py) so the admin never has to COUNT(*)
+    or GROUP BY over the Contact table.
+    """
+    day = models.DateField()
+    service = models.ForeignKey(
+        Service,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='lead_rollups',
+    )
+    # Contact.page_source, with NULL stored as '' so it takes part in the unique key.
+    page_source = models.CharField(max_length=255, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Lead Rollup"
+        verbose_name_plural = "Lead Rollups"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'service', 'page_source'], name='lead_rollup_day_service_source'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.service or '-'} / {self.page_source or '-'}: {self.count}"
+
+
 
 class SubService(models.Model):
     """
@@ -228,8 +302,6 @@ class SubServiceFeature(models.Model):
         return f"{self.text} ({self.sub_service.title})"
 
 
-from django.core.exceptions import ValidationError
-
 class FAQ(models.Model):
     """
     Frequently Asked Questions — linked to either a main Service or a SubService.
@@ -277,3 +349,66 @@ class FAQ(models.Model):
             raise ValidationError("You must link this FAQ to either a Service or a SubService.")
         if self.service and self.sub_service:
             raise ValidationError("An FAQ cannot be linked to both a Service and a SubService.")
+
+
+class Testimonial(models.Model):
+    """
+    Customer quote shown on the homepage. Uploaded photos are cropped to a
+    square avatar thumbnail once, at upload time, so pages never ship the
+    full-size original.
+    """
+    THUMBNAIL_SIZE = 96
+
+    name = models.CharField(max_length=150)
+    designation = models.CharField(max_length=150, blank=True)
+    company = models.CharField(max_length=200, blank=True)
+    message = models.TextField()
+    photo = models.ImageField(upload_to='testimonials/photos/', null=True, blank=True)
+    photo_thumbnail = models.ImageField(
+        upload_to='testimonials/thumbnails/',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="96px square crop of the photo, generated automatically."
+    )
+    photo_placeholder = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Tiny blurred preview of the thumbnail (data: URI), generated automatically."
+    )
+    is_active = models.BooleanField(default=True)
+    order = models.PositiveSmallIntegerField(default=0, help_text="Order for display (lower first)")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Testimonial"
+        verbose_name_plural = "Testimonials"
+        ordering = ['order', '-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.company})" if self.company else self.name
+
+    def save(self, *args, **kwargs):
+        if not self.photo:
+            self.photo_thumbnail = None
+            self.photo_placeholder = ''
+        elif not self.photo._committed:
+            # A new upload: crop it before the FileField commits it to storage.
+            self.make_thumbnail()
+        super().save(*args, **kwargs)
+
+    def make_thumbnail(self):
+        size = (self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE)
+        self.photo.seek(0)
+        with Image.open(self.photo) as image:
+            image = ImageOps.exif_transpose(image)
+            thumbnail = ImageOps.fit(image.convert('RGB'), size, Image.LANCZOS)
+        self.photo.seek(0)
+        self.photo_placeholder = images.placeholder(thumbnail)
+
+        buffer = BytesIO()
+        thumbnail.save(buffer, format='JPEG', quality=85, optimize=True)
+        name = f"{PurePosixPath(self.photo.name).stem}_{self.THUMBNAIL_SIZE}.jpg"
+        self.photo_thumbnail.save(name, ContentFile(buffer.getvalue()), save=False)
@@ -0,0 +1,224 @@
+"""
+Stale-while-revalidate page cache for the public catalog views.
+
+Each cached page has two ages:
+  * SOFT_TTL - fresh; served straight from the cache.
+  * HARD_TTL - the cache entry's real timeout. Between the two the page is
+    stale: it is still served, and the first request to notice takes a lock in
+    the cache backend and rebuilds it in the background (single flight), so an
+    expiring popular page never causes a render stampede.
+
+Only anonymous GET/HEAD requests on the session-free fast path are cached,
+and only 200 responses that don't set cookies. Streamed responses are cached
+once the last chunk has gone out. When a stale page's rebuild comes back as a
+404 or anything else that can't be cached, the old copy is dropped rather than
+served until HARD_TTL. With CompressionMiddleware installed, pages are stored
+minified along with their Brotli/gzip bodies, so a hit compresses nothing.
+Hits, misses, stale hits and rebuilds are counted in metrics.PAGE_CACHE.
+"""
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+from . import compression, metrics
+from .middleware import is_sessionless
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CACHE': 'default',
+    'SOFT_TTL': 60,
+    'HARD_TTL': 60 * 10,
+    'LOCK_TTL': 30,
+    # Rebuild stale pages on a background thread (False = inline, for tests).
+    'BACKGROUND': True,
+    'MAX_WORKERS': 2,
+}
+
+# Headers that describe a single response/client and must never be replayed.
+SKIP_HEADERS = {'set-cookie', 'x-page-cache'}
+
+_executor = None
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PAGE_CACHE', {})}
+
+
+def _cache(config):
+    return caches[config['CACHE']]
+
+
+def _page_key(request):
+    url = request.build_absolute_uri()
+    return f"page:{hashlib.sha1(url.encode('utf-8')).hexdigest()}"
+
+
+def _cacheable_request(request):
+    # Profiled requests (services/profiling.py) must really run the view.
+    return request.method in ('GET', 'HEAD') and is_sessionless(request) and not getattr(request, 'profiling', False)
+
+
+def _cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+        and 'no-cache' not in response.get('Cache-Control', '')
+    )
+
+
+def _headers(response):
+    return [(k, v) for k, v in response.items() if k.lower() not in SKIP_HEADERS]
+
+
+def _save(config, key, content, headers):
+    entry = {'created': time.time(), 'content': content, 'headers': headers}
+    if compression.MIDDLEWARE in settings.MIDDLEWARE:
+        entry['content'], entry['variants'] = compression.encode_for_cache(content, headers)
+    _cache(config).set(key, entry, config['HARD_TTL'])
+
+
+def _drain(response):
+    """Full body of a response, consuming it if it is streamed."""
+    if not response.streaming:
+        return response.content
+    try:
+        if response.is_async:
+            async def collect():
+                return b''.join([chunk async for chunk in response.streaming_content])
+            return async_to_sync(collect)()
+        return b''.join(response.streaming_content)
+    finally:
+        response.close()
+
+
+def _store(config, key, response):
+    if not _cacheable_response(response):
+        return False
+    _save(config, key, _drain(response), _headers(response))
+    return True
+
+
+def _store_while_streaming(config, key, response):
+    """
+    Pass a streamed response through untouched and cache its body once the
+    last chunk has been sent, so a miss still streams to the visitor.
+    """
+    if not _cacheable_response(response):
+        return False
+    headers = _headers(response)
+    original = response.streaming_content
+    chunks = []
+
+    if response.is_async:
+        async def tee():
+            async for chunk in original:
+                chunks.append(chunk)
+                yield chunk
+            _save(config, key, b''.join(chunks), headers)
+    else:
+        def tee():
+            for chunk in original:
+                chunks.append(chunk)
+                yield chunk
+            _save(config, key, b''.join(chunks), headers)
+
+    response.streaming_content = tee()
+    return True
+
+
+def _replay(entry, state):
+    response = HttpResponse(entry['content'])
+    for name, value in entry['headers']:
+        response[name] = value
+    response['X-Page-Cache'] = state
+    if 'variants' in entry:
+        response.encoded_variants = entry['variants']
+    return response
+
+
+def _rebuild(config, key, lock_key, view, request, args, kwargs):
+    try:
+        try:
+            response = view(request, *args, **kwargs)
+        except Http404:
+            response = None
+        if response is None or not _store(config, key, response):
+            # The page is gone (deactivated, deleted) or no longer cacheable:
+            # stop replaying the old copy.
+            _cache(config).delete(key)
+            status = 404 if response is None else response.status_code
+            logger.info("Dropped cached %s: rebuild returned %s", request.path, status)
+    except Exception:
+        logger.exception("Background rebuild of %s failed", request.path)
+    finally:
+        _cache(config).delete(lock_key)
+        if config['BACKGROUND']:
+            # This thread's own DB connections; the request thread's are untouched.
+            connections.close_all()
+
+
+def _schedule(config, *args):
+    global _executor
+    if not config['BACKGROUND']:
+        _rebuild(config, *args)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=config['MAX_WORKERS'], thread_name_prefix='page-cache')
+    _executor.submit(_rebuild, config, *args)
+
+
+def swr_cache_page(view):
+    """Cache a view's anonymous GET responses with stale-while-revalidate."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        config = get_config()
+        key = _page_key(request)
+        entry = _cache(config).get(key)
+
+        if entry is None:
+            metrics.PAGE_CACHE.inc(result='miss')
+            response = view(request, *args, **kwargs)
+            store = _store_while_streaming if response.streaming else _store
+            if store(config, key, response):
+                response['X-Page-Cache'] = 'MISS'
+            return response
+
+        if time.time() - entry['created'] < config['SOFT_TTL']:
+            metrics.PAGE_CACHE.inc(result='hit')
+            return _replay(entry, 'HIT')
+
+        metrics.PAGE_CACHE.inc(result='stale')
+        lock_key = f"{key}:lock"
+        if _cache(config).add(lock_key, 1, config['LOCK_TTL']):
+            metrics.PAGE_CACHE.inc(result='rebuild')
+            _schedule(config, key, lock_key, view, request, args, kwargs)
+        return _replay(entry, 'STALE')
+
+    def refresh(request, *args, **kwargs):
+        """Render the view and store the result, ignoring any cached copy."""
+        config = get_config()
+        response = view(request, *args, **kwargs)
+        if _cacheable_response(response):
+            content = _drain(response)
+            _save(config, _page_key(request), content, _headers(response))
+            if response.streaming:
+                response = HttpResponse(content, headers=dict(_headers(response)))
+        return response
+
+    wrapper.refresh = refresh
+    return wrapper
@@ -0,0 +1,129 @@
+"""
+Warm-up for pre-forking servers.
+
+A server that imports the application in its master process and forks the
+workers afterwards (gunicorn --preload, uWSGI without lazy-apps) can do the
+work every worker would otherwise repeat on its first requests once, before
+the fork, so that the workers start warm and share those pages with the
+master:
+
+    URL resolvers        every namespace's reverse/lookup tables
+    templates            every template under the engines' directories,
+                         compiled into the loaders' caches
+    catalog              the in-memory catalog snapshot (services/catalog.py)
+    content types        ContentType's per-process cache, used by the admin
+    translations         the active language's catalogs
+
+website/wsgi.py calls warm() when DJANGO_PRELOAD is set. It closes the
+database and cache connections afterwards, since a socket or SQLite handle
+must never be shared by forked processes, and finishes with gc.freeze():
+objects that exist at fork time are moved out of the collector's reach, so
+the workers' collections don't write to (and copy) the pages they share.
+
+Don't set DJANGO_PRELOAD under runserver or a server that imports the app
+in every worker; it only adds to their startup there.
+"""
+import gc
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.urls import get_resolver
+from django.utils import translation
+
+from . import catalog
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = ('.html', '.txt', '.xml')
+
+
+def _resolvers(resolver):
+    yield resolver
+    for _, namespace_resolver in resolver.namespace_dict.values():
+        yield from _resolvers(namespace_resolver)
+
+
+def warm_urls():
+    count = 0
+    for resolver in _resolvers(get_resolver()):
+        resolver.reverse_dict  # populates the resolver's lookup tables
+        count += 1
+    return count
+
+
+def template_names(engine):
+    for directory in engine.template_dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(TEMPLATE_SUFFIXES):
+                    yield os.path.relpath(os.path.join(root, name), directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    count = 0
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+                # Partials that only compile inside their parent, for example.
+                logger.debug("Not preloading %s (%s): %s", name, engine.name, exc)
+            else:
+                count += 1
+    return count
+
+
+def warm_catalog():
+    snapshot = catalog.get_catalog()
+    return len(snapshot.active_service_ids)
+
+
+def warm_content_types():
+    from django.contrib.contenttypes.models import ContentType
+
+    return len(ContentType.objects.get_for_models(*apps.get_models()))
+
+
+def warm_translations():
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.gettext('')
+    translation.deactivate()
+    return 1
+
+
+STEPS = (
+    ('urls', warm_urls),
+    ('templates', warm_templates),
+    ('catalog', warm_catalog),
+    ('content_types', warm_content_types),
+    ('translations', warm_translations),
+)
+
+
+def warm(freeze=True):
+    """Run every step, close shared connections and freeze the GC. Returns {step: (count, ms)}."""
+    report = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            count = step()
+        except DatabaseError as exc:
+            # No database yet (first deploy, before migrate): workers build it themselves.
+            logger.warning("Preload step %s skipped: %s", name, exc)
+            count = None
+        report[name] = (count, round((time.perf_counter() - started) * 1000, 1))
+
+    connections.close_all()
+    caches.close_all()
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    logger.info("Preloaded %s", ', '.join(f"{name} {count} in {ms} ms" for name, (count, ms) in report.items()))
+    return report
@@ -0,0 +1,252 @@
+"""
+On-demand profiling of single requests.
+
+A staff member creates a short-lived signed token on the admin's "Profiles"
+page and adds it to any URL, as ``?_profile=<token>`` or in an
+``X-Profile-Token`` header. ProfilingMiddleware then runs that one request
+(page cache bypassed, streamed bodies included) under a sampling profiler and
+records every SQL statement with its duration and call site. It stores:
+
+    <DIR>/<id>.json             request, timings, SQL
+    <DIR>/<id>.speedscope.json  call stacks, for https://www.speedscope.app
+
+and names the report in an X-Profile-Report response header. Frames of
+Django's Template._render are labelled with the template name, so template
+time shows up per template in the flamegraph. Jinja2 templates show up under
+their own file names.
+
+Requests without a token pay for two dict lookups and nothing else.
+"""
+import json
+import sys
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.template.base import Template
+from django.utils.cache import add_never_cache_headers
+
+from .utils import call_site
+
+
+DEFAULTS = {
+    'DIR': None,  # defaults to <VAR_DIR>/cache/profiles
+    'INTERVAL': 0.001,  # seconds between samples
+    'TOKEN_MAX_AGE': 60 * 60,
+    'KEEP': 200,  # newest reports kept on disk
+}
+PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE_TOKEN'
+SALT = 'services.profiling'
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+TEMPLATE_CODE = Template._render.__code__
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PROFILING', {})}
+
+
+def reports_dir(config=None):
+    directory = (config or get_config())['DIR']
+    return Path(directory) if directory else Path(settings.VAR_DIR) / 'cache' / 'profiles'
+
+
+def make_token(user):
+    return signing.TimestampSigner(salt=SALT).sign(str(user.pk))
+
+
+def check_token(token, config=None):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(token, max_age=(config or get_config())['TOKEN_MAX_AGE'])
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class Sampler:
+    """Samples one thread's call stack every `interval` seconds from a helper thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = []  # [(name, file, line)]
+        self.frame_index = {}
+        self.samples = []  # [(seconds since start, [frame index, root first])]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.ended = time.perf_counter()
+
+    def _frame(self, frame):
+        code = frame.f_code
+        name = code.co_name
+        if code is TEMPLATE_CODE:
+            template = frame.f_locals.get('self')
+            name = f"template {getattr(template, 'name', None) or '<string>'}"
+        key = (name, code.co_filename, code.co_firstlineno)
+        index = self.frame_index.get(key)
+        if index is None:
+            index = self.frame_index[key] = len(self.frames)
+            self.frames.append(key)
+        return index
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append((time.perf_counter() - self.started, stack))
+
+    def speedscope(self, name):
+        weights = []
+        previous = 0.0
+        for at, _ in self.samples:
+            weights.append(round((at - previous) * 1000, 3))
+            previous = at
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'services.profiling',
+            'activeProfileIndex': 0,
+            'shared': {'frames': [{'name': n, 'file': f, 'line': line} for n, f, line in self.frames]},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round((self.ended - self.started) * 1000, 3),
+                'samples': [stack for _, stack in self.samples],
+                'weights': weights,
+            }],
+        }
+
+
+def _requested(request):
+    token = request.META.get(HEADER)
+    if token is None and PARAM in request.META.get('QUERY_STRING', ''):
+        token = request.GET.get(PARAM)
+    return token
+
+
+def _path_without_token(request):
+    query = request.GET.copy()
+    query.pop(PARAM, None)
+    return f"{request.path}?{query.urlencode()}" if query else request.path
+
+
+def list_reports(directory=None):
+    """Report metadata, newest first."""
+    reports = []
+    for path in sorted(Path(directory or reports_dir()).glob('*.json'), reverse=True):
+        if path.name.endswith('.speedscope.json'):
+            continue
+        try:
+            reports.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return reports
+
+
+def report_path(report_id, kind='json', directory=None):
+    """Path of a stored report file; None for ids that aren't ours."""
+    if not report_id.replace('-', '').isalnum():
+        return None
+    suffix = '.speedscope.json' if kind == 'speedscope' else '.json'
+    path = Path(directory or reports_dir()) / f"{report_id}{suffix}"
+    return path if path.is_file() else None
+
+
+def _prune(directory, keep):
+    reports = sorted(directory.glob('*.speedscope.json'), reverse=True)
+    for stale in reports[keep:]:
+        stale.unlink(missing_ok=True)
+        stale.with_name(stale.name.replace('.speedscope.json', '.json')).unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _requested(request)
+        if token is None:
+            return self.get_response(request)
+        config = get_config()
+        if not check_token(token, config):
+            return self.get_response(request)
+        return self.profile(request, config)
+
+    def profile(self, request, config):
+        request.profiling = True  # read by the page cache, so the view really runs
+        queries = []
+
+        def record_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append({
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                    'many': many,
+                    'site': call_site(),
+                })
+
+        sampler = Sampler(threading.get_ident(), config['INTERVAL'])
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+                if response.streaming and not response.is_async:
+                    # Render the streamed body now, inside the profile.
+                    response.streaming_content = list(response.streaming_content)
+        finally:
+            sampler.stop()
+        elapsed = time.perf_counter() - started
+
+        report_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        match = getattr(request, 'resolver_match', None)
+        meta = {
+            'id': report_id,
+            'created': time.time(),
+            'method': request.method,
+            'path': _path_without_token(request),
+            'view': match.view_name if match else '',
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 3),
+            'samples': len(sampler.samples),
+            'sql_count': len(queries),
+            'sql_ms': round(sum(q['ms'] for q in queries), 3),
+            'sql': queries,
+        }
+        directory = reports_dir(config)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{report_id}.speedscope.json").write_text(
+            json.dumps(sampler.speedscope(f"{request.method} {meta['path']}"))
+        )
+        (directory / f"{report_id}.json").write_text(json.dumps(meta))
+        _prune(directory, config['KEEP'])
+
+        response['X-Profile-Report'] = report_id
+        add_never_cache_headers(response)
+        return response
@@ -0,0 +1,122 @@
+"""
+Lead counts kept in the LeadRollup table.
+
+Every Contact insert adds one to its (day, service, page_source) row, every
+delete takes one off and an edit that changes the service or page source moves
+the count to the new row (services/signals.py), all in the same transaction as
+the write. The admin changelist filters and the lead dashboard read only this
+table, summing a few hundred small rows instead of aggregating the whole
+Contact table next to production writes. rebuild() (the backfill_lead_rollup
+command) recounts a date range from Contact.
+
+Reads always SUM() over the matching rows, so the occasional duplicate
+(day, NULL, source) row - NULLs never collide in a unique constraint - is
+harmless.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Contact, LeadRollup
+
+
+def lead_day(contact):
+    return timezone.localdate(contact.created_at)
+
+
+def record(day, service_id, page_source='', delta=1):
+    """Add `delta` to the (day, service, page_source) count, creating the row if needed."""
+    rows = LeadRollup.objects.filter(day=day, service_id=service_id, page_source=page_source)
+    pk = rows.values_list('pk', flat=True).first()
+    if pk is not None:
+        row = LeadRollup.objects.filter(pk=pk)
+        if delta < 0:
+            row = row.filter(count__gte=-delta)  # never below zero
+        row.update(count=F('count') + delta)
+        return
+    if delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            LeadRollup.objects.create(day=day, service_id=service_id, page_source=page_source, count=delta)
+    except IntegrityError:
+        # Another request created the row first.
+        rows.update(count=F('count') + delta)
+
+
+def key(contact):
+    """The (day, service_id, page_source) row a contact is counted in."""
+    return lead_day(contact), contact.service_interested_id, contact.page_source or ''
+
+
+def record_contact(contact, delta=1):
+    record(*key(contact), delta=delta)
+
+
+def move_contact(old_key, contact):
+    """Move an edited contact's count from the row it was counted in to its current one."""
+    new_key = key(contact)
+    if old_key != new_key:
+        record(*old_key, delta=-1)
+        record(*new_key)
+
+
+@transaction.atomic
+def rebuild(since=None, until=None):
+    """
+    Recount the rollup from Contact for days in [since, until] (both optional).
+    Returns the number of rollup rows written.
+    """
+    rollup = LeadRollup.objects.all()
+    contacts = Contact.objects.annotate(day=TruncDate('created_at'))
+    if since is not None:
+        rollup = rollup.filter(day__gte=since)
+        contacts = contacts.filter(day__gte=since)
+    if until is not None:
+        rollup = rollup.filter(day__lte=until)
+        contacts = contacts.filter(day__lte=until)
+
+    counts = (
+        contacts.annotate(source=Coalesce('page_source', Value('')))
+        .values('day', 'service_interested', 'source')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    rollup.delete()
+    created = LeadRollup.objects.bulk_create(
+        LeadRollup(day=row['day'], service_id=row['service_interested'], page_source=row['source'], count=row['n'])
+        for row in counts
+    )
+    return len(created)
+
+
+def _rows(since=None):
+    rows = LeadRollup.objects.all()
+    if since is not None:
+        rows = rows.filter(day__gte=since)
+    return rows
+
+
+def total(since=None):
+    return _rows(since).aggregate(n=Sum('count'))['n'] or 0
+
+
+def counts_by_service(since=None):
+    """{service_id or None: number of leads}."""
+    return dict(_rows(since).values('service').annotate(n=Sum('count')).order_by().values_list('service', 'n'))
+
+
+def breakdown(*fields, since=None):
+    """
+    Lead counts grouped by `fields` (any of 'day', 'service', 'page_source')
+    as dicts with an extra 'count' key, largest first.
+    """
+    return list(_rows(since).values(*fields).annotate(count=Sum('count')).order_by('-count', *fields))
+
+
+def since_days(days):
+    """First day of a `days`-long window ending today (1 = today only)."""
+    return timezone.localdate() - timedelta(days=days - 1)
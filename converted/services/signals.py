@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalog, icons, rollups, sitemaps, slow_queries
+from .models import (
+    FAQ, BulletPointServices, Contact, Service, ServiceDetails, SubService, SubServiceFeature, Testimonial,
+)
+
+
+CATALOG_MODELS = (
+    Service, ServiceDetails, BulletPointServices, SubService, SubServiceFeature, FAQ, Testimonial,
+)
+
+
+# Bumped after commit so no worker can rebuild its snapshot from data
+# that another transaction might still roll back.
+@receiver(post_save)
+@receiver(post_delete)
+def bump_catalog_version(sender, **kwargs):
+    if sender in CATALOG_MODELS:
+        transaction.on_commit(catalog.bump_version)
+
+
+# A service's slug or is_active flag also decides which sub-service URLs exist,
+# so a Service change reschedules its sub-services' pages too. Deleting one
+# cascades to its sub-services, whose own post_delete schedules them.
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def refresh_service_sitemaps(sender, instance, **kwargs):
+    sitemaps.schedule('services', [instance.pk])
+    sitemaps.schedule('subservices', instance.sub_services.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=SubService)
+@receiver(post_delete, sender=SubService)
+def refresh_subservice_sitemaps(sender, instance, **kwargs):
+    sitemaps.schedule('subservices', [instance.pk])
+
+
+# The details are part of the service page and its sitemap lastmod.
+@receiver(post_save, sender=ServiceDetails)
+@receiver(post_delete, sender=ServiceDetails)
+def refresh_details_sitemap(sender, instance, **kwargs):
+    sitemaps.schedule('services', [instance.service_id])
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=SubService)
+def refresh_icon_subset(sender, instance, **kwargs):
+    icon_class = instance.icon_class
+    transaction.on_commit(lambda: icons.rebuild_if_needed(icon_class))
+
+
+# Bullet points, features and FAQs have no timestamp the API's ETags could use,
+# so a write to one moves its parent's updated_at instead. update() sends no
+# signals, so the parent's sitemap page (its lastmod just moved) is scheduled
+# here; the icon receiver has nothing to do.
+SITEMAP_SECTIONS = {
+    Service: ('services', 'pk'),
+    ServiceDetails: ('services', 'service_id'),
+    SubService: ('subservices', 'pk'),
+}
+
+
+def _touch(model, pk):
+    if pk is None:
+        return
+    rows = model.objects.filter(pk=pk)
+    rows.update(updated_at=timezone.now())
+    section, field = SITEMAP_SECTIONS[model]
+    sitemaps.schedule(section, rows.values_list(field, flat=True))
+
+
+@receiver(post_save, sender=BulletPointServices)
+@receiver(post_delete, sender=BulletPointServices)
+def touch_bullet_point_parent(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _touch(ServiceDetails, instance.details_id)
+
+
+@receiver(post_save, sender=SubServiceFeature)
+@receiver(post_delete, sender=SubServiceFeature)
+def touch_feature_parent(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _touch(SubService, instance.sub_service_id)
+
+
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def touch_faq_parent(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _touch(Service, instance.service_id)
+        _touch(SubService, instance.sub_service_id)
+
+
+# Staff can change a lead's service or page source in the admin; remember
+# the row it is counted in so post_save can move it.
+@receiver(pre_save, sender=Contact)
+def remember_counted_lead(sender, instance, raw=False, **kwargs):
+    if instance.pk is None or raw:
+        return
+    old = Contact.objects.filter(pk=instance.pk).only('created_at', 'service_interested', 'page_source').first()
+    instance._rollup_key = rollups.key(old) if old is not None else None
+
+
+# Kept in the writing transaction so a rolled-back lead is never counted.
+@receiver(post_save, sender=Contact)
+def count_new_lead(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_key = instance.__dict__.pop('_rollup_key', None)
+    if created:
+        rollups.record_contact(instance)
+    elif old_key is not None:
+        rollups.move_contact(old_key, instance)
+
+
+@receiver(post_delete, sender=Contact)
+def uncount_deleted_lead(sender, instance, **kwargs):
+    rollups.record_contact(instance, delta=-1)
+
+
+@receiver(connection_created)
+def install_slow_query_log(sender, connection, **kwargs):
+    slow_queries.install(connection)
@@ -0,0 +1,247 @@
+"""
+Pre-rendered sitemap.xml, sitemap index and robots.txt.
+
+Files are written to settings.SITEMAP_ROOT and served as-is, so a crawler hit
+costs one file read. Each section (services, subservices) is paginated into
+files of at most SITEMAP_PAGE_SIZE URLs, ordered by id.
+
+The signals in services/signals.py schedule() the rows a write touched. Every
+change in one transaction is collected and flushed by a single on_commit hook,
+which rewrites only the pages holding those rows: a page is rewritten, and so
+are the ones after it only while its last id moves (rows came or went). Editing
+one service rewrites one page; adding one rewrites the last page. The manifest
+remembers each page's lastmod and last id.
+
+The flush runs synchronously in the admin save's response; a large catalog
+would want it moved to a task queue.
+"""
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+from .models import Service, SubService
+
+
+# The sitemaps.org protocol caps a single sitemap file at 50,000 URLs.
+MAX_PAGE_SIZE = 50000
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'sitemap.xml'
+ROBOTS_NAME = 'robots.txt'
+# Readable by a front web server serving SITEMAP_ROOT directly; mkstemp() creates 0600 files.
+FILE_MODE = 0o644
+
+
+def _root():
+    return Path(settings.SITEMAP_ROOT)
+
+
+def _page_size():
+    return min(getattr(settings, 'SITEMAP_PAGE_SIZE', MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+
+
+def _absolute(path):
+    return settings.SITE_URL.rstrip('/') + path
+
+
+def _lastmod(value):
+    return value.isoformat(timespec='seconds')
+
+
+def _service_urls(after=0):
+    # The page also shows the details (and their bullet points, which touch them).
+    rows = (
+        Service.objects.filter(is_active=True, id__gt=after)
+        .order_by('id')
+        .values_list('id', 'slug', 'updated_at', Coalesce('details__updated_at', 'updated_at'))
+    )
+    for pk, slug, updated_at, details_updated_at in rows.iterator():
+        yield pk, reverse('service_detail', args=[slug]), max(updated_at, details_updated_at)
+
+
+def _subservice_urls(after=0):
+    rows = (
+        SubService.objects.filter(is_active=True, parent_service__is_active=True, id__gt=after)
+        .order_by('id')
+        .values_list('id', 'parent_service__slug', 'slug', 'updated_at')
+    )
+    for pk, service_slug, slug, updated_at in rows.iterator():
+        yield pk, reverse('subservice_detail', args=[service_slug, slug]), updated_at
+
+
+SECTIONS = {
+    'services': _service_urls,
+    'subservices': _subservice_urls,
+}
+
+
+def page_filename(section, page):
+    return f"sitemap-{section}-{page}.xml"
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+        fh.write(data)
+    os.chmod(tmp, FILE_MODE)
+    os.replace(tmp, path)
+
+
+def _write_page(section, page, entries):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for _, path, updated_at in entries:
+        lines.append(
+            f"<url><loc>{escape(_absolute(path))}</loc><lastmod>{_lastmod(updated_at)}</lastmod></url>"
+        )
+    lines.append('</urlset>')
+    _write_atomic(_root() / page_filename(section, page), '\n'.join(lines) + '\n')
+    return {
+        'lastmod': _lastmod(max(updated_at for _, _, updated_at in entries)),
+        'last_id': entries[-1][0],
+    }
+
+
+def _read_manifest():
+    try:
+        return json.loads((_root() / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _first_stale_page(pages, changed):
+    """Index of the first page a change to the `changed` ids can alter."""
+    first = min(changed)
+    for index, page in enumerate(pages):
+        if page['last_id'] >= first:
+            return index
+    # Only rows past the end: they join the last page, or start a new one.
+    return max(len(pages) - 1, 0)
+
+
+def write_section(section, pages=None, changed=None):
+    """
+    Rewrite one section and return its manifest entry: [{'lastmod', 'last_id'}]
+    per page. With the section's current `pages` and the `changed` row ids,
+    only the pages those rows are (or were) on are rewritten, plus the pages
+    after them while rows coming or going shift the page boundaries.
+    """
+    if changed is None or pages is None or not all(isinstance(page, dict) for page in pages):
+        pages, changed = [], None  # everything (or a manifest from before last ids)
+    elif not changed:
+        return pages
+    pages = list(pages)
+    start = _first_stale_page(pages, changed) if changed else 0
+    old, pages = pages, pages[:start]
+    after = pages[-1]['last_id'] if pages else 0
+    last_changed = max(changed) if changed else None
+
+    size = _page_size()
+    chunk = []
+    for entry in SECTIONS[section](after):
+        chunk.append(entry)
+        if len(chunk) < size:
+            continue
+        index = len(pages)
+        pages.append(_write_page(section, index + 1, chunk))
+        chunk = []
+        boundary = pages[index]['last_id']
+        if changed is not None and index < len(old) and old[index]['last_id'] == boundary >= last_changed:
+            # Same boundary and nothing changed further on: the rest is as it was.
+            return pages + old[index + 1:]
+    if chunk:
+        pages.append(_write_page(section, len(pages) + 1, chunk))
+
+    # Drop pages left over from when the section was bigger.
+    stale = len(pages) + 1
+    while (_root() / page_filename(section, stale)).exists():
+        (_root() / page_filename(section, stale)).unlink()
+        stale += 1
+    return pages
+
+
+def write_index(manifest):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for section in SECTIONS:
+        for number, page in enumerate(manifest.get(section, []), start=1):
+            loc = _absolute(reverse('sitemap_section', args=[section, number]))
+            lines.append(f"<sitemap><loc>{escape(loc)}</loc><lastmod>{page['lastmod']}</lastmod></sitemap>")
+    lines.append('</sitemapindex>')
+    _write_atomic(_root() / INDEX_NAME, '\n'.join(lines) + '\n')
+    _write_atomic(_root() / MANIFEST_NAME, json.dumps(manifest))
+
+
+def write_robots():
+    robots = [
+        'User-agent: *',
+        f"Disallow: {reverse('admin:index')}",
+        '',
+        f"Sitemap: {_absolute(reverse('sitemap_index'))}",
+    ]
+    _write_atomic(_root() / ROBOTS_NAME, '\n'.join(robots) + '\n')
+
+
+def regenerate(sections=None, changed=None):
+    """
+    Rebuild the given sections (all when None), then the index and robots.txt.
+    `changed` maps a section to the ids of the rows that changed in it, so
+    only their pages are rewritten; sections without an entry are rewritten
+    whole. Sections that aren't rebuilt keep their pages and manifest entries.
+    """
+    manifest = _read_manifest()
+    changed = changed or {}
+    for section in sections or SECTIONS:
+        manifest[section] = write_section(section, manifest.get(section), changed.get(section))
+    write_index(manifest)
+    write_robots()
+
+
+# Row ids scheduled by this thread's open transaction: {section: {id}}.
+_pending = threading.local()
+
+
+def schedule(section, ids):
+    """
+    Rewrite the pages holding `ids` of `section` once the current transaction
+    commits (right away outside one). However many rows a transaction touches -
+    a Service deleted with its sub-services, a formset save - it is flushed by
+    one regenerate().
+    """
+    pending = _pending.__dict__.setdefault('changed', {})
+    pending.setdefault(section, set()).update(pk for pk in ids if pk is not None)
+    # One hook per call, not per transaction: a rollback drops the hooks but
+    # not `pending`, so a later commit still flushes (the ids then cost one
+    # extra rewrite). The first hook to run takes everything; the rest find nothing.
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    changed = _pending.__dict__.pop('changed', None)
+    if changed:
+        regenerate([section for section in SECTIONS if section in changed], changed)
+
+
+def sitemap_file(name):
+    """Path of a pre-rendered file, building everything on first use."""
+    path = _root() / name
+    if not path.exists() and not (_root() / INDEX_NAME).exists():
+        regenerate()
+    return path
+
+
+def reset():
+    """Forget ids scheduled by transactions that rolled back (tests)."""
+    _pending.__dict__.pop('changed', None)
@@ -0,0 +1,169 @@
+"""
+Slow-query log.
+
+install() (run for every new database connection, see services/signals.py)
+adds an execute wrapper that times each statement. Any statement slower than
+SLOW_QUERIES['THRESHOLD_MS'] is appended to a JSON-lines log with its SQL,
+parameters, duration and Python call site. The first time a process sees a
+query shape, the log line also carries the plan: EXPLAIN QUERY PLAN on SQLite,
+EXPLAIN elsewhere, for SELECTs only.
+
+Query shapes are fingerprinted: literals, placeholders and IN-lists are
+normalised away, so `WHERE id = 3` and `WHERE id = 7` share a fingerprint.
+report() folds the log into one row per fingerprint, which is what
+`manage.py slow_queries` prints.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .utils import call_site
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 100,
+    'LOG': None,  # defaults to <VAR_DIR>/cache/slow_queries.jsonl
+    'EXPLAIN': True,
+}
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w."])-?\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+_state = threading.local()
+_explained = set()
+_write_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'SLOW_QUERIES', {})}
+
+
+def log_path(config=None):
+    path = (config or get_config())['LOG']
+    return Path(path) if path else Path(settings.VAR_DIR) / 'cache' / 'slow_queries.jsonl'
+
+
+def normalize(sql):
+    """The shape of a statement, with every value replaced by '?'."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode('utf-8')).hexdigest()[:12]
+
+
+def explain(connection, sql, params):
+    """The plan of a SELECT as a list of lines, or None."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    _state.explaining = True
+    try:
+        # A savepoint keeps a failed EXPLAIN from breaking the caller's transaction.
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except DatabaseError as exc:
+        return [f'EXPLAIN failed: {exc}']
+    finally:
+        _state.explaining = False
+
+
+def record(connection, sql, params, elapsed_ms, config):
+    key = fingerprint(sql)
+    entry = {
+        'at': time.time(),
+        'fingerprint': key,
+        'ms': round(elapsed_ms, 3),
+        'sql': sql,
+        'params': repr(params)[:1000],
+        'site': call_site(),
+        'alias': connection.alias,
+    }
+    if config['EXPLAIN'] and key not in _explained:
+        _explained.add(key)
+        entry['plan'] = explain(connection, sql, params)
+    logger.warning("Slow query (%.1f ms) %s at %s", elapsed_ms, key, entry['site'])
+
+    path = log_path(config)
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(entry) + '\n')
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if getattr(_state, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    # Failed statements aren't logged: their transaction may be unusable for EXPLAIN.
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    config = get_config()
+    if config['ENABLED'] and elapsed_ms >= config['THRESHOLD_MS']:
+        record(context['connection'], sql, params if not many else None, elapsed_ms, config)
+    return result
+
+
+def install(connection):
+    # connection_created fires on every reconnect of the same wrapper object.
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def read_log(path=None):
+    try:
+        with open(path or log_path(), encoding='utf-8') as log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:  # a line cut short by a crash
+                    continue
+    except FileNotFoundError:
+        return
+
+
+SORT_KEYS = ('total', 'count', 'max', 'avg')
+
+
+def report(entries, sort='total', top=20):
+    """One row per fingerprint, heaviest first."""
+    rows = {}
+    for entry in entries:
+        row = rows.get(entry['fingerprint'])
+        if row is None:
+            row = rows[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'shape': normalize(entry['sql']),
+                'count': 0, 'total': 0.0, 'max': 0.0, 'sites': {}, 'plan': None,
+            }
+        row['count'] += 1
+        row['total'] += entry['ms']
+        if entry['ms'] >= row['max']:
+            row['max'] = entry['ms']
+            row['sql'] = entry['sql']
+            row['params'] = entry['params']
+        row['last'] = max(row.get('last', 0), entry['at'])
+        row['sites'][entry['site']] = row['sites'].get(entry['site'], 0) + 1
+        if entry.get('plan'):
+            row['plan'] = entry['plan']
+    for row in rows.values():
+        row['avg'] = row['total'] / row['count']
+    return sorted(rows.values(), key=lambda row: row[sort], reverse=True)[:top or None]
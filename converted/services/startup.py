@@ -0,0 +1,160 @@
+"""
+Worker startup measurements behind `manage.py profile_startup`.
+
+The command runs this module in fresh interpreters, since a process that
+already has Django loaded can't tell how long loading it takes:
+
+    python -X importtime -c "import website.wsgi"    import time per module
+    python -m services.startup --workers 4 ...        a miniature pre-fork server
+
+The second loads the WSGI application (with DJANGO_PRELOAD set or not), then
+forks `--workers` children the way gunicorn does. Each child serves a few
+requests straight through the WSGI callable, runs a full collection, as any
+worker soon would, and reports its request timings and memory. The result is
+printed as JSON.
+
+Nothing here may import Django at module level: the probe has to start cold.
+"""
+import argparse
+import gc
+import importlib
+import io
+import json
+import os
+import re
+import resource
+import sys
+import time
+
+
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def parse_import_times(text):
+    """[(module, self µs, cumulative µs, depth)] from `python -X importtime` output, in import order."""
+    modules = []
+    for line in text.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative), len(indent) // 2))
+    return modules
+
+
+def memory(pid='self'):
+    """Memory of a process in KiB: rss, pss, shared and private (Linux), or just max rss elsewhere."""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            values = {}
+            for line in smaps:
+                field, _, rest = line.partition(':')
+                if field in SMAPS_FIELDS:
+                    values[field] = int(rest.split()[0])
+    except OSError:
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'shared': values['Shared_Clean'] + values['Shared_Dirty'],
+        'private': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def call(application, path, host):
+    """Send one GET through a WSGI callable; returns the status code."""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(statuses[0].split()[0])
+
+
+def worker(application, paths, host, requests):
+    timings = []
+    statuses = []
+    for number in range(requests):
+        path = paths[number % len(paths)]
+        started = time.perf_counter()
+        statuses.append(call(application, path, host))
+        timings.append(round((time.perf_counter() - started) * 1000, 2))
+    gc.collect()
+    return {'pid': os.getpid(), 'ms': timings, 'statuses': statuses, 'memory': memory()}
+
+
+def probe(wsgi, preload, workers, paths, host, requests):
+    if preload:
+        os.environ['DJANGO_PRELOAD'] = '1'
+    else:
+        os.environ.pop('DJANGO_PRELOAD', None)
+    module, _, attribute = wsgi.rpartition('.')
+    started = time.perf_counter()
+    application = getattr(importlib.import_module(module), attribute)
+    load_ms = round((time.perf_counter() - started) * 1000, 1)
+    if not preload:
+        from django.db import connections
+
+        connections.close_all()  # get_wsgi_application() doesn't connect, but be sure
+
+    children = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                report = worker(application, paths, host, requests)
+            except BaseException as exc:
+                report = {'pid': os.getpid(), 'error': repr(exc)}
+            with os.fdopen(write_fd, 'w') as pipe:
+                json.dump(report, pipe)
+            os._exit(0)
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    reports = []
+    for pid, read_fd in children:
+        with os.fdopen(read_fd) as pipe:
+            reports.append(json.loads(pipe.read() or '{}'))
+        os.waitpid(pid, 0)
+    return {'preload': preload, 'load_ms': load_ms, 'master': memory(), 'workers': reports}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--wsgi', default='website.wsgi.application')
+    parser.add_argument('--preload', action='store_true')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--path', action='append', dest='paths')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--requests', type=int, default=3)
+    args = parser.parse_args(argv)
+    result = probe(args.wsgi, args.preload, args.workers, args.paths or ['/'], args.host, args.requests)
+    json.dump(result, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under a name derived from their bytes instead of the name
+they were uploaded with:
+
+    service_short_images/3f/3fa2c0...e9.jpg     (upload_to / 2-char fan-out / hash + extension)
+
+so the same image uploaded for five services is written once and every
+ServiceDetails row points at the same file. A given URL can never change
+content, which is what lets serve_media (services/views.py) - or the web
+server in front of MEDIA_ROOT - send it with a year-long immutable
+Cache-Control:
+
+    location ~ ^/media/.+/[0-9a-f]{2}/[0-9a-f]{32}\\.[a-z0-9]+$ {
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
+Rows never delete their files (a blob may be shared), so blobs nobody points
+at any more pile up until `manage.py gc_media` removes them. Saving a blob
+that already exists bumps its mtime, which is what gc_media's min_age goes by.
+"""
+import hashlib
+import os
+import re
+import time
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+
+
+HASH_LENGTH = 32
+BLOB_RE = re.compile(r'(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{%d}(?:\.[a-z0-9]+)?$' % (HASH_LENGTH - 2))
+EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+def is_content_addressed(name):
+    return BLOB_RE.search(name) is not None
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def blob_name(name, digest):
+    """`name`'s directory + fan-out + digest, keeping a sane extension."""
+    path = PurePosixPath(name)
+    extension = path.suffix.lower()
+    if not EXTENSION_RE.match(extension):
+        extension = ''
+    return str(path.parent / digest[:2] / f"{digest}{extension}").removeprefix('./')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names every saved file after its SHA-256."""
+
+    def _save(self, name, content):
+        name = blob_name(name, content_hash(content))
+        try:
+            # Already stored: deduplicated. Touch it so gc_media's min_age
+            # spares it until the row pointing at it has been committed.
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            pass
+        saved = super()._save(name, content)
+        if saved != name:
+            # Lost a race with an identical upload; keep the first copy.
+            self.delete(saved)
+        return name
+
+
+def content_addressed_fields():
+    """(model, field) for every FileField stored in a ContentAddressedStorage."""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field
+
+
+def referenced_names():
+    names = set()
+    for model, field in content_addressed_fields():
+        names.update(model._default_manager.values_list(field.name, flat=True).distinct())
+    names.discard(None)
+    names.discard('')
+    return names
+
+
+def unreferenced_blobs(storage=default_storage, min_age=3600):
+    """
+    (name, size) of every content-addressed file under `storage` that no row
+    references. Files younger than `min_age` seconds are left alone: they may
+    belong to an upload whose row hasn't been committed yet.
+    """
+    root = storage.location
+    referenced = referenced_names()
+    cutoff = time.time() - min_age
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if not is_content_addressed(name) or name in referenced:
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime < cutoff:
+                yield name, stat.st_size
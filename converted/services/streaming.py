@@ -0,0 +1,239 @@
+"""
+Streaming template rendering.
+
+stream_render() walks a Django template's node tree and yields output as it
+goes instead of building the whole document first. Static markup (the
+<head> of base.html with its CSS and font links, the hero section) is sent
+right away; a chunk boundary is placed in front of every tag that may run a
+query - {% for %}, {% if %}, ... - so each block goes out as soon as its data
+has been fetched. Lazy querysets in the context are what make this pay off.
+
+{% extends %} and {% block %} are expanded by hand, mirroring
+ExtendsNode.render() and BlockNode.render(), so inheritance and
+{{ block.super }} behave exactly as in a normal render.
+
+Jinja2 templates (services/jinja_env.py) stream through Template.generate(),
+merged into chunks of at least STREAMING_MIN_CHUNK bytes.
+
+The time spent producing chunks is reported to services/metrics.py once the
+last one has been sent.
+
+Middleware finishes the response (cookies, Vary) before the first chunk is
+rendered. A template that uses the CSRF token therefore has it generated up
+front, so CsrfViewMiddleware still sets the cookie; pages with flash messages
+to show aren't streamed at all (see services/views.py _render()).
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template import loader
+from django.template.base import TextNode, Variable, VariableNode
+from django.template.backends.django import Template as DjangoBackendTemplate
+from django.template.backends.utils import csrf_input_lazy, csrf_token_lazy
+from django.template.context import make_context
+from django.template.defaulttags import CsrfTokenNode
+from django.template.loader_tags import BLOCK_CONTEXT_KEY, BlockContext, BlockNode, ExtendsNode, IncludeNode
+
+from . import metrics
+
+
+FLUSH = object()
+# Cheap nodes that never warrant their own chunk boundary.
+INLINE_NODES = (TextNode, VariableNode)
+CSRF_NAMES = {'csrf_token', 'csrf_input'}
+
+
+def _iter_nodes(nodelist, context):
+    for node in nodelist:
+        if isinstance(node, ExtendsNode):
+            yield from _iter_extends(node, context)
+        elif isinstance(node, BlockNode):
+            yield from _iter_block(node, context)
+        else:
+            if not isinstance(node, INLINE_NODES):
+                yield FLUSH
+            yield node.render_annotated(context)
+
+
+def _iter_extends(node, context):
+    compiled_parent = node.get_parent(context)
+    if BLOCK_CONTEXT_KEY not in context.render_context:
+        context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+    block_context = context.render_context[BLOCK_CONTEXT_KEY]
+    block_context.add_blocks(node.blocks)
+
+    # If the parent doesn't extend anything itself, its blocks are the base ones.
+    for parent_node in compiled_parent.nodelist:
+        if not isinstance(parent_node, TextNode):
+            if not isinstance(parent_node, ExtendsNode):
+                blocks = {
+                    n.name: n for n in compiled_parent.nodelist.get_nodes_by_type(BlockNode)
+                }
+                block_context.add_blocks(blocks)
+            break
+
+    with context.render_context.push_state(compiled_parent, isolated_context=False):
+        yield from _iter_nodes(compiled_parent.nodelist, context)
+
+
+def _iter_block(node, context):
+    block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+    with context.push():
+        if block_context is None:
+            context['block'] = node
+            yield from _iter_nodes(node.nodelist, context)
+            return
+
+        push = block = block_context.pop(node.name)
+        if block is None:
+            block = node
+        block = type(node)(block.name, block.nodelist)
+        block.context = context
+        context['block'] = block
+        yield from _iter_nodes(block.nodelist, context)
+        if push is not None:
+            block_context.push(node.name, push)
+
+
+def iter_render(template, context, min_chunk=None):
+    """
+    Yield the rendered `template` (a django.template.base.Template) in chunks.
+    Pieces smaller than `min_chunk` bytes are held back and merged with the
+    next chunk so the response isn't split into hundreds of tiny writes.
+    """
+    if min_chunk is None:
+        min_chunk = getattr(settings, 'STREAMING_MIN_CHUNK', 1024)
+
+    with context.render_context.push_state(template):
+        with context.bind_template(template):
+            context.template_name = template.name
+            buffer = []
+            size = 0
+            for piece in _iter_nodes(template.nodelist, context):
+                if piece is FLUSH:
+                    if size >= min_chunk:
+                        yield ''.join(buffer)
+                        buffer, size = [], 0
+                    continue
+                buffer.append(piece)
+                size += len(piece)
+            if buffer:
+                yield ''.join(buffer)
+
+
+def iter_jinja(backend_template, context, request=None, min_chunk=None):
+    """Yield a Jinja2 backend template's output, mirroring its render()."""
+    if min_chunk is None:
+        min_chunk = getattr(settings, 'STREAMING_MIN_CHUNK', 1024)
+    context = dict(context or {})
+    if request is not None:
+        context['request'] = request
+        context['csrf_input'] = csrf_input_lazy(request)
+        context['csrf_token'] = csrf_token_lazy(request)
+        for processor in backend_template.backend.template_context_processors:
+            context.update(processor(request))
+
+    buffer = []
+    size = 0
+    for piece in backend_template.template.generate(context):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= min_chunk:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _timed(chunks, template_name):
+    elapsed = 0.0
+    chunks = iter(chunks)
+    while True:
+        started = time.perf_counter()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            break
+        finally:
+            elapsed += time.perf_counter() - started
+        yield chunk
+    metrics.TEMPLATE_RENDER.observe(elapsed, template=template_name)
+
+
+async def _aiter(iterator):
+    # Under ASGI each chunk is produced in the sync thread (where the ORM is
+    # allowed) and handed back to the event loop without buffering the rest.
+    sentinel = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(iterator, sentinel)
+        if chunk is sentinel:
+            break
+        yield chunk
+
+
+def _template_uses_csrf(template, engine):
+    """
+    Whether a Django template, its parents or its includes use the CSRF token.
+    A parent or include picked at render time counts as a yes.
+    """
+    for node in template.nodelist.get_nodes_by_type((CsrfTokenNode, VariableNode, ExtendsNode, IncludeNode)):
+        if isinstance(node, CsrfTokenNode):
+            return True
+        if isinstance(node, VariableNode):
+            var = node.filter_expression.var
+            if isinstance(var, Variable) and var.var in CSRF_NAMES:
+                return True
+            continue
+        name = node.parent_name if isinstance(node, ExtendsNode) else node.template
+        if name.is_var or name.filters:
+            return True
+        if _template_uses_csrf(engine.get_template(name.var), engine):
+            return True
+    return False
+
+
+def _jinja_uses_csrf(env, name):
+    from jinja2 import meta
+
+    ast = env.parse(env.loader.get_source(env, name)[0])
+    if meta.find_undeclared_variables(ast) & CSRF_NAMES:
+        return True
+    return any(
+        ref is None or _jinja_uses_csrf(env, ref) for ref in meta.find_referenced_templates(ast)
+    )
+
+
+def uses_csrf(backend_template):
+    """Cached on the compiled template, which the template loaders reuse."""
+    template = backend_template.template
+    try:
+        return template._uses_csrf
+    except AttributeError:
+        pass
+    if isinstance(backend_template, DjangoBackendTemplate):
+        result = _template_uses_csrf(template, backend_template.backend.engine)
+    else:
+        result = _jinja_uses_csrf(backend_template.backend.env, template.name)
+    template._uses_csrf = result
+    return result
+
+
+def stream_render(request, template_name, context=None, content_type=None, status=None, using=None):
+    """Streaming counterpart of django.shortcuts.render()."""
+    backend_template = loader.get_template(template_name, using=using)
+    if uses_csrf(backend_template):
+        get_token(request)  # marks the cookie for CsrfViewMiddleware while it still can be set
+    if isinstance(backend_template, DjangoBackendTemplate):
+        context = make_context(context, request, autoescape=backend_template.backend.engine.autoescape)
+        chunks = iter_render(backend_template.template, context)
+    else:
+        chunks = iter_jinja(backend_template, context, request)
+    chunks = _timed(chunks, template_name)
+    if isinstance(request, ASGIRequest):
+        chunks = _aiter(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type, status=status)
@@ -0,0 +1,47 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from services import icons
+
+register = template.Library()
+
+FONTAWESOME_CDN = (
+    '<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/7.0.1/css/all.min.css" '
+    'integrity="sha512-2SwdPD6INVrV/lHTZbO2nodKhrnDdJK9/kg2XD1r9uGqPo1cUbujc+IYdlYdEErWNu69gVcYgdxlmVmzTWnetw==" '
+    'crossorigin="anonymous" referrerpolicy="no-referrer" />'
+)
+
+
+@register.simple_tag
+def fontawesome_css():
+    """
+    Link to the self-hosted icon subset (manage.py build_icons) when it has
+    been built, falling back to the full Font Awesome CDN stylesheet.
+    """
+    manifest = icons.load_manifest()
+    if not manifest:
+        return format_html(FONTAWESOME_CDN)
+    href = f"{static('fontawesome/css/icons.css')}?v={manifest['version']}"
+    return format_html('<link rel="stylesheet" href="{}">', href)
+
+
+@register.simple_tag
+def lazy_image(image, alt='', **attrs):
+    """
+    <img> for a catalog ImageRef (services/catalog.py): lazy-loaded, with its
+    intrinsic width/height so it takes no layout shift, and its blurred
+    placeholder painted as the background until the file arrives.
+
+        {% lazy_image details.short_section_image service.service_name class="w-full" %}
+    """
+    if not image:
+        return ''
+    attributes = {'src': image.url, 'alt': alt}
+    if image.width and image.height:
+        attributes.update(width=image.width, height=image.height)
+    attributes.update(loading='lazy', decoding='async')
+    if image.placeholder:
+        attributes['style'] = f"background:url({image.placeholder}) center/cover no-repeat"
+    attributes.update(attrs)
+    return format_html('<img{}>', format_html_join('', ' {}="{}"', attributes.items()))
@@ -1,3 +1,1496 @@
-from django.test import TestCase
+import gzip
+import html
+import io
+import ipaddress
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (
+    AsyncClient, Client, LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    catalog, checks, compression, geoip, icons, loadtest, metrics, page_cache, preload, profiling, rollups,
+    sitemaps, slow_queries, startup, streaming, views,
+)
+from .forms import ContactForm
+from .templatetags import services_tags
+from .models import (
+    FAQ, BulletPointServices, Contact, LeadRollup, Service, ServiceDetails, SubService, SubServiceFeature,
+    Testimonial,
+)
+from .throttling import TokenBucket
+from .utils import get_client_ip
+from .views import serve_media
+
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'services-tests',
+    },
+}
+
+
+# Metrics and the slow-query log stay off unless a test turns them on with its own files.
+@override_settings(
+    CACHES=LOCMEM_CACHES, CATALOG={'CHECK_INTERVAL': 0}, METRICS={'ENABLED': False}, SLOW_QUERIES={'ENABLED': False},
+)
+class ServicesTestCase(TestCase):
+    """
+    Every test starts with an empty cache and no in-memory catalog, and
+    on-commit sitemap rebuilds write to a temporary SITEMAP_ROOT.
+    """
+
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        catalog.reset()
+        sitemaps.reset()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.enterContext(override_settings(SITEMAP_ROOT=root))
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    CONTACT_THROTTLE={'CACHE': 'default', 'IP_RATE': (2, 60), 'EMAIL_RATE': (2, 60)},
+)
+class ContactThrottleTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+
+    def post_contact(self, email='jane@example.com', message='Hello', ip='203.0.113.7', **headers):
+        return self.client.post(
+            reverse('home'),
+            {'name': 'Jane', 'email': email, 'message': message},
+            REMOTE_ADDR=ip, **headers,
+        )
+
+    def test_token_bucket_refills_over_time(self):
+        bucket = TokenBucket(caches['default'], 'test', capacity=2, refill_seconds=10)
+        self.assertTrue(bucket.consume('k', now=100))
+        self.assertTrue(bucket.consume('k', now=100))
+        self.assertFalse(bucket.consume('k', now=101))
+        self.assertTrue(bucket.consume('k', now=111))
+
+    def test_exact_duplicates_are_dropped(self):
+        self.post_contact(message='Same  message')
+        self.post_contact(message='same message')
+        self.assertEqual(Contact.objects.count(), 1)
+
+    def test_ip_bucket_limits_submissions(self):
+        for i in range(4):
+            self.post_contact(email=f'user{i}@example.com', message=f'msg {i}')
+        self.assertEqual(Contact.objects.count(), 2)
+
+        # A different client is unaffected.
+        self.post_contact(email='other@example.com', message='hi', ip='198.51.100.1')
+        self.assertEqual(Contact.objects.count(), 3)
+
+    def test_email_bucket_limits_across_ips(self):
+        for i in range(3):
+            self.post_contact(message=f'msg {i}', ip=f'198.51.100.{i}')
+        self.assertEqual(Contact.objects.count(), 2)
+
+    def test_client_sent_headers_cannot_dodge_the_ip_bucket(self):
+        for i in range(4):
+            self.post_contact(
+                email=f'u{i}@example.com', message=f'm{i}',
+                HTTP_X_FORWARDED_FOR=f'192.0.2.{i}', HTTP_CF_CONNECTING_IP=f'198.51.100.{i}',
+            )
+        self.assertEqual(Contact.objects.count(), 2)
+
+    def test_client_is_read_behind_trusted_proxies(self):
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='10.0.0.2', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7, 10.0.0.1',
+        )
+        self.assertEqual(get_client_ip(request), '10.0.0.2')
+        with self.settings(TRUSTED_PROXY_COUNT=2):
+            self.assertEqual(get_client_ip(request), '203.0.113.7')  # 1.2.3.4 came from the client
+        with self.settings(TRUSTED_PROXY_COUNT=5):
+            self.assertEqual(get_client_ip(request), '1.2.3.4')
+
+        request = RequestFactory().get('/', REMOTE_ADDR='173.245.48.9', HTTP_CF_CONNECTING_IP='203.0.113.7')
+        self.assertEqual(get_client_ip(request), '173.245.48.9')
+        with self.settings(CLOUDFLARE_IPS=['173.245.48.0/20']):
+            self.assertEqual(get_client_ip(request), '203.0.113.7')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ContactFormTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.active = Service.objects.create(service_name='SEO Automation', short_description='x', is_active=True)
+        self.inactive = Service.objects.create(service_name='Coming Soon', short_description='x')
+
+    def form(self, **data):
+        return ContactForm({'name': 'Jane', 'email': 'jane@example.com', 'message': 'Hi', **data})
+
+    def test_service_validation_uses_cached_ids(self):
+        self.assertTrue(self.form(service_interested=self.active.pk).is_valid())
+        with self.assertNumQueries(0):
+            self.assertTrue(self.form(service_interested=self.active.pk).is_valid())
+            self.assertFalse(self.form(service_interested=self.inactive.pk).is_valid())
+            self.assertFalse(self.form(service_interested='nope').is_valid())
+
+    def test_cache_refreshes_on_service_save(self):
+        self.assertFalse(self.form(service_interested=self.inactive.pk).is_valid())
+        self.inactive.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.inactive.save()
+        self.assertTrue(self.form(service_interested=self.inactive.pk).is_valid())
+
+    def test_save_stores_service_id(self):
+        form = self.form(service_interested=self.active.pk)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save().service_interested, self.active)
+
+    def test_json_submission(self):
+        response = self.client.post(
+            reverse('home'),
+            {'name': 'Jane', 'email': 'jane@example.com', 'message': 'Hi', 'service_interested': self.active.pk},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['ok'])
+        self.assertEqual(Contact.objects.get().page_source, 'Homepage Contact Form')
+
+    def test_json_submission_reports_errors(self):
+        response = self.client.post(reverse('home'), {'name': 'Jane'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json()['errors'])
+        self.assertFalse(Contact.objects.exists())
+
+
+class CountryMiddlewareTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        fd, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        geoip.write_range_file(self.path, [
+            (int(ipaddress.ip_address('103.0.0.0')), int(ipaddress.ip_address('103.0.255.255')), 'BD'),
+            (int(ipaddress.ip_address('8.8.8.0')), int(ipaddress.ip_address('8.8.8.255')), 'US'),
+        ])
+        geoip.reset()
+        self.addCleanup(geoip.reset)
+
+    def test_range_lookup(self):
+        with self.settings(GEOIP_PATH=self.path):
+            self.assertEqual(geoip.lookup_country('103.0.10.1'), 'BD')
+            self.assertEqual(geoip.lookup_country('8.8.8.8'), 'US')
+            self.assertEqual(geoip.lookup_country('9.9.9.9'), 'XX')
+            self.assertEqual(geoip.lookup_country('2001:db8::1'), 'XX')
+
+    def test_unusable_database_is_logged_once_and_unknown(self):
+        corrupt = [b'', b'GEO', b'NOPE\0\0\0\1' + b'x' * 10, geoip.HEADER.pack(geoip.MAGIC, 5) + b'x' * 10]
+        for data in corrupt:
+            with open(self.path, 'wb') as fh:
+                fh.write(data)
+            geoip.reset()
+            with self.settings(GEOIP_PATH=self.path), self.assertLogs('services.geoip', 'ERROR') as logs:
+                self.assertEqual(self.client.get(reverse('home'), REMOTE_ADDR='8.8.8.8').wsgi_request.country, 'XX')
+                self.assertEqual(self.client.get(reverse('home'), REMOTE_ADDR='8.8.8.8').status_code, 200)
+            self.assertEqual(len(logs.records), 1, data)
+
+        geoip.reset()
+        with self.settings(GEOIP_PATH=self.path + '.mmdb'), mock.patch.object(geoip, 'maxminddb', None):
+            with self.assertLogs('services.geoip', 'ERROR'):
+                self.assertEqual(geoip.lookup_country('8.8.8.8'), 'XX')
+
+    def test_cloudflare_header_wins(self):
+        with self.settings(GEOIP_PATH=self.path):
+            response = self.client.get(reverse('home'), HTTP_CF_IPCOUNTRY='BD', REMOTE_ADDR='8.8.8.8')
+        self.assertEqual(response.wsgi_request.country, 'BD')
+
+    def test_falls_back_to_database(self):
+        with self.settings(GEOIP_PATH=self.path):
+            response = self.client.get(reverse('home'), REMOTE_ADDR='103.0.1.1')
+        self.assertEqual(response.wsgi_request.country, 'BD')
+        self.assertContains(response, 'wa.me/+8801790007709')
+
+    def test_missing_database_is_unknown(self):
+        with self.settings(GEOIP_PATH=self.path + '.missing'):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.wsgi_request.country, 'XX')
+
+
+class SitemapTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        override = self.settings(SITEMAP_ROOT=root, SITE_URL='https://example.com', SITEMAP_PAGE_SIZE=2)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seo = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+            Service.objects.create(service_name='Hidden', short_description='x')
+            for i in range(3):
+                SubService.objects.create(parent_service=self.seo, title=f'Audit {i}')
+
+    def test_index_lists_paginated_sections(self):
+        response = self.client.get(reverse('sitemap_index'))
+        index = b''.join(response.streaming_content).decode()
+        self.assertIn('https://example.com/sitemap-services-1.xml', index)
+        self.assertIn('https://example.com/sitemap-subservices-2.xml', index)
+        self.assertNotIn('sitemap-subservices-3.xml', index)
+
+    def test_only_active_pages_are_listed(self):
+        response = self.client.get(reverse('sitemap_section', args=['services', 1]))
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('https://example.com/seo/', body)
+        self.assertNotIn('hidden', body)
+        self.assertIn('<lastmod>', body)
+
+    def test_regenerated_when_subservice_changes(self):
+        self.client.get(reverse('sitemap_index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            SubService.objects.create(parent_service=self.seo, title='Audit 3')
+            SubService.objects.create(parent_service=self.seo, title='Audit 4')
+        response = self.client.get(reverse('sitemap_section', args=['subservices', 3]))
+        self.assertIn(b'/seo/audit-4/', b''.join(response.streaming_content))
+
+    def page(self, section, number):
+        return b''.join(self.client.get(reverse('sitemap_section', args=[section, number])).streaming_content).decode()
+
+    def test_one_rebuild_per_transaction(self):
+        self.client.get(reverse('sitemap_index'))
+        SubService.objects.create(parent_service=self.seo, title='Audit 3')
+        SubService.objects.create(parent_service=self.seo, title='Audit 4')
+        with mock.patch.object(sitemaps, 'regenerate', wraps=sitemaps.regenerate) as regenerate:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.seo.delete()
+        regenerate.assert_called_once()
+        index = b''.join(self.client.get(reverse('sitemap_index')).streaming_content)
+        self.assertNotIn(b'sitemap-services', index)
+        self.assertNotIn(b'sitemap-subservices', index)
+
+    def test_only_pages_holding_changed_rows_are_rewritten(self):
+        self.client.get(reverse('sitemap_index'))
+        audit = SubService.objects.order_by('id').first()
+        with mock.patch.object(sitemaps, '_write_page', wraps=sitemaps._write_page) as write_page:
+            with self.captureOnCommitCallbacks(execute=True):
+                audit.title = 'Audit zero'
+                audit.slug = 'audit-zero'
+                audit.save()
+        self.assertEqual([call.args[:2] for call in write_page.call_args_list], [('subservices', 1)])
+        self.assertIn('/seo/audit-zero/', self.page('subservices', 1))
+
+        # A row leaving shifts the pages after it.
+        with mock.patch.object(sitemaps, '_write_page', wraps=sitemaps._write_page) as write_page:
+            with self.captureOnCommitCallbacks(execute=True):
+                audit.delete()
+        self.assertEqual([call.args[:2] for call in write_page.call_args_list], [('subservices', 1)])
+        self.assertIn('/seo/audit-2/', self.page('subservices', 1))
+        self.assertEqual(self.client.get(reverse('sitemap_section', args=['subservices', 2])).status_code, 404)
+
+    def test_touched_parent_moves_its_lastmod(self):
+        self.client.get(reverse('sitemap_index'))
+        audit = SubService.objects.order_by('id').first()
+        later = audit.updated_at + timezone.timedelta(days=1)
+        with mock.patch.object(timezone, 'now', return_value=later), self.captureOnCommitCallbacks(execute=True):
+            SubServiceFeature.objects.create(sub_service=audit, text='Crawl')
+        self.assertIn(f"<lastmod>{later.isoformat(timespec='seconds')}</lastmod>", self.page('subservices', 1))
+
+    def test_files_are_world_readable(self):
+        self.client.get(reverse('sitemap_index'))
+        for path in os.listdir(settings.SITEMAP_ROOT):
+            self.assertEqual(os.stat(os.path.join(settings.SITEMAP_ROOT, path)).st_mode & 0o777, 0o644, path)
+
+    def test_robots_points_at_index(self):
+        response = self.client.get(reverse('robots_txt'))
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('Sitemap: https://example.com/sitemap.xml', body)
+        self.assertIn('Disallow: /admin/', body)
+
+    def test_unknown_section_404s(self):
+        self.assertEqual(self.client.get('/sitemap-nope-1.xml').status_code, 404)
+
+    def test_build_command(self):
+        call_command('build_sitemaps', stdout=io.StringIO())
+        self.assertTrue(os.path.exists(os.path.join(settings.SITEMAP_ROOT, 'sitemap-subservices-2.xml')))
+        with self.assertRaisesMessage(CommandError, 'nope'):
+            call_command('build_sitemaps', 'nope', stdout=io.StringIO())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheFriendlyCsrfTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+
+    def test_homepage_is_identical_across_sessions(self):
+        first = Client(enforce_csrf_checks=True).get(reverse('home'))
+        second = Client(enforce_csrf_checks=True).get(reverse('home'))
+        self.assertEqual(first.content, second.content)
+        self.assertNotIn(settings.CSRF_COOKIE_NAME, first.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, first.cookies)
+
+    def test_post_without_token_is_rejected(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse('home'), {'name': 'Jane', 'email': 'jane@example.com', 'message': 'Hi'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Contact.objects.exists())
+
+    def test_post_without_javascript_can_be_sent_again(self):
+        client = Client(enforce_csrf_checks=True)
+        data = {'name': 'Jane', 'email': 'jane@example.com', 'message': 'Hello there'}
+        response = client.post(reverse('home'), data)
+        self.assertContains(response, "send it again", status_code=403)
+        self.assertContains(response, 'Hello there', status_code=403)
+        self.assertIn('no-cache', response['Cache-Control'])
+        token = response.context['csrf_token']
+
+        response = client.post(reverse('home'), {**data, 'csrfmiddlewaretoken': token}, follow=True)
+        self.assertTrue(Contact.objects.filter(message='Hello there').exists())
+        self.assertContains(response, '<noscript>')
+        self.assertContains(response, views.THANKS_MESSAGE)
+
+    def test_fetch_without_token_gets_a_message(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse('home'), {'name': 'Jane'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['message'], views.CSRF_FAILED_MESSAGE)
+
+    def test_other_forms_keep_the_default_failure_page(self):
+        response = Client(enforce_csrf_checks=True).post(reverse('admin:login'), {'username': 'x'})
+        self.assertContains(response, 'CSRF verification failed', status_code=403)
+
+    def test_post_with_fetched_token_is_accepted(self):
+        client = Client(enforce_csrf_checks=True)
+        token_response = client.get(reverse('csrf_token'))
+        self.assertIn('no-cache', token_response['Cache-Control'])
+        response = client.post(reverse('home'), {
+            'name': 'Jane', 'email': 'jane@example.com', 'message': 'Hi',
+            'csrfmiddlewaretoken': token_response.json()['csrfToken'],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Contact.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SessionlessFastPathTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+
+    def test_anonymous_get_skips_session_and_auth(self):
+        response = self.client.get(reverse('home'))
+        request = response.wsgi_request
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertTrue(request.user.is_anonymous)
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+
+    def test_session_cookie_keeps_normal_path(self):
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'abc'
+        response = self.client.get(reverse('home'))
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+
+    def test_admin_is_unchanged(self):
+        response = self.client.get(reverse('admin:index'))
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_flash_message_survives_without_session(self):
+        self.client.post(
+            reverse('home'),
+            {'name': 'Jane', 'email': 'jane@example.com', 'message': 'Hi'},
+        )
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+        response = self.client.get(reverse('home'))
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertContains(response, 'Thank you for your message!')
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    PAGE_CACHE={'SOFT_TTL': 10, 'HARD_TTL': 100, 'BACKGROUND': False},
+)
+class PageCacheTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        ServiceDetails.objects.create(service=self.service, hero_h1='Rank / Higher')
+        self.url = reverse('service_detail', args=[self.service.slug])
+
+    def get_at(self, now):
+        with mock.patch('services.page_cache.time.time', return_value=now):
+            return self.client.get(self.url)
+
+    def counted(self, inc):
+        results = [call.kwargs['result'] for call in inc.call_args_list]
+        return {result: results.count(result) for result in results}
+
+    def test_hit_after_miss_runs_no_queries(self):
+        first = self.get_at(1000)
+        self.assertEqual(first['X-Page-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.get_at(1005)
+        self.assertEqual(second['X-Page-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+
+    def test_hits_replay_bodies_encoded_when_stored(self):
+        live = self.get_at(1000)
+        with mock.patch.object(compression, 'minify_html') as minify, \
+                mock.patch.object(compression, 'compress_bytes') as compress:
+            with mock.patch('services.page_cache.time.time', return_value=1005):
+                hit = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+                plain = self.client.get(self.url)
+        minify.assert_not_called()
+        compress.assert_not_called()
+        self.assertEqual(hit['X-Page-Cache'], 'HIT')
+        self.assertEqual(hit['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', hit['Vary'])
+        self.assertEqual(gzip.decompress(hit.content), live.content)
+        self.assertEqual(plain.content, live.content)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+    @mock.patch.object(metrics.PAGE_CACHE, 'inc')
+    def test_stale_page_is_served_and_rebuilt_once(self, inc):
+        self.get_at(1000)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.details.hero_h1 = 'Changed / Title'
+            self.service.details.save()
+
+        stale = self.get_at(1020)
+        self.assertEqual(stale['X-Page-Cache'], 'STALE')
+        self.assertNotContains(stale, 'Changed')
+
+        # The stale request rebuilt the entry, so the next one is fresh again.
+        fresh = self.get_at(1021)
+        self.assertEqual(fresh['X-Page-Cache'], 'HIT')
+        self.assertContains(fresh, 'Changed')
+        self.assertEqual(self.counted(inc), {'hit': 1, 'miss': 1, 'stale': 1, 'rebuild': 1})
+
+    @mock.patch.object(metrics.PAGE_CACHE, 'inc')
+    def test_rebuild_is_single_flight(self, inc):
+        self.get_at(1000)
+        with mock.patch('services.page_cache._schedule') as schedule:
+            self.get_at(1020)
+            self.get_at(1021)
+        self.assertEqual(schedule.call_count, 1)
+        self.assertEqual(self.counted(inc)['stale'], 2)
+
+    def test_page_that_is_gone_is_dropped_on_rebuild(self):
+        self.get_at(1000)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.delete()
+        with self.assertNoLogs('services.page_cache', 'ERROR'):
+            self.assertEqual(self.get_at(1020)['X-Page-Cache'], 'STALE')  # rebuild finds a 404
+        self.assertEqual(self.get_at(1021).status_code, 404)
+
+    def test_requests_with_a_session_bypass_the_cache(self):
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'abc'
+        self.assertNotIn('X-Page-Cache', self.get_at(1000))
+
+
+@override_settings(
+    CATALOG={'CHECK_INTERVAL': 0}, METRICS={'ENABLED': False}, SLOW_QUERIES={'ENABLED': False},
+    SITE_URL='https://example.com', ALLOWED_HOSTS=['example.com'],
+)
+class WarmCacheCommandTests(TransactionTestCase):
+    # Pages are rendered on worker threads, which can't see a TestCase transaction,
+    # into a file cache, which is what the command requires.
+
+    def setUp(self):
+        super().setUp()
+        # Saved services commit for real, so the sitemap rebuild runs too.
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        file_cache = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(root, 'cache'),
+        }
+        self.enterContext(override_settings(SITEMAP_ROOT=os.path.join(root, 'sitemaps'), CACHES={'default': file_cache}))
+
+    def test_refuses_a_process_local_cache(self):
+        with self.settings(CACHES=LOCMEM_CACHES):
+            with self.assertRaisesMessage(CommandError, "is a LocMemCache"):
+                call_command('warm_cache', stdout=io.StringIO())
+
+    def test_warms_every_active_page(self):
+        caches['default'].clear()
+        catalog.reset()
+        service = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        ServiceDetails.objects.create(service=service, hero_h1='Rank')
+        SubService.objects.create(parent_service=service, title='Audit')
+        SubService.objects.create(parent_service=service, title='Hidden', is_active=False)
+
+        out = io.StringIO()
+        call_command('warm_cache', workers=2, stdout=out)
+        self.assertIn('Warmed 2/2 pages', out.getvalue())
+
+        # A visitor on the public host now gets the pre-rendered copy.
+        response = self.client.get('/seo/audit/', HTTP_HOST='example.com', secure=True)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+
+# The Django node-tree walker; Jinja2 streaming is covered in JinjaTemplateTests.
+@override_settings(CACHES=LOCMEM_CACHES, STREAMING_MIN_CHUNK=512, PUBLIC_TEMPLATE_ENGINES={})
+class StreamingRenderTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        ServiceDetails.objects.create(service=self.service, hero_h1='Rank / Higher')
+        SubService.objects.create(parent_service=self.service, title='Technical Audit')
+        FAQ.objects.create(service=self.service, question='How long?', answer='Weeks')
+        self.url = reverse('service_detail', args=[self.service.slug])
+
+    def test_streamed_page_matches_buffered_render(self):
+        buffered = self.client.get(self.url).content
+        caches['default'].clear()
+        with self.settings(STREAMING_RENDER=True):
+            response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertIn(b'</head>', chunks[0])
+        self.assertNotIn(b'How long?', chunks[0])
+        self.assertEqual(b''.join(chunks), buffered)
+
+    def test_streamed_miss_fills_page_cache(self):
+        with self.settings(STREAMING_RENDER=True):
+            first = b''.join(self.client.get(self.url).streaming_content)
+            second = self.client.get(self.url)
+        self.assertEqual(second['X-Page-Cache'], 'HIT')
+        self.assertEqual(second.content, first)
+
+    async def test_streams_under_asgi(self):
+        with self.settings(STREAMING_RENDER=True):
+            response = await AsyncClient().get(self.url)
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertIn(b'Technical Audit', body)
+        self.assertIn(b'How long?', body)
+
+    def test_flash_message_shows_once_then_clears(self):
+        data = {'name': 'Jane', 'email': 'jane@example.com', 'message': 'Hi'}
+        with self.settings(STREAMING_RENDER=True):
+            response = self.client.post(reverse('home'), data, follow=True)
+            self.assertFalse(response.streaming)
+            self.assertContains(response, 'Thank you for your message!')
+            response = self.client.get(reverse('home'))
+            self.assertTrue(response.streaming)
+            self.assertNotIn(b'Thank you for your message!', b''.join(response.streaming_content))
+        self.assertFalse(self.client.cookies['messages'].value)
+
+    def test_csrf_token_is_settled_before_streaming(self):
+        request = RequestFactory().get('/')
+        with self.settings(STREAMING_RENDER=True):
+            streaming.stream_render(request, 'services/home.html', {})
+            self.assertNotIn('CSRF_COOKIE_NEEDS_UPDATE', request.META)  # cacheable: token comes from JS
+            streaming.stream_render(request, 'admin/services/profiles.html', {})
+        self.assertTrue(request.META['CSRF_COOKIE_NEEDS_UPDATE'])
+
+
+class IconSubsetTests(ServicesTestCase):
+    def test_parse_class_string_handles_old_and_new_syntax(self):
+        self.assertEqual(list(icons.parse_class_string('fa-solid fa-robot')), [('solid', 'robot')])
+        self.assertEqual(list(icons.parse_class_string('fab fa-whatsapp')), [('brands', 'whatsapp')])
+
+    def test_parse_codepoints(self):
+        css = '.fa-robot{--fa:"\\f544"}.fa-cog,.fa-gear::before{content:"\\f013"}'
+        self.assertEqual(icons.parse_codepoints(css), {'robot': 0xF544, 'cog': 0xF013, 'gear': 0xF013})
+
+    def test_collects_catalog_icons(self):
+        Service.objects.create(service_name='SEO', short_description='x', icon_class='fa-solid fa-robot')
+        collected = icons.collect_icons()
+        self.assertIn('robot', collected['solid'])
+        self.assertIn('cog', collected['solid'])  # SubService default
+
+    def test_falls_back_to_cdn_without_a_build(self):
+        with self.settings(FONTAWESOME={'OUTPUT_DIR': tempfile.mkdtemp()}):
+            icons.reset()
+            self.addCleanup(icons.reset)
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'cdnjs.cloudflare.com/ajax/libs/font-awesome')
+
+    def test_manifest_is_reread_when_it_changes(self):
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        self.enterContext(self.settings(FONTAWESOME={'OUTPUT_DIR': output}))
+        icons.reset()
+        self.addCleanup(icons.reset)
+        self.assertEqual(icons.load_manifest(), {})
+
+        # Built by another process: no reset() here.
+        path = os.path.join(output, 'manifest.json')
+        with open(path, 'w') as f:
+            json.dump({'version': 'a', 'icons': {'solid': ['robot']}}, f)
+        self.assertEqual(icons.load_manifest()['version'], 'a')
+        with open(path, 'w') as f:
+            json.dump({'version': 'bb', 'icons': {'solid': ['robot', 'cog']}}, f)
+        self.assertEqual(icons.load_manifest()['version'], 'bb')
+        self.assertTrue(icons.is_covered('fa-solid fa-cog'))
+
+    def test_build_is_published_to_the_collected_static_root(self):
+        output, static_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        self.addCleanup(shutil.rmtree, static_root)
+        for name in ('css/icons.css', 'webfonts/fa-solid-900.woff2', 'manifest.json'):
+            os.makedirs(os.path.dirname(os.path.join(output, name)), exist_ok=True)
+            with open(os.path.join(output, name), 'w') as f:
+                f.write(name)
+
+        with self.settings(FONTAWESOME={'OUTPUT_DIR': output}, STATIC_ROOT=os.path.join(static_root, 'missing')):
+            self.assertIsNone(icons.publish())  # nothing collected yet: collectstatic will copy it
+        with self.settings(FONTAWESOME={'OUTPUT_DIR': output}, STATIC_ROOT=static_root):
+            published = icons.publish()
+        self.assertEqual(str(published), os.path.join(static_root, 'fontawesome'))
+        with open(os.path.join(published, 'webfonts', 'fa-solid-900.woff2')) as f:
+            self.assertEqual(f.read(), 'webfonts/fa-solid-900.woff2')
+        self.assertTrue(os.path.exists(os.path.join(published, 'manifest.json')))
+
+
+class ServiceSlugTests(ServicesTestCase):
+    def test_slugs_taken_by_other_routes_are_reserved(self):
+        self.assertEqual(Service.objects.create(service_name='Blog', short_description='x').slug, 'blog-1')
+        self.assertEqual(Service.objects.create(service_name='Admin', short_description='x').slug, 'admin-1')
+        with self.assertRaises(ValidationError) as raised:
+            Service(service_name='Our Blog', slug='blog', short_description='x').full_clean()
+        self.assertIn('slug', raised.exception.message_dict)
+        Service(service_name='SEO', slug='seo', short_description='x').full_clean()
+
+
+class SharedCacheCheckTests(ServicesTestCase):
+    def test_locmem_cache_is_refused_outside_debug(self):
+        self.assertEqual([error.id for error in checks.check_shared_caches(None)], ['services.E001'])
+        with self.settings(DEBUG=True):
+            self.assertEqual(checks.check_shared_caches(None), [])
+        file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp'}}
+        with self.settings(CACHES=file_cache):
+            self.assertEqual(checks.check_shared_caches(None), [])
+
+
+class CatalogTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        ServiceDetails.objects.create(service=self.service, hero_h1='Rank / Higher')
+        sub = SubService.objects.create(parent_service=self.service, title='Audit')
+        FAQ.objects.create(sub_service=sub, question='Sub question?', answer='A')
+        FAQ.objects.create(service=self.service, question='Service question?', answer='A')
+
+    def test_catalog_pages_run_no_sql_once_loaded(self):
+        catalog.get_catalog()
+        with self.assertNumQueries(0):
+            self.client.get(reverse('home'))
+            self.client.get(reverse('service_detail', args=['seo']))
+            self.client.get(reverse('subservice_detail', args=['seo', 'audit']))
+
+    def test_snapshot_rebuilds_when_version_moves(self):
+        first = catalog.get_catalog()
+        self.assertIs(catalog.get_catalog(), first)
+        with self.captureOnCommitCallbacks(execute=True):
+            SubService.objects.create(parent_service=self.service, title='Backlinks')
+        second = catalog.get_catalog()
+        self.assertIsNot(second, first)
+        self.assertEqual([s.title for s in second.service('seo').sub_services], ['Audit', 'Backlinks'])
+
+    def test_subservice_faqs_fall_back_to_service(self):
+        sub = catalog.get_catalog().subservice('seo', 'audit')
+        self.assertEqual([f.question for f in sub.faqs], ['Sub question?'])
+        self.assertEqual([f.question for f in sub.parent_service.faqs], ['Service question?'])
+        self.assertIsNone(catalog.get_catalog().subservice('other', 'audit'))
+
+    def test_service_without_details_is_404(self):
+        Service.objects.create(service_name='Bare', short_description='x')
+        self.assertEqual(self.client.get(reverse('service_detail', args=['bare'])).status_code, 404)
+
+
+class TestimonialTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def upload(self, size=(400, 300)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, format='PNG')
+        return SimpleUploadedFile('jane.png', buffer.getvalue(), content_type='image/png')
+
+    def test_upload_is_cropped_to_square_thumbnail(self):
+        testimonial = Testimonial.objects.create(name='Jane', message='Great', photo=self.upload())
+        self.assertRegex(testimonial.photo_thumbnail.name, r'^testimonials/thumbnails/[0-9a-f]{2}/[0-9a-f]{32}\.jpg$')
+        with Image.open(testimonial.photo_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (96, 96))
+
+        # Re-saving without a new upload keeps the existing thumbnail.
+        name = testimonial.photo_thumbnail.name
+        testimonial.message = 'Still great'
+        testimonial.save()
+        self.assertEqual(testimonial.photo_thumbnail.name, name)
+
+    def test_homepage_serves_active_testimonials_from_the_catalog(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            shown = Testimonial.objects.create(name='Jane', company='Acme', message='Great', photo=self.upload())
+            Testimonial.objects.create(name='Hidden', message='Nope', is_active=False)
+        catalog.get_catalog()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Acme')
+        self.assertContains(response, shown.photo_thumbnail.url)
+        self.assertNotContains(response, 'Hidden')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            shown.delete()
+        self.assertContains(self.client.get(reverse('home')), 'No testimonials yet.')
+
+
+
+class ImagePlaceholderTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.service = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+
+    def upload(self, name, size):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'blue').save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_records_size_and_placeholder(self):
+        details = ServiceDetails.objects.create(
+            service=self.service, hero_h1='Rank', short_section_image=self.upload('card.png', (640, 480)),
+        )
+        self.assertEqual((details.short_section_image_width, details.short_section_image_height), (640, 480))
+        self.assertRegex(details.short_section_image_placeholder, r'^data:image/(webp|jpeg);base64,')
+        self.assertLess(len(details.short_section_image_placeholder), 1024)
+
+        details.short_section_image = None
+        details.save()
+        self.assertIsNone(details.short_section_image_width)
+        self.assertEqual(details.short_section_image_placeholder, '')
+
+    def test_pages_emit_sized_lazy_images(self):
+        ServiceDetails.objects.create(
+            service=self.service, hero_h1='Rank', short_section_image=self.upload('card.png', (640, 480)),
+        )
+        Testimonial.objects.create(name='Jane', message='Great', photo=self.upload('jane.png', (300, 300)))
+        for url, size in ((reverse('service_detail', args=['seo']), 'width="640" height="480"'),
+                          (reverse('home'), 'width="96" height="96"')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, size)
+                self.assertContains(response, 'loading="lazy" decoding="async"')
+                self.assertContains(response, 'style="background:url(data:image/')
+
+    def test_lazy_image_without_known_size(self):
+        image = catalog.ImageRef('old.png', '/media/old.png')
+        self.assertEqual(
+            services_tags.lazy_image(image, 'Old', **{'class': 'w-full'}),
+            '<img src="/media/old.png" alt="Old" loading="lazy" decoding="async" class="w-full">',
+        )
+        self.assertEqual(services_tags.lazy_image(None, 'Nothing'), '')
+
+
+class ContentAddressedStorageTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def upload(self, color='blue', name='card.PNG'):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48), color).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def details(self, name, image):
+        service = Service.objects.create(service_name=name, short_description='x', is_active=True)
+        return ServiceDetails.objects.create(service=service, short_section_image=image)
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.details('SEO', self.upload(name='a.PNG'))
+        second = self.details('Ads', self.upload(name='b.png'))
+        other = self.details('Web', self.upload('red'))
+        self.assertRegex(first.short_section_image.name, r'^service_short_images/([0-9a-f]{2})/\1[0-9a-f]{30}\.png$')
+        self.assertEqual(second.short_section_image.name, first.short_section_image.name)
+        self.assertNotEqual(other.short_section_image.name, first.short_section_image.name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'service_short_images'))), 2)
+
+    def test_gc_removes_only_old_unreferenced_blobs(self):
+        kept = self.details('SEO', self.upload())
+        dropped = self.details('Ads', self.upload('red'))
+        dropped_path = dropped.short_section_image.path
+        legacy = os.path.join(self.media_root, 'service_short_images', 'legacy-upload.jpeg')
+        open(legacy, 'wb').close()
+        dropped.short_section_image = None
+        dropped.save()
+
+        call_command('gc_media', stdout=io.StringIO())  # too new to collect
+        self.assertTrue(os.path.exists(dropped_path))
+
+        out = io.StringIO()
+        call_command('gc_media', min_age=0, stdout=out)
+        self.assertIn('Deleted 1 unreferenced files', out.getvalue())
+        self.assertFalse(os.path.exists(dropped_path))
+        self.assertFalse(os.path.exists(os.path.dirname(dropped_path)))
+        self.assertTrue(os.path.exists(kept.short_section_image.path))
+        self.assertTrue(os.path.exists(legacy))
+
+    def test_reupload_of_an_old_blob_is_not_collected(self):
+        dropped = self.details('SEO', self.upload())
+        path = dropped.short_section_image.path
+        os.utime(path, (0, 0))  # uploaded long ago...
+        dropped.short_section_image = None
+        dropped.save()  # ...then unreferenced
+
+        # The same bytes come back in an upload whose row isn't committed yet.
+        self.assertEqual(default_storage.save('service_short_images/again.png', self.upload()),
+                         os.path.relpath(path, self.media_root))
+        call_command('gc_media', stdout=io.StringIO())
+        self.assertTrue(os.path.exists(path))
+
+    def test_content_addressed_media_is_immutable(self):
+        details = self.details('SEO', self.upload())
+        request = RequestFactory().get('/media/')
+        response = serve_media(request, details.short_section_image.name, document_root=self.media_root)
+        response.close()
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        legacy = os.path.join(self.media_root, 'legacy.jpeg')
+        open(legacy, 'wb').close()
+        response = serve_media(request, 'legacy.jpeg', document_root=self.media_root)
+        response.close()
+        self.assertFalse(response.has_header('Cache-Control'))
+
+class ContactAdminTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seo = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        now = timezone.now()
+        for i in range(30):
+            contact = Contact.objects.create(
+                name=f'Lead {i:02d}', email=f'lead{i}@example.com', message='Hi',
+                service_interested=self.seo if i % 3 == 0 else None,
+            )
+            # Half the leads share a timestamp, so paging must break ties on id.
+            created = now if i < 15 else now - timezone.timedelta(minutes=i)
+            Contact.objects.filter(pk=contact.pk).update(created_at=created)
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        self.url = reverse('admin:services_contact_changelist')
+
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            cl = response.context['cl']
+            seen += [c.pk for c in cl.result_list]
+            url = cl.older_url and self.url + cl.older_url
+        return seen, response
+
+    def test_cursor_pages_cover_every_lead_once(self):
+        seen, last = self.walk(self.url)
+        expected = list(Contact.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+        # Going back from the last page returns the previous page in display order.
+        newer = self.client.get(self.url + last.context['cl'].newer_url).context['cl']
+        self.assertEqual([c.pk for c in newer.result_list], expected[:25])
+
+    def test_changelist_never_counts_contacts(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'cursor': 'x'})
+            response = self.client.get(self.url)
+        contact_table = Contact._meta.db_table
+        counting = [q['sql'] for q in queries if 'COUNT(' in q['sql'] and contact_table in q['sql']]
+        self.assertEqual(counting, [])
+        self.assertContains(response, 'SEO (10)')
+        self.assertContains(response, 'No service (20)')
+        self.assertContains(response, 'Today (30)')
+        self.assertContains(response, '30 in total')
+
+    def test_filters_keep_working(self):
+        response = self.client.get(self.url, {'service': str(self.seo.pk)})
+        self.assertEqual(len(response.context['cl'].result_list), 10)
+        response = self.client.get(self.url, {'service': 'none'})
+        self.assertEqual(len(response.context['cl'].result_list), 20)
+
+    def test_rollup_follows_inserts_and_deletes(self):
+        today = timezone.localdate()
+        self.assertEqual(rollups.counts_by_service(), {self.seo.pk: 10, None: 20})
+        Contact.objects.filter(service_interested=self.seo)[:1].get().delete()
+        self.assertEqual(rollups.total(today), 29)
+        self.assertEqual(LeadRollup.objects.get(day=today, service=self.seo).count, 9)
+
+    def test_rollup_follows_edits(self):
+        lead = Contact.objects.filter(service_interested=None)[:1].get()
+        lead.service_interested = self.seo
+        lead.save()
+        self.assertEqual(rollups.counts_by_service(), {self.seo.pk: 11, None: 19})
+        lead.name = 'Renamed'
+        lead.save()
+        self.assertEqual(rollups.counts_by_service(), {self.seo.pk: 11, None: 19})
+        lead.delete()
+        self.assertEqual(rollups.counts_by_service(), {self.seo.pk: 10, None: 19})
+        self.assertEqual(rollups.total(), Contact.objects.count())
+
+
+class LeadDashboardTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seo = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        for source in ('Home', 'Home', 'Technical Audit'):
+            Contact.objects.create(
+                name='Lead', email='lead@example.com', message='Hi', service_interested=self.seo, page_source=source,
+            )
+        Contact.objects.create(name='Lead', email='lead@example.com', message='Hi')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+
+    def test_rollup_is_split_by_page_source(self):
+        counts = {(r['service'], r['page_source']): r['count'] for r in rollups.breakdown('service', 'page_source')}
+        self.assertEqual(counts, {(self.seo.pk, 'Home'): 2, (self.seo.pk, 'Technical Audit'): 1, (None, ''): 1})
+
+    def test_dashboard_reads_only_the_rollup(self):
+        catalog.get_catalog()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:services_contact_dashboard'), {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q['sql'] for q in queries if f'"{Contact._meta.db_table}"' in q['sql']])
+        self.assertEqual(response.context['total'], 4)
+        self.assertIn(('SEO', 3), response.context['by_service'])
+        self.assertIn(('No service', 1), response.context['by_service'])
+        self.assertEqual(response.context['by_service_source'][0], ('SEO', 'Home', 2))
+        self.assertEqual(len(response.context['daily']), 7)
+
+    def test_backfill_command_recounts_from_contacts(self):
+        LeadRollup.objects.all().delete()
+        Contact.objects.filter(page_source='Technical Audit').update(page_source=None)
+        out = io.StringIO()
+        call_command('backfill_lead_rollup', stdout=out)
+        self.assertIn('4 leads in total', out.getvalue())
+        counts = {(r['service'], r['page_source']): r['count'] for r in rollups.breakdown('service', 'page_source')}
+        self.assertEqual(counts, {(self.seo.pk, 'Home'): 2, (self.seo.pk, ''): 1, (None, ''): 1})
+
+    def test_page_source_edits_move_the_count_and_match_a_backfill(self):
+        lead = Contact.objects.get(page_source='Technical Audit')
+        lead.page_source = 'Home'
+        lead.save()
+        Contact.objects.get(service_interested=None).delete()
+        rows = rollups.breakdown('service', 'page_source')
+        live = {(r['service'], r['page_source']): r['count'] for r in rows if r['count']}
+        self.assertEqual(live, {(self.seo.pk, 'Home'): 3})
+
+        call_command('backfill_lead_rollup', stdout=io.StringIO())
+        counts = {(r['service'], r['page_source']): r['count'] for r in rollups.breakdown('service', 'page_source')}
+        self.assertEqual(counts, live)
+
+
+class CatalogAPITests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ('Ads', 'Bots', 'CRM', 'Data', 'Email'):
+                Service.objects.create(service_name=name, short_description='x', is_active=True)
+            Service.objects.create(service_name='Hidden', short_description='x')
+            self.service = Service.objects.get(slug='bots')
+            details = ServiceDetails.objects.create(service=self.service, hero_h1='Bots')
+            BulletPointServices.objects.create(details=details, title='Fast', description='Very')
+            self.sub = SubService.objects.create(parent_service=self.service, title='Chat')
+            SubServiceFeature.objects.create(sub_service=self.sub, text='24/7')
+            FAQ.objects.create(service=self.service, question='Why?', answer='Because')
+
+    def test_list_is_paged_by_cursor(self):
+        url = reverse('api_service_list')
+        names = []
+        while url:
+            data = self.client.get(url, {'limit': 2} if '?' not in url else None).json()
+            names += [item['service_name'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(names, ['Ads', 'Bots', 'CRM', 'Data', 'Email'])
+
+    def test_sparse_fields(self):
+        data = self.client.get(reverse('api_service_list'), {'fields': 'slug,url'}).json()
+        self.assertEqual(data['results'][0], {'slug': 'ads', 'url': '/ads/'})
+
+        data = self.client.get(reverse('api_service', args=['bots']), {'fields': 'bullet_points,faqs'}).json()
+        self.assertEqual(data, {
+            'bullet_points': [{'title': 'Fast', 'description': 'Very'}],
+            'faqs': [{'question': 'Why?', 'answer': 'Because'}],
+        })
+        response = self.client.get(reverse('api_service', args=['bots']), {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_endpoints(self):
+        data = self.client.get(reverse('api_service', args=['bots'])).json()
+        self.assertEqual(data['details']['hero_h1'], 'Bots')
+        self.assertEqual([s['slug'] for s in data['sub_services']], ['chat'])
+        data = self.client.get(reverse('api_subservice', args=['bots', 'chat'])).json()
+        self.assertEqual(data['features'], ['24/7'])
+        self.assertEqual(data['service'], {'slug': 'bots', 'service_name': 'Bots'})
+        self.assertEqual(self.client.get(reverse('api_service', args=['hidden'])).status_code, 404)
+
+    def test_etag_revalidation(self):
+        url = reverse('api_subservice', args=['bots', 'chat'])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A feature edit moves the sub-service's updated_at, and so the ETag.
+        with self.captureOnCommitCallbacks(execute=True):
+            SubServiceFeature.objects.create(sub_service=self.sub, text='Multilingual')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['features'], ['24/7', 'Multilingual'])
+
+    def test_payloads_are_built_once_per_snapshot(self):
+        url = reverse('api_service', args=['bots'])
+        self.client.get(url)
+        with mock.patch('services.api.service_payload') as build, self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        build.assert_not_called()
+
+
+class CompressionTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        ServiceDetails.objects.create(service=self.service, hero_h1='Rank / Higher')
+        SubService.objects.create(parent_service=self.service, title='Technical Audit')
+        self.url = reverse('service_detail', args=['seo'])
+
+    def test_minify_keeps_protected_elements(self):
+        html = (
+            '<div>\n    <p>a   b</p>  <!-- note -->  <span>c</span>\n\n</div>'
+            '<pre>  keep\n   this</pre><TEXTAREA> x  y </TEXTAREA>'
+            '<script>if (a  <  b) {}</script><!--[if IE]>ie<![endif]-->'
+        )
+        self.assertEqual(compression.minify_html(html), (
+            '<div>\n<p>a b</p> <span>c</span>\n</div>'
+            '<pre>  keep\n   this</pre><TEXTAREA> x  y </TEXTAREA>'
+            '<script>if (a  <  b) {}</script><!--[if IE]>ie<![endif]-->'
+        ))
+        self.assertEqual(compression.minify_html('a&nbsp;\xa0 b'), 'a&nbsp;\xa0 b')
+
+    def test_minify_is_independent_of_chunking(self):
+        with self.settings(COMPRESSION={'MINIFY': False}):
+            html = self.client.get(self.url).content.decode()
+        expected = compression.minify_html(html)
+        for size in (1, 3, 7, 64):
+            minifier = compression.HTMLMinifier()
+            pieces = [minifier.feed(html[i:i + size]) for i in range(0, len(html), size)]
+            self.assertEqual(''.join(pieces) + minifier.close(), expected)
+
+    def test_gzip_negotiation(self):
+        plain = self.client.get(self.url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+
+    @skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli_is_preferred_on_the_public_path(self):
+        plain = self.client.get(self.url).content
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), plain)
+
+    def test_streamed_response_is_compressed_per_chunk(self):
+        plain = self.client.get(self.url).content
+        caches['default'].clear()
+        with self.settings(STREAMING_RENDER=True):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.has_header('Content-Length'))
+        decoder = zlib.decompressobj(wbits=31)
+        chunks = [decoder.decompress(chunk) for chunk in response.streaming_content]
+        # Each chunk is flushed, so the first one already decodes to the <head>.
+        self.assertIn(b'</head>', b''.join(chunks[:2]))
+        self.assertEqual(b''.join(chunks) + decoder.flush(), plain)
+
+    def test_media_and_small_responses_pass_through(self):
+        middleware = compression.CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get('/media/x.png', HTTP_ACCEPT_ENCODING='gzip')
+        response = HttpResponse(b'\x89PNG' * 500, content_type='image/png')
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+        response = HttpResponse(b'{"ok": true}', content_type='application/json')
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+    def test_strong_etag_survives_compression(self):
+        url = reverse('api_service', args=['seo'])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]+-gzip"$')
+        revalidated = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+
+@skipUnless('jinja2' in {t['NAME'] for t in settings.TEMPLATES if 'NAME' in t}, "Jinja2 is not installed")
+class JinjaTemplateTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = Service.objects.create(
+            service_name='SEO', short_description='Rank & grow "fast"', is_active=True,
+        )
+        details = ServiceDetails.objects.create(
+            service=self.service, hero_h1='Rank / Higher', hero_tagline="Don't wait",
+            short_section_title='Why / Us', short_section_details='Because.',
+        )
+        BulletPointServices.objects.create(details=details, title='Audits', description='Deep ones')
+        for title in ('Technical Audit', 'Link Building', 'Local SEO'):
+            sub = SubService.objects.create(parent_service=self.service, title=title, description='x ' * 40)
+            SubServiceFeature.objects.create(sub_service=sub, text=f'{title} <feature>')
+        FAQ.objects.create(service=self.service, question='How long?', answer='Weeks.\n\nOr months.')
+        FAQ.objects.create(sub_service=sub, question='Local?', answer='Yes')
+        Testimonial.objects.create(name='Ann', designation='CEO', company='Acme', message='Great <b>work</b>')
+        self.urls = [
+            reverse('home'),
+            reverse('service_detail', args=['seo']),
+            reverse('subservice_detail', args=['seo', 'local-seo']),
+        ]
+
+    def render(self, url, engine):
+        caches['default'].clear()
+        names = ('home', 'service_detail', 'subservice_detail')
+        with self.settings(PUBLIC_TEMPLATE_ENGINES=dict.fromkeys(names, engine)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def normalized(self, response):
+        # Jinja's markupsafe writes &#39;/&#34; where Django writes &#x27;/&quot;.
+        return ' '.join(html.unescape(response.content.decode()).split())
+
+    def test_ports_render_the_same_pages(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                django_page = self.render(url, 'django')
+                jinja_page = self.render(url, 'jinja2')
+                self.assertEqual(self.normalized(jinja_page), self.normalized(django_page))
+
+    def test_ports_escape_catalog_text(self):
+        response = self.render(self.urls[1], 'jinja2')
+        self.assertContains(response, 'Technical Audit &lt;feature&gt;')
+        self.assertNotContains(response, '<feature>')
+
+    def test_streamed_jinja_page_matches_buffered_render(self):
+        buffered = self.render(self.urls[1], 'jinja2').content
+        with self.settings(STREAMING_RENDER=True):
+            response = self.render(self.urls[1], 'jinja2')
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), buffered)
+
+    def test_unknown_engine_falls_back_to_django_templates(self):
+        django_page = self.render(self.urls[1], 'django')
+        self.assertEqual(self.render(self.urls[1], 'missing').content, django_page.content)
+
+    def test_bytecode_cache_is_written(self):
+        from jinja2 import FileSystemBytecodeCache
+
+        from .jinja_env import environment
+
+        directory = os.path.join(tempfile.mkdtemp(), 'jinja2')
+        self.addCleanup(shutil.rmtree, os.path.dirname(directory))
+        env = environment(bytecode_cache_dir=directory, loader=engines['jinja2'].env.loader)
+        self.assertIsInstance(env.bytecode_cache, FileSystemBytecodeCache)
+        env.get_template('services/service_detail.html')
+        self.assertTrue(os.listdir(directory))
+
+
+class MetricsTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.enterContext(override_settings(METRICS={'DIR': self.directory, 'TOKEN': 'secret'}))
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        service = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        ServiceDetails.objects.create(service=service, hero_h1='Rank / Higher')
+
+    def scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret', **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_value_file_survives_growth_and_reopen(self):
+        path = os.path.join(self.directory, 'worker.db')
+        values = metrics.ValueFile(path)
+        for i in range(3000):  # more entries than fit in the initial mapping
+            values.add(f'key-{i}', i)
+        values.add('key-7', 0.5)
+        values.close()
+        reopened = metrics.ValueFile(path)
+        reopened.add('key-7', 1)
+        reopened.close()
+        totals = metrics.collect(self.directory)
+        self.assertEqual(len(totals), 3000)
+        self.assertEqual(totals['key-7'], 8.5)
+
+    def test_totals_are_summed_across_worker_files(self):
+        self.client.get(reverse('home'))
+        other_worker = metrics.ValueFile(os.path.join(self.directory, '999999.db'))
+        other_worker.add(metrics._key('http_requests', '_total', view='home', status='200'), 2)
+        other_worker.close()
+        self.assertIn('http_requests_total{status="200",view="home"} 3.0', self.scrape())
+
+    def test_request_latency_queries_and_render_time(self):
+        self.client.get(reverse('service_detail', args=['seo']))
+        self.client.get(reverse('service_detail', args=['seo']))  # page cache hit
+        self.client.get('/no/such/page/')
+        body = self.scrape()
+        self.assertIn('http_request_duration_seconds_count{view="service_detail"} 2.0', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="service_detail",le="+Inf"} 2.0', body)
+        self.assertIn('http_requests_total{status="404",view="unmatched"} 1.0', body)
+        self.assertIn('db_queries_per_request_count{view="service_detail"} 2.0', body)
+        self.assertIn('page_cache_requests_total{result="hit"} 1.0', body)
+        self.assertIn('page_cache_requests_total{result="miss"} 1.0', body)
+        self.assertIn('template_render_seconds_count{template="services/service_detail.html"} 1.0', body)
+        self.assertRegex(body, r'db_query_duration_seconds_total\{view="service_detail"\} [0-9.e-]+')
+
+    def test_contact_submissions_are_counted(self):
+        data = {'name': 'Ann', 'email': 'ann@example.com', 'message': 'Hello there, I need automation.'}
+        self.client.post(reverse('home'), data)
+        self.client.post(reverse('home'), data)
+        self.client.post(reverse('home'), {'name': 'Ann'})
+        body = self.scrape()
+        self.assertIn('contact_submissions_total{result="saved"} 1.0', body)
+        self.assertIn('contact_submissions_total{result="duplicate"} 1.0', body)
+        self.assertIn('contact_submissions_total{result="invalid"} 1.0', body)
+
+    def test_endpoint_needs_token_or_allowed_address(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        with self.settings(METRICS={'DIR': self.directory, 'ALLOWED_IPS': ['10.0.0.0/8']}):
+            # Proxy headers can't be used to get in.
+            self.assertEqual(self.client.get(url, HTTP_X_FORWARDED_FOR='10.0.0.5').status_code, 404)
+        with self.settings(METRICS={'DIR': self.directory, 'ALLOWED_IPS': ['127.0.0.0/8']}):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', response.content.decode())
+
+
+
+class ProfilingTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.enterContext(override_settings(PROFILING={'DIR': self.directory, 'INTERVAL': 0.0005}))
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        service = Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        ServiceDetails.objects.create(service=service, hero_h1='Rank / Higher')
+        SubService.objects.create(parent_service=service, title='Audit')
+        self.url = reverse('service_detail', args=['seo'])
+
+    def test_requests_without_a_valid_token_are_not_profiled(self):
+        self.assertFalse(self.client.get(self.url).has_header('X-Profile-Report'))
+        self.assertFalse(self.client.get(self.url, {'_profile': 'forged'}).has_header('X-Profile-Report'))
+        expired = profiling.make_token(self.staff)
+        with self.settings(PROFILING={'DIR': self.directory, 'TOKEN_MAX_AGE': -1}):
+            self.assertFalse(self.client.get(self.url, HTTP_X_PROFILE_TOKEN=expired).has_header('X-Profile-Report'))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_profiled_request_bypasses_the_page_cache_and_stores_a_report(self):
+        self.client.get(self.url)  # now cached
+        catalog.reset()
+        token = profiling.make_token(self.staff)
+        response = self.client.get(self.url, {'_profile': token, 'utm': 'x'})
+        report_id = response['X-Profile-Report']
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertIn('no-store', response['Cache-Control'])
+
+        report = profiling.list_reports()[0]
+        self.assertEqual(report['id'], report_id)
+        self.assertEqual((report['path'], report['view'], report['status']), ('/seo/?utm=x', 'service_detail', 200))
+        self.assertEqual(report['sql_count'], 6)  # the catalog snapshot, built by this request
+        self.assertIn('catalog.py', report['sql'][0]['site'])
+
+        with open(profiling.report_path(report_id, kind='speedscope')) as f:
+            flamegraph = json.load(f)
+        self.assertEqual(flamegraph['profiles'][0]['type'], 'sampled')
+        self.assertEqual(len(flamegraph['profiles'][0]['samples']), len(flamegraph['profiles'][0]['weights']))
+
+    def test_admin_lists_and_opens_reports(self):
+        list_url = reverse('profile_reports')
+        self.assertEqual(self.client.get(list_url).status_code, 302)  # staff only
+
+        self.client.force_login(self.staff)
+        response = self.client.post(list_url)
+        token = response.context['token']
+        self.assertTrue(profiling.check_token(token))
+
+        self.client.logout()
+        report_id = self.client.get(self.url, HTTP_X_PROFILE_TOKEN=token)['X-Profile-Report']
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(list_url), reverse('profile_report', args=[report_id]))
+        self.assertContains(self.client.get(reverse('profile_report', args=[report_id])), 'SQL, slowest first')
+        download = self.client.get(reverse('profile_speedscope', args=[report_id]))
+        self.assertEqual(download['Content-Type'], 'application/json')
+        self.assertIn('speedscope', json.loads(b''.join(download.streaming_content))['$schema'])
+        self.assertEqual(self.client.get(reverse('profile_report', args=['missing'])).status_code, 404)
+        self.assertIsNone(profiling.report_path('../../etc/passwd'))
+
+
+class SlowQueryLogTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.log = os.path.join(directory, 'slow.jsonl')
+        self.enterContext(override_settings(SLOW_QUERIES={'THRESHOLD_MS': 0, 'LOG': self.log}))
+        self.enterContext(mock.patch.object(slow_queries, '_explained', set()))
+        self.enterContext(mock.patch.object(slow_queries.logger, 'disabled', True))
+        slow_queries.install(connection)
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            slow_queries.normalize("SELECT * FROM t WHERE a = 'it''s' AND b IN (1, 2, 3) AND c = %s LIMIT 21"),
+            "SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ? LIMIT ?",
+        )
+        self.assertEqual(
+            slow_queries.fingerprint('SELECT * FROM "t1" WHERE id IN (%s, %s)'),
+            slow_queries.fingerprint('SELECT *  FROM "t1"\nWHERE id IN (?)'),
+        )
+        self.assertNotEqual(slow_queries.fingerprint('SELECT a FROM t'), slow_queries.fingerprint('SELECT b FROM t'))
+
+    def test_logs_sql_params_site_and_plan_once_per_shape(self):
+        Service.objects.create(service_name='SEO', short_description='x')
+        list(Service.objects.filter(slug='seo'))
+        list(Service.objects.filter(slug='ppc'))
+        entries = [e for e in slow_queries.read_log(self.log) if 'tests.py' in e['site'] and 'WHERE' in e['sql']]
+
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]['fingerprint'], entries[1]['fingerprint'])
+        self.assertEqual((entries[0]['params'], entries[1]['params']), ("('seo',)", "('ppc',)"))
+        self.assertIn('services_service', ' '.join(entries[0]['plan']))  # EXPLAIN QUERY PLAN on SQLite
+        self.assertNotIn('plan', entries[1])
+
+        inserts = [e for e in slow_queries.read_log(self.log) if e['sql'].startswith('INSERT')]
+        self.assertIsNone(inserts[0]['plan'])
+
+    def test_threshold_and_switch(self):
+        with self.settings(SLOW_QUERIES={'THRESHOLD_MS': 10_000, 'LOG': self.log}):
+            list(Service.objects.all())
+        with self.settings(SLOW_QUERIES={'ENABLED': False, 'THRESHOLD_MS': 0, 'LOG': self.log}):
+            list(Service.objects.all())
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_failed_explain_does_not_break_the_transaction(self):
+        plan = slow_queries.explain(connection, 'SELECT * FROM no_such_table WHERE id = %s', (1,))
+        self.assertTrue(plan[0].startswith('EXPLAIN failed'))
+        self.assertEqual(Service.objects.count(), 0)
+
+    def test_report_command_groups_by_shape(self):
+        for slug in ('a', 'b', 'c'):
+            list(Service.objects.filter(slug=slug))
+        Service.objects.count()
+
+        rows = slow_queries.report(slow_queries.read_log(self.log), sort='count')
+        self.assertEqual(rows[0]['count'], 3)
+        self.assertIn('"slug" = ?', rows[0]['shape'])
+
+        out = io.StringIO()
+        call_command('slow_queries', top=1, sort='count', plans=True, clear=True, stdout=out)
+        report = out.getvalue()
+        self.assertIn(rows[0]['fingerprint'], report)
+        self.assertIn('| ', report)
+        self.assertIn('tests.py', report)
+        self.assertEqual(os.path.getsize(self.log), 0)
+
+        out = io.StringIO()
+        call_command('slow_queries', stdout=out)
+        self.assertIn('No slow queries', out.getvalue())
+
+
+class StartupTests(ServicesTestCase):
+    def test_preload_warms_shared_state_and_closes_connections(self):
+        from django.contrib.contenttypes.models import ContentType
+
+        Service.objects.create(service_name='SEO', short_description='x', is_active=True)
+        ContentType.objects.clear_cache()
+        with mock.patch.object(preload, 'connections') as connections:
+            report = preload.warm(freeze=False)
+        connections.close_all.assert_called_once()
+
+        self.assertEqual(report['catalog'][0], 1)
+        self.assertGreater(report['urls'][0], 1)  # the root resolver and admin's
+        self.assertGreater(report['templates'][0], 10)
+        with self.assertNumQueries(0):
+            catalog.get_catalog()
+            ContentType.objects.get_for_model(Service)
+        names = set(preload.template_names(engines['django']))
+        self.assertIn('services/service_detail.html', names)
+
+    def test_import_time_report(self):
+        modules = startup.parse_import_times(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     django.utils\n"
+            "import time:       300 |        420 |   django\n"
+        )
+        self.assertEqual(modules, [('django.utils', 120, 120, 2), ('django', 300, 420, 1)])
+
+        out = io.StringIO()
+        call_command('profile_startup', imports_only=True, top=3, stdout=out)
+        self.assertRegex(out.getvalue(), r'Importing website\.wsgi: \d+ modules')
+        self.assertIn('django', out.getvalue())
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, CATALOG={'CHECK_INTERVAL': 0}, METRICS={'ENABLED': False}, SLOW_QUERIES={'ENABLED': False},
+)
+class LoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.enterContext(override_settings(SITEMAP_ROOT=root))
+        caches['default'].clear()
+        catalog.reset()
+        call_command('seed_catalog', services=2, subservices=3, stdout=io.StringIO())
+
+    def test_parse_mix_and_percentiles(self):
+        self.assertEqual(loadtest.parse_mix('crawler=80,home=20'), {'crawler': 80.0, 'home': 20.0})
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix('crawler=80,spider=20')
+        self.assertEqual(loadtest.percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEqual(loadtest.percentile([1, 2, 3, 4], 0.99), 4)
+
+    def test_discovers_pages_and_replays_the_mix(self):
+        client = loadtest.Client(self.live_server_url, loadtest.Recorder())
+        pages = loadtest.discover(client)
+        client.close()
+        self.assertEqual(len(pages), 2 + 2 * 3)
+
+        out = io.StringIO()
+        call_command(
+            'loadtest', url=self.live_server_url, mix={'crawler': 1, 'home': 1, 'contact': 1},
+            duration=1, window=1, concurrency=2, seed=1, stdout=out,
+        )
+        report = out.getvalue()
+        self.assertRegex(report, r'total +\d+ ')
+        self.assertNotIn('failed', report)
+        self.assertTrue(Contact.objects.filter(name='Load Test').exists())
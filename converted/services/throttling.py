@@ -0,0 +1,119 @@
+"""
+Abuse throttling for the contact form.
+
+Every submission is checked against:
+  * a duplicate fingerprint (same email + same message), which silently
+    drops exact repeats before any DB work, and
+  * two token buckets, one keyed by client IP and one by email address.
+
+State lives in the cache alias named by settings.CONTACT_THROTTLE['CACHE'],
+so any local or shared cache backend works (LocMemCache in tests).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .utils import get_client_ip
+
+
+DEFAULTS = {
+    'CACHE': 'default',
+    # (bucket capacity, seconds to refill one token)
+    'IP_RATE': (5, 60),
+    'EMAIL_RATE': (3, 300),
+    # How long an identical email + message pair is remembered.
+    'DUPLICATE_WINDOW': 60 * 60 * 24,
+}
+
+ALLOWED = 'allowed'
+DUPLICATE = 'duplicate'
+RATE_LIMITED = 'rate_limited'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'CONTACT_THROTTLE', {})}
+
+
+def _digest(value):
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+def message_fingerprint(email, message):
+    """Normalised hash of a submission, insensitive to case and whitespace."""
+    email = (email or '').strip().lower()
+    message = ' '.join((message or '').split()).lower()
+    return _digest(f"{email}\n{message}")
+
+
+class TokenBucket:
+    """
+    Classic token bucket stored as a (tokens, timestamp) pair in the cache.
+
+    Buckets start full and refill continuously at one token per
+    `refill_seconds`. Read-modify-write is not atomic across processes, so
+    under heavy contention a few extra requests may slip through; that is an
+    acceptable trade for not needing a lock on every submission.
+    """
+
+    def __init__(self, cache, prefix, capacity, refill_seconds):
+        self.cache = cache
+        self.prefix = prefix
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+
+    def _key(self, identity):
+        return f"throttle:{self.prefix}:{_digest(identity)}"
+
+    def consume(self, identity, tokens=1, now=None):
+        now = time.time() if now is None else now
+        key = self._key(identity)
+        state = self.cache.get(key)
+        if state is None:
+            available = float(self.capacity)
+        else:
+            available, stamp = state
+            available = min(self.capacity, available + (now - stamp) / self.refill_seconds)
+
+        allowed = available >= tokens
+        if allowed:
+            available -= tokens
+
+        # Once a bucket has refilled completely the entry carries no information.
+        timeout = int(self.capacity * self.refill_seconds) + 1
+        self.cache.set(key, (available, now), timeout)
+        return allowed
+
+
+class ContactThrottle:
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.cache = caches[self.config['CACHE']]
+        self.ip_bucket = TokenBucket(self.cache, 'ip', *self.config['IP_RATE'])
+        self.email_bucket = TokenBucket(self.cache, 'email', *self.config['EMAIL_RATE'])
+
+    def check(self, request, email, message):
+        """
+        Return ALLOWED, DUPLICATE or RATE_LIMITED for a contact submission.
+
+        Duplicates are detected before any bucket is touched so that resubmits
+        (double clicks, replayed bot payloads) don't burn a real user's quota.
+        """
+        fingerprint_key = f"throttle:dup:{message_fingerprint(email, message)}"
+        if self.cache.get(fingerprint_key) is not None:
+            return DUPLICATE
+
+        if not self.ip_bucket.consume(get_client_ip(request)):
+            return RATE_LIMITED
+        if email and not self.email_bucket.consume(email.strip().lower()):
+            return RATE_LIMITED
+
+        # add() is atomic on real backends, so two racing copies can't both pass.
+        if not self.cache.add(fingerprint_key, 1, self.config['DUPLICATE_WINDOW']):
+            return DUPLICATE
+        return ALLOWED
+
+
+def check_contact_submission(request, email, message):
+    return ContactThrottle().check(request, email, message)
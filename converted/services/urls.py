@@ -1,8 +1,16 @@
 from django.urls import path
-from . import views
+from . import api, metrics, views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('api/csrf/', views.csrf_token, name='csrf_token'),
+    path('api/services/', api.service_list, name='api_service_list'),
+    path('api/services/<slug:slug>/', api.service, name='api_service'),
+    path('api/services/<slug:service_slug>/<slug:subservice_slug>/', api.subservice, name='api_subservice'),
+    path('metrics', metrics.metrics_view, name='metrics'),
+    path('robots.txt', views.robots_txt, name='robots_txt'),
+    path('sitemap.xml', views.sitemap_index, name='sitemap_index'),
+    path('sitemap-<slug:section>-<int:page>.xml', views.sitemap_section, name='sitemap_section'),
     path('<slug:slug>/', views.service_detail, name='service_detail'),
     path("<slug:service_slug>/<slug:subservice_slug>/", views.subservice_detail, name="subservice_detail"),
 
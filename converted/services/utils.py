@@ -0,0 +1,63 @@
+import ipaddress
+import os
+import sys
+from functools import lru_cache
+
+import django
+from django.conf import settings
+
+
+DJANGO_DIR = os.path.dirname(django.__file__)
+# Modules whose execute wrappers sit between a query and the code that issued it.
+INSTRUMENTATION_FILES = frozenset(
+    os.path.join(os.path.dirname(__file__), f'{name}.py') for name in ('metrics', 'profiling', 'slow_queries')
+)
+
+
+@lru_cache(maxsize=8)
+def _networks(cidrs):
+    return tuple(ipaddress.ip_network(cidr, strict=False) for cidr in cidrs)
+
+
+def _in_networks(ip, cidrs):
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in _networks(tuple(cidrs)))
+
+
+def get_client_ip(request):
+    """
+    Client IP for a request, read only from what the client can't forge.
+
+    That is REMOTE_ADDR, or with settings.TRUSTED_PROXY_COUNT reverse proxies
+    in front of Django the hop that many places from the right of
+    X-Forwarded-For: each proxy appends its peer, and everything further left
+    came from the client. When that address is one of Cloudflare's
+    (settings.CLOUDFLARE_IPS), CF-Connecting-IP names the visitor instead.
+    """
+    ip = request.META.get('REMOTE_ADDR', '')
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    if proxies:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if hops:
+            ip = hops[-min(proxies, len(hops))]
+    cloudflare = getattr(settings, 'CLOUDFLARE_IPS', ())
+    if cloudflare and _in_networks(ip, cloudflare):
+        ip = request.META.get('HTTP_CF_CONNECTING_IP', '').strip() or ip
+    return ip
+
+
+def call_site(depth=2):
+    """
+    "file:line in function" of the first caller outside Django and our
+    query instrumentation: where an ORM query was issued from.
+    """
+    frame = sys._getframe(depth)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(DJANGO_DIR) and filename not in INSTRUMENTATION_FILES:
+            return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return ''
@@ -1,112 +1,232 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import time
+
+from django.shortcuts import render, redirect
+from django.conf import settings
 from django.contrib import messages
-from .models import Service, Contact, FAQ, SubService
+from django.http import FileResponse, Http404, JsonResponse
+from django.middleware.csrf import get_token
+from django.template import engines
+from django.urls import reverse
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.views.csrf import csrf_failure as default_csrf_failure
+from django.views.static import serve
+from django.views.decorators.cache import never_cache
+from . import metrics, sitemaps
+from .forms import ContactForm
+from .catalog import get_catalog
+from .page_cache import swr_cache_page
+from .storage import is_content_addressed
+from .streaming import stream_render
+from .throttling import check_contact_submission, DUPLICATE, RATE_LIMITED
+
+THANKS_MESSAGE = "Thank you for your message! We will get back to you soon."
+RATE_LIMITED_MESSAGE = "Too many messages in a short time. Please try again later."
+CSRF_FAILED_MESSAGE = (
+    "We couldn't confirm your message came from this site, usually because the page was "
+    "open for a long time or JavaScript is turned off. Check it below and send it again."
+)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _engine(request):
+    """Template engine chosen for this view in settings.PUBLIC_TEMPLATE_ENGINES."""
+    match = request.resolver_match
+    using = settings.PUBLIC_TEMPLATE_ENGINES.get(match.url_name) if match else None
+    # Fall back to the default engine when Jinja2 isn't installed.
+    return using if using in engines else None
+
+
+def _render(request, template_name, context):
+    """
+    render(), or its streaming variant when settings.STREAMING_RENDER is on.
+    Pages with flash messages are rendered whole: MessageMiddleware would
+    otherwise store them again before the streamed body displays them.
+    """
+    using = _engine(request)
+    if settings.STREAMING_RENDER and not messages.get_messages(request):
+        return stream_render(request, template_name, context, using=using)
+    started = time.perf_counter()
+    response = render(request, template_name, context, using=using)
+    metrics.TEMPLATE_RENDER.observe(time.perf_counter() - started, template=template_name)
+    return response
+
+
+def _wants_json(request):
+    """The contact form's fetch() submit asks for JSON instead of a redirect."""
+    return "application/json" in request.headers.get("Accept", "")
+
+
+def _contact_reply(request, redirect_url, text, ok=True, status=200):
+    if _wants_json(request):
+        return JsonResponse({"ok": ok, "message": text}, status=status)
+    if ok:
+        messages.success(request, text)
+    else:
+        messages.error(request, text)
+    return redirect(redirect_url)
+
+
+@never_cache
+def csrf_token(request):
+    """
+    Hands out the CSRF token for the contact form.
+
+    Keeping {% csrf_token %} out of home.html makes the page identical for all
+    anonymous visitors, so it can be cached whole; the form fetches a token
+    from here (which also sets the csrftoken cookie) right before submitting.
+    """
+    return JsonResponse({"csrfToken": get_token(request)})
+
+
+def csrf_failure(request, reason=""):
+    """
+    settings.CSRF_FAILURE_VIEW.
+
+    home.html ships without a token (see csrf_token() above), so a contact form
+    sent without JavaScript, or with an expired token, ends up here. Instead of
+    Django's bare 403 the visitor gets their message back in a form that does
+    carry a token; this page is per visitor and never cached. Other forms get
+    Django's default page.
+    """
+    if request.method != "POST" or request.path != reverse("home"):
+        return default_csrf_failure(request, reason)
+    if _wants_json(request):
+        return JsonResponse({"ok": False, "message": CSRF_FAILED_MESSAGE}, status=403)
+    context = {"form": ContactForm(request.POST), "message": CSRF_FAILED_MESSAGE}
+    response = render(request, "services/contact_confirm.html", context, status=403)
+    add_never_cache_headers(response)
+    return response
+
 
 def home(request):
-    services = Service.objects.all().order_by('service_name')
-    country = request.META.get('HTTP_CF_IPCOUNTRY', 'XX')  # 'XX' = unknown
+    catalog = get_catalog()
+    services = catalog.services
+    country = getattr(request, 'country', 'XX')  # set by CountryMiddleware, 'XX' = unknown
     if country == 'BD':  # 🇧🇩 Bangladesh
         whatsapp_no = '+8801790007709'
     else:
         whatsapp_no = 'JinnatVai'
     if request.method == "POST":
-        name = request.POST.get("name")
-        email = request.POST.get("email")
-        company = request.POST.get("company")
-        message_text = request.POST.get("message")
-        service_id = request.POST.get("service_interested")
-
-        Contact.objects.create(
-            name=name,
-            email=email,
-            company=company,
-            service_interested_id=service_id if service_id else None,
-            page_source="Homepage Contact Form",
-            page_url=request.build_absolute_uri(),
-            message=message_text,
-        )
-
-        messages.success(request, "Thank you for your message! We will get back to you soon.")
+        form = ContactForm(request.POST)
 
         referer_url = request.META.get("HTTP_REFERER", "/")
         redirect_url = f"{referer_url.split('#' )[0]}#contact"
-        
-        return redirect(redirect_url)
+
+        if not form.is_valid():
+            metrics.CONTACT_SUBMISSIONS.inc(result='invalid')
+            if _wants_json(request):
+                return JsonResponse({"ok": False, "errors": form.errors.get_json_data()}, status=400)
+            messages.error(request, "Please check the form and try again.")
+            return redirect(redirect_url)
+
+        verdict = check_contact_submission(
+            request, form.cleaned_data["email"], form.cleaned_data["message"]
+        )
+        if verdict == RATE_LIMITED:
+            metrics.CONTACT_SUBMISSIONS.inc(result='rate_limited')
+            return _contact_reply(request, redirect_url, RATE_LIMITED_MESSAGE, ok=False, status=429)
+
+        # Exact repeats of a message we already have are acknowledged, not stored.
+        if verdict != DUPLICATE:
+            contact = form.save(commit=False)
+            contact.page_source = "Homepage Contact Form"
+            contact.page_url = request.build_absolute_uri()
+            contact.save()
+        metrics.CONTACT_SUBMISSIONS.inc(result='duplicate' if verdict == DUPLICATE else 'saved')
+
+        return _contact_reply(request, redirect_url, THANKS_MESSAGE)
 
     context = {
         "services": services,
+        "testimonials": catalog.testimonials,
         'whatsapp_no':whatsapp_no
     }
-    return render(request, "services/home.html", context)
+    return _render(request, "services/home.html", context)
 
 
 
 
+@swr_cache_page
 def service_detail(request, slug):
-    service = get_object_or_404(
-        Service.objects
-        .select_related("details")
-        .prefetch_related(
-            "details__bullet_points",
-            "sub_services__features"
-        ),
-        slug=slug
-    )
+    service = get_catalog().service(slug)
+    if service is None or service.details is None:
+        raise Http404("No Service matches the given query.")
 
     context = {
         "service": service,
         "details": service.details,
-        "bullet_points": service.details.bullet_points.all(),
-        "sub_services": service.sub_services.all(),
+        "bullet_points": service.details.bullet_points,
+        "sub_services": service.sub_services,
         # ✅ only FAQs linked *directly* to this main service
-        "faqs": FAQ.objects.filter(
-            service=service,
-            sub_service__isnull=True,
-            is_active=True
-        ),
+        "faqs": service.faqs,
     }
-    print("Service Detail Context:", context)  # Debugging line
-    return render(request, "services/service_detail.html", context)
+    return _render(request, "services/service_detail.html", context)
 
 
 
 
+@swr_cache_page
 def subservice_detail(request, service_slug, subservice_slug):
     """
     Display a SubService detail page based on nested slugs:
     /<service>/<subservice>/
     """
 
-    # Ensure both service and sub-service exist and match
-    parent_service = get_object_or_404(Service, slug=service_slug, is_active=True)
-    sub_service = get_object_or_404(
-        SubService,
-        slug=subservice_slug,
-        parent_service=parent_service,
-        is_active=True,
-    )
+    # Ensure both service and sub-service exist, are active and match
+    sub_service = get_catalog().subservice(service_slug, subservice_slug)
+    if sub_service is None or not sub_service.is_active or not sub_service.parent_service.is_active:
+        raise Http404("No SubService matches the given query.")
+    parent_service = sub_service.parent_service
 
     # Related subservices (for sidebar/navigation)
-    related_subservices = (
-        parent_service.sub_services.filter(is_active=True)
-        .exclude(id=sub_service.id)
-        .order_by("order")
-    )
-
-    # Features
-    features = sub_service.features.all()
+    related_subservices = [
+        sub for sub in parent_service.sub_services
+        if sub.is_active and sub.id != sub_service.id
+    ]
 
     # FAQs: Prefer sub-service ones, fallback to parent service
-    faqs = FAQ.objects.filter(is_active=True, sub_service=sub_service)
-    if not faqs.exists():
-        faqs = FAQ.objects.filter(is_active=True, service=parent_service)
+    faqs = sub_service.faqs or parent_service.faqs
 
     context = {
         "sub_service": sub_service,
         "parent_service": parent_service,
         "related_subservices": related_subservices,
-        "features": features,
+        "features": sub_service.features,
         "faqs": faqs,
     }
 
-    return render(request, "services/subservice_detail.html", context)
\ No newline at end of file
+    return _render(request, "services/subservice_detail.html", context)
+
+
+
+def _serve_sitemap_file(name, content_type):
+    path = sitemaps.sitemap_file(name)
+    try:
+        return FileResponse(open(path, "rb"), content_type=content_type)
+    except FileNotFoundError:
+        raise Http404("Sitemap not found")
+
+
+def sitemap_index(request):
+    return _serve_sitemap_file(sitemaps.INDEX_NAME, "application/xml")
+
+
+def sitemap_section(request, section, page):
+    if section not in sitemaps.SECTIONS:
+        raise Http404("Unknown sitemap section")
+    return _serve_sitemap_file(sitemaps.page_filename(section, page), "application/xml")
+
+
+def robots_txt(request):
+    return _serve_sitemap_file(sitemaps.ROBOTS_NAME, "text/plain")
+
+
+def serve_media(request, path, document_root=None):
+    """
+    django.views.static.serve() for MEDIA_URL; content-addressed files
+    (services/storage.py) never change, so browsers may keep them for a year.
+    """
+    response = serve(request, path, document_root=document_root)
+    if response.status_code == 200 and is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
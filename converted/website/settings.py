@@ -10,11 +10,22 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+try:
+    import jinja2
+except ImportError:  # optional: the Jinja2 ports of the public templates
+    jinja2 = None
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Where the site writes at runtime: cache/ (page cache, metrics, slow-query
+# log, Jinja bytecode) and sitemaps/. `manage.py loadtest` points its throwaway
+# server elsewhere so it never overwrites the real files.
+VAR_DIR = Path(os.environ.get('DJANGO_VAR_DIR', BASE_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -23,9 +34,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-_(u4btv6%zk*gvo$1nxtyozr!7oiv42dl&ku46qyq#fm(xl6#z'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -38,18 +49,34 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'services',
+    'blog',
 ]
 
 MIDDLEWARE = [
+    # Request latency and DB query metrics for /metrics, see services/metrics.py
+    'services.metrics.MetricsMiddleware',
+    # Profiles requests that carry a staff-issued token, see services/profiling.py
+    'services.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Minifies HTML and Brotli/gzip-compresses text responses, see services/compression.py
+    'services.compression.CompressionMiddleware',
+    # Session/auth are skipped for anonymous GETs to public pages, see services/middleware.py
+    'services.middleware.SessionlessSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'services.middleware.SessionlessAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'services.middleware.CountryMiddleware',
 ]
 
+# Flash messages travel in a signed cookie so public pages never need a session.
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# home.html has no CSRF token of its own (its JS fetches one); a submit without
+# JavaScript gets a page to send the message again from, not a bare 403.
+CSRF_FAILURE_VIEW = 'services.views.csrf_failure'
+
 ROOT_URLCONF = 'website.urls'
 
 TEMPLATES = [
@@ -67,6 +94,32 @@ TEMPLATES = [
     },
 ]
 
+# Jinja2 ports of the public templates (jinja2/), see services/jinja_env.py.
+if jinja2 is not None:
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'NAME': 'jinja2',
+        'DIRS': [BASE_DIR / 'jinja2'],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'environment': 'services.jinja_env.environment',
+            'bytecode_cache_dir': VAR_DIR / 'cache' / 'jinja2',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    })
+
+# Template engine per public view: URL name -> TEMPLATES 'NAME' ('django' or
+# 'jinja2'). Views not listed, or all of them without Jinja2, use Django's.
+# `manage.py bench_templates` compares the two: Jinja2 renders service_detail
+# about 3x faster once it has more than a handful of sub-services.
+PUBLIC_TEMPLATE_ENGINES = {
+    'service_detail': 'jinja2',
+    'subservice_detail': 'jinja2',
+}
+
 WSGI_APPLICATION = 'website.wsgi.application'
 
 
@@ -76,7 +129,8 @@ WSGI_APPLICATION = 'website.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLITE_PATH points a process at another database (manage.py loadtest).
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -129,4 +183,115 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # MEDIA FILES (User uploads)
 MEDIA_URL = '/media/' 
-MEDIA_ROOT = BASE_DIR / 'media' 
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media' 
+
+# Uploads are named by content hash and deduplicated (services/storage.py);
+# `manage.py gc_media` removes blobs no row references any more.
+STORAGES = {
+    'default': {'BACKEND': 'services.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# CACHES
+# 'default' carries the catalog version, the contact throttle buckets and the
+# page cache, which all gunicorn workers must share, so it can't be a
+# per-process LocMemCache (services/checks.py refuses one when DEBUG is off).
+# Files under cache/django work on one host; use Redis/Memcached for several.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': VAR_DIR / 'cache' / 'django',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# /metrics (services/metrics.py): per-worker counters live in cache/metrics/.
+# Scrapers send `Authorization: Bearer <TOKEN>` or connect from ALLOWED_IPS.
+METRICS = {
+    'TOKEN': '',
+    'ALLOWED_IPS': [],
+}
+
+# Slow-query log (services/slow_queries.py): statements slower than
+# THRESHOLD_MS go to cache/slow_queries.jsonl with their plan; summarise
+# them with `manage.py slow_queries`.
+SLOW_QUERIES = {
+    'THRESHOLD_MS': 100,
+}
+
+# CLIENT IP for throttling and GeoIP (see services/utils.py get_client_ip).
+# REMOTE_ADDR unless reverse proxies sit in front of Django: set their number
+# here, and the client is read that many hops from the right of
+# X-Forwarded-For. CF-Connecting-IP is used only when that address is in
+# CLOUDFLARE_IPS (https://www.cloudflare.com/ips/); otherwise anyone could send it.
+TRUSTED_PROXY_COUNT = int(os.environ.get('DJANGO_TRUSTED_PROXY_COUNT', 0))
+CLOUDFLARE_IPS = []
+
+# CONTACT FORM THROTTLING (see services/throttling.py)
+CONTACT_THROTTLE = {
+    'CACHE': 'default',
+    'IP_RATE': (5, 60),         # 5 messages, then 1 more per minute per IP
+    'EMAIL_RATE': (3, 300),     # 3 messages, then 1 more per 5 minutes per email
+    'DUPLICATE_WINDOW': 60 * 60 * 24,
+}
+
+# GEOIP (see services/geoip.py)
+# Either a MaxMind-style .mmdb (needs the 'maxminddb' package) or a range file
+# built with `manage.py build_geoip <csv>`. Missing file = every visitor is 'XX'
+# unless Cloudflare sends CF-IPCountry.
+GEOIP_PATH = BASE_DIR / 'geoip' / 'country-ranges.bin'
+GEOIP_CACHE_SIZE = 4096
+
+# Public base URL, used where absolute links are needed (sitemaps, robots.txt).
+SITE_URL = 'http://127.0.0.1:8000'
+
+# SITEMAPS (see services/sitemaps.py)
+SITEMAP_ROOT = VAR_DIR / 'sitemaps'
+SITEMAP_PAGE_SIZE = 50000
+
+# PAGE CACHE for the public catalog pages (see services/page_cache.py)
+PAGE_CACHE = {
+    'CACHE': 'default',
+    'SOFT_TTL': 60,         # seconds a page is served as fresh
+    'HARD_TTL': 60 * 10,    # stale pages are served (and rebuilt) until this
+    'LOCK_TTL': 30,
+    'BACKGROUND': True,
+}
+
+# Stream the public pages (services/streaming.py): the <head> and hero are
+# flushed before the sub-service and FAQ queries run. Works under WSGI and ASGI.
+STREAMING_RENDER = False
+STREAMING_MIN_CHUNK = 1024
+
+# SELF-HOSTED FONT AWESOME SUBSET (see services/icons.py)
+# SOURCE_DIR is an unpacked Font Awesome Free package (css/ + webfonts/).
+# Run `manage.py build_icons` once; after that the subset is rebuilt whenever
+# an admin saves an icon_class it doesn't contain yet. Builds land in
+# OUTPUT_DIR and, once collectstatic has run, in STATIC_ROOT/fontawesome too.
+FONTAWESOME = {
+    'SOURCE_DIR': BASE_DIR / 'assets' / 'fontawesome',
+    'OUTPUT_DIR': BASE_DIR / 'static' / 'fontawesome',
+}
+
+# IN-MEMORY CATALOG (see services/catalog.py)
+CATALOG = {
+    'CACHE': 'default',     # holds the shared version counter
+    'CHECK_INTERVAL': 1.0,  # seconds between version checks per worker
+}
+
+# READ-ONLY JSON CATALOG API (see services/api.py)
+CATALOG_API = {
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 100,
+    'MAX_AGE': 60,          # Cache-Control max-age; clients revalidate with the ETag
+}
+
+# HTML MINIFICATION + RESPONSE COMPRESSION (see services/compression.py)
+# Brotli needs the optional 'brotli' package; without it gzip is used.
+# `manage.py bench_compression` shows bytes saved and CPU cost per level.
+COMPRESSION = {
+    'MINIFY': True,
+    'BROTLI_LEVEL': 5,
+    'GZIP_LEVEL': 6,
+    'MIN_LENGTH': 200,
+}
@@ -19,11 +19,18 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from services.admin import profile_urls
+from services.views import serve_media
+
 urlpatterns = [
+    path('admin/profiles/', include(profile_urls)),
     path('admin/', admin.site.urls),
+    # Before services.urls, whose <slug>/ pattern would otherwise take /blog/;
+    # Service.clean() refuses slugs that resolve here (services.models.is_reserved_slug).
+    path('blog/', include('blog.urls')),
     path('', include('services.urls')),
 ]
 
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
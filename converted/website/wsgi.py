@@ -5,6 +5,10 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
+
+Under a server that loads the application before forking its workers
+(gunicorn --preload), set DJANGO_PRELOAD=1 to warm URL resolvers, templates,
+the catalog and ContentTypes once in the master; see services/preload.py.
 """
 
 import os
@@ -14,3 +18,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
 
 application = get_wsgi_application()
+
+if os.environ.get('DJANGO_PRELOAD') == '1':
+    from services import preload
+
+    preload.warm()